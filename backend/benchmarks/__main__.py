@@ -0,0 +1,61 @@
+# Benchmark runner.
+#
+#   python -m benchmarks --rows 100k --out bench/current.json
+#   python -m benchmarks --rows 100k --suite micro --baseline bench/base.json
+#   python -m benchmarks --compare bench/current.json --baseline bench/base.json
+#
+# Exit status is 1 when any benchmark regressed past --threshold.
+import argparse
+import os
+import sys
+
+from .datagen import SIZES, cached_events_csv, parse_size
+from .harness import BenchResults, compare, load_results, print_comparison
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="OlympiaScope engine/API benchmarks")
+    ap.add_argument("--rows", default="100k", help="row count or one of: " + ", ".join(SIZES))
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--suite", choices=["micro", "macro", "all"], default="all")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="where generated CSVs are cached")
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--baseline", help="baseline results JSON to compare against")
+    ap.add_argument("--compare", help="compare this saved results JSON instead of running")
+    ap.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown (0.10 = 10%%)")
+    args = ap.parse_args()
+
+    if args.compare:
+        if not args.baseline:
+            ap.error("--compare needs --baseline")
+        current = load_results(args.compare)
+    else:
+        n_rows = parse_size(args.rows)
+        events_csv = cached_events_csv(args.data_dir, n_rows, args.seed)
+        results = BenchResults({"rows": n_rows, "seed": args.seed, "suite": args.suite})
+        if args.suite in ("micro", "all"):
+            from .micro import run_micro
+            run_micro(results, events_csv, args.repeat)
+        if args.suite in ("macro", "all"):
+            from .macro import run_macro
+            run_macro(results, events_csv, args.repeat)
+        if args.out:
+            results.save(args.out)
+        current = results.to_dict()
+
+    if args.baseline:
+        baseline = load_results(args.baseline)
+        if baseline.get("meta", {}).get("rows") != current.get("meta", {}).get("rows"):
+            print("warning: baseline was recorded with a different row count")
+        regressions = print_comparison(compare(current, baseline, args.threshold))
+        if regressions:
+            print(f"{regressions} regression(s) over {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
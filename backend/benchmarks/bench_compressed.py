@@ -0,0 +1,74 @@
+# Scan throughput of MyCSVParser on plain vs gzip/bz2/xz input, with and
+# without the background read-ahead thread.
+#
+#   python -m benchmarks.bench_compressed --rows 500000 --depth 0 2 8
+import argparse
+import bz2
+import gzip
+import lzma
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from my_sql_engine import EVENTS_SCHEMA, MyCSVParser
+
+from .datagen import write_events_csv
+
+CODECS = {"gzip": (gzip.open, ".gz"), "bz2": (bz2.open, ".bz2"), "xz": (lzma.open, ".xz")}
+
+
+def _compress(path: str, codec: str) -> str:
+    opener, ext = CODECS[codec]
+    out = path + ext
+    with open(path, "rb") as src, opener(out, "wb") as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+    return out
+
+
+def _scan(path: str, read_ahead) -> int:
+    parser = MyCSVParser(path, chunk_size=50_000, schema=EVENTS_SCHEMA, read_ahead=read_ahead)
+    return sum(len(c) for c in parser.iter_chunks())
+
+
+def _best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--depth", type=int, nargs="+", default=[0, 4], help="read-ahead depths to try")
+    ap.add_argument("--codec", choices=sorted(CODECS), nargs="+", default=sorted(CODECS))
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "events.csv")
+        write_events_csv(path, args.rows)
+        mb = os.path.getsize(path) / 1e6
+
+        def report(label: str, dt: float, base: float) -> None:
+            print(f"{label:<28} {dt:8.3f}s  {mb / dt:7.1f} MB/s  x{base / dt:.2f} vs plain")
+
+        base = _best_of(args.repeat, lambda: _scan(path, 0))
+        report("plain", base, base)
+        for codec in args.codec:
+            cpath = _compress(path, codec)
+            ratio = os.path.getsize(cpath) / 1e6 / mb
+            print(f"{codec}: {ratio:.1%} of plain size")
+            for depth in args.depth:
+                dt = _best_of(args.repeat, lambda: _scan(cpath, depth))
+                report(f"  {codec} read_ahead={depth}", dt, base)
+
+
+if __name__ == "__main__":
+    main()
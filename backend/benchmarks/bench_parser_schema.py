@@ -0,0 +1,68 @@
+# Compares MyCSVParser's per-cell inference path against explicit schemas
+# and lazy rows on a synthetic events.csv-shaped file.
+#
+#   python -m benchmarks.bench_parser_schema --rows 200000
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from my_sql_engine import EVENTS_SCHEMA, MyCSVParser
+
+from .datagen import write_events_csv
+
+FULL_SCHEMA = {
+    "ID": int, "Name": str, "Sex": str, "Age": int, "Height": float, "Weight": float,
+    "Team": str, "NOC": str, "Games": str, "Year": int, "Season": str, "City": str,
+    "Sport": str, "Event": str, "Medal": str,
+}
+
+
+def _time(label: str, fn) -> float:
+    t0 = time.perf_counter()
+    n = fn()
+    dt = time.perf_counter() - t0
+    print(f"{label:<32} {dt:8.3f}s  ({n} rows)")
+    return dt
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200_000)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "events.csv")
+        write_events_csv(path, args.rows)
+
+        def inferred():
+            return sum(1 for _ in MyCSVParser(path).iter_rows())
+
+        def schema_full():
+            return sum(1 for _ in MyCSVParser(path, schema=FULL_SCHEMA).iter_rows())
+
+        def schema_events():
+            return sum(1 for _ in MyCSVParser(path, schema=EVENTS_SCHEMA).iter_rows())
+
+        def lazy_two_cols():
+            n = 0
+            for row in MyCSVParser(path, schema=FULL_SCHEMA, lazy=True).iter_rows():
+                if row["Medal"] is not None and row["Year"] >= 1900:
+                    n += 1
+            return n
+
+        base = _time("inferred (per-cell exceptions)", inferred)
+        for label, fn in (
+            ("schema (all columns)", schema_full),
+            ("schema (EVENTS_SCHEMA)", schema_events),
+            ("lazy + schema, 2 cols read", lazy_two_cols),
+        ):
+            dt = _time(label, fn)
+            print(f"{'':<32} speedup x{base / dt:.2f}")
+
+
+if __name__ == "__main__":
+    main()
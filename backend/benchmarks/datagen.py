@@ -0,0 +1,163 @@
+# Deterministic generator for events.csv-shaped data (the Kaggle
+# "120 years of Olympic history" athlete_events layout).
+#
+#   python -m benchmarks.datagen --rows 1000000 --out /tmp/events_1m.csv
+import argparse
+import os
+import random
+from typing import List, Tuple
+
+EVENTS_HEADER = [
+    "ID", "Name", "Sex", "Age", "Height", "Weight", "Team", "NOC",
+    "Games", "Year", "Season", "City", "Sport", "Event", "Medal",
+]
+
+SIZES = {
+    "100k": 100_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000,
+}
+
+# (NOC, team name, relative weight): roughly the share of athlete rows per NOC
+# in the real data, with a long tail of small delegations.
+NOCS: List[Tuple[str, str, int]] = [
+    ("USA", "United States", 180), ("FRA", "France", 120), ("GBR", "Great Britain", 120),
+    ("ITA", "Italy", 100), ("GER", "Germany", 95), ("CAN", "Canada", 93),
+    ("JPN", "Japan", 84), ("SWE", "Sweden", 83), ("AUS", "Australia", 77),
+    ("HUN", "Hungary", 60), ("POL", "Poland", 56), ("SUI", "Switzerland", 54),
+    ("NED", "Netherlands", 53), ("URS", "Soviet Union", 50), ("FIN", "Finland", 50),
+    ("ESP", "Spain", 48), ("CHN", "China", 46), ("RUS", "Russia", 45),
+    ("AUT", "Austria", 44), ("NOR", "Norway", 44), ("KOR", "South Korea", 40),
+    ("ROU", "Romania", 35), ("BRA", "Brazil", 35), ("CZE", "Czech Republic", 30),
+    ("BEL", "Belgium", 28), ("ARG", "Argentina", 26), ("DEN", "Denmark", 26),
+    ("BUL", "Bulgaria", 25), ("GRE", "Greece", 24), ("MEX", "Mexico", 24),
+    ("NZL", "New Zealand", 22), ("GDR", "East Germany", 18), ("FRG", "West Germany", 18),
+    ("IND", "India", 16), ("CUB", "Cuba", 15), ("KEN", "Kenya", 10),
+    ("JAM", "Jamaica", 10), ("ETH", "Ethiopia", 7), ("NGR", "Nigeria", 9),
+    ("EGY", "Egypt", 12), ("TUR", "Turkey", 14), ("IRI", "Iran", 9),
+    ("RSA", "South Africa", 15), ("UKR", "Ukraine", 14), ("KAZ", "Kazakhstan", 10),
+    ("IRL", "Ireland", 12), ("POR", "Portugal", 12), ("CHI", "Chile", 8),
+    ("ISV", "Virgin Islands, US", 3), ("IOA", "Individual Olympic Athletes", 1),
+    ("AFG", "Afghanistan", 2), ("FIJ", "Fiji", 2), ("TGA", "Tonga", 1),
+]
+
+# (sport, summer?, relative weight, events)
+SPORTS: List[Tuple[str, bool, int, List[str]]] = [
+    ("Athletics", True, 140, ["100 metres", "200 metres", "Marathon", "Long Jump", "4 x 100 metres Relay"]),
+    ("Gymnastics", True, 100, ["Individual All-Around", "Team All-Around", "Floor Exercise"]),
+    ("Swimming", True, 85, ["100 metres Freestyle", "200 metres Butterfly", "4 x 100 metres Medley Relay"]),
+    ("Shooting", True, 40, ["Small-Bore Rifle, Prone, 50 metres", "Trap"]),
+    ("Cycling", True, 38, ["Road Race, Individual", "Team Pursuit, 4,000 metres"]),
+    ("Fencing", True, 35, ["Foil, Individual", "Sabre, Team"]),
+    ("Rowing", True, 34, ["Single Sculls", "Coxed Eights"]),
+    ("Football", True, 20, ["Football"]),
+    ("Hockey", True, 16, ["Hockey"]),
+    ("Wrestling", True, 25, ["Freestyle Lightweight", "Greco-Roman Heavyweight"]),
+    ("Boxing", True, 22, ["Flyweight", "Heavyweight"]),
+    ("Judo", True, 12, ["Half-Lightweight", "Open Class"]),
+    ("Cross Country Skiing", False, 35, ["10 kilometres", "4 x 10 kilometres Relay"]),
+    ("Alpine Skiing", False, 33, ["Downhill", "Slalom"]),
+    ("Speed Skating", False, 22, ["500 metres", "Team Pursuit (6 laps)"]),
+    ("Ice Hockey", False, 22, ["Ice Hockey"]),
+    ("Biathlon", False, 18, ["20 kilometres", "4 x 7.5 kilometres Relay"]),
+    ("Figure Skating", False, 10, ["Singles", "Pairs"]),
+]
+
+SUMMER_GAMES = [y for y in range(1896, 2017, 4) if y not in (1916, 1940, 1944)] + [1906]
+WINTER_GAMES = [y for y in range(1924, 1993, 4) if y not in (1940, 1944)] + list(range(1994, 2015, 4))
+SUMMER_CITIES = ["Athina", "Paris", "London", "Los Angeles", "Sydney", "Beijing", "Rio de Janeiro"]
+WINTER_CITIES = ["Chamonix", "Sankt Moritz", "Lake Placid", "Lillehammer", "Sochi"]
+
+FIRST_NAMES = ["John", "Mary", "Jean", "Anna", "Li", "Olga", "Carlos", "Yuki", "Ahmed", "Ingrid"]
+LAST_NAMES = ["Smith", "Müller", "Wang", "Ivanova", "García", "Rossi", "Tanaka", "Johansson", "Kim"]
+
+
+def _quote(value: str) -> str:
+    if '"' in value or "," in value:
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def iter_event_lines(n_rows: int, seed: int = 0):
+    rnd = random.Random(seed)
+    noc_w = [n[2] for n in NOCS]
+    summer_sports = [s for s in SPORTS if s[1]]
+    winter_sports = [s for s in SPORTS if not s[1]]
+    summer_w = [s[2] for s in summer_sports]
+    winter_w = [s[2] for s in winter_sports]
+
+    # athletes compete in several events, so IDs/names repeat across rows
+    n_athletes = max(1, n_rows // 2)
+    for _ in range(n_rows):
+        athlete = rnd.randrange(n_athletes)
+        arnd = random.Random(seed * 1_000_003 + athlete)
+        first = arnd.choice(FIRST_NAMES)
+        last = arnd.choice(LAST_NAMES)
+        if athlete % 11 == 0:
+            name = f'{first} "{last[:3]}" {last}'
+        elif athlete % 7 == 0:
+            name = f"{last}, {first}"
+        else:
+            name = f"{first} {last} {athlete % 997}"
+        sex = "F" if athlete % 3 == 0 else "M"
+        noc, team, _ = rnd.choices(NOCS, noc_w)[0]
+
+        if rnd.random() < 0.8:
+            season, year = "Summer", rnd.choice(SUMMER_GAMES)
+            sport, _, _, events = rnd.choices(summer_sports, summer_w)[0]
+            city = SUMMER_CITIES[year % len(SUMMER_CITIES)]
+        else:
+            season, year = "Winter", rnd.choice(WINTER_GAMES)
+            sport, _, _, events = rnd.choices(winter_sports, winter_w)[0]
+            city = WINTER_CITIES[year % len(WINTER_CITIES)]
+        event = f"{sport} {'Women' if sex == 'F' else 'Men'}'s {rnd.choice(events)}"
+
+        r = rnd.random()
+        medal = "Gold" if r < 0.049 else "Silver" if r < 0.097 else "Bronze" if r < 0.146 else "NA"
+        age = "NA" if rnd.random() < 0.03 else str(rnd.randint(14, 45))
+        height = "NA" if year < 1960 and rnd.random() < 0.6 else str(rnd.randint(150, 210))
+        weight = "NA" if year < 1960 and rnd.random() < 0.6 else str(rnd.choice([rnd.randint(45, 120), rnd.randint(45, 120) + 0.5]))
+
+        yield ",".join([
+            str(athlete + 1), _quote(name), sex, age, height, weight, _quote(team), noc,
+            f"{year} {season}", str(year), season, city, sport, _quote(event), medal,
+        ])
+
+
+def write_events_csv(path: str, n_rows: int, seed: int = 0) -> str:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        f.write(",".join(EVENTS_HEADER) + "\n")
+        for line in iter_event_lines(n_rows, seed):
+            f.write(line + "\n")
+    os.replace(tmp, path)
+    return path
+
+
+def cached_events_csv(data_dir: str, n_rows: int, seed: int = 0) -> str:
+    # generated files are reused across runs; the name pins rows and seed
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"events_{n_rows}_s{seed}.csv")
+    if not os.path.exists(path):
+        write_events_csv(path, n_rows, seed)
+    return path
+
+
+def parse_size(value: str) -> int:
+    key = value.strip().lower()
+    if key in SIZES:
+        return SIZES[key]
+    return int(key.replace("_", ""))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Generate a synthetic events.csv")
+    ap.add_argument("--rows", default="100k", help="row count or one of: " + ", ".join(SIZES))
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", required=True)
+    args = ap.parse_args()
+    write_events_csv(args.out, parse_size(args.rows), args.seed)
+
+
+if __name__ == "__main__":
+    main()
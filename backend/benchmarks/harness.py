@@ -0,0 +1,98 @@
+# Timing, result files and baseline comparison shared by the benchmark suites.
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class BenchResults:
+    def __init__(self, meta: Optional[Dict[str, Any]] = None):
+        self.meta: Dict[str, Any] = {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        self.meta.update(meta or {})
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def run(
+        self,
+        name: str,
+        fn: Callable[[], Any],
+        repeat: int = 3,
+        warmup: int = 0,
+    ) -> Dict[str, Any]:
+        # fn's return value (if an int) is recorded as the output row count
+        for _ in range(warmup):
+            fn()
+        times: List[float] = []
+        out = None
+        for _ in range(repeat):
+            gc.collect()
+            t0 = time.perf_counter()
+            out = fn()
+            times.append(time.perf_counter() - t0)
+        entry = {
+            "median_s": statistics.median(times),
+            "min_s": min(times),
+            "max_s": max(times),
+            "repeat": repeat,
+        }
+        if isinstance(out, int):
+            entry["rows_out"] = out
+        self.results[name] = entry
+        print(f"{name:<44} {entry['median_s'] * 1000:10.1f} ms  (min {entry['min_s'] * 1000:.1f})")
+        return entry
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"meta": self.meta, "results": self.results}
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float = 0.10,
+) -> List[Dict[str, Any]]:
+    # one entry per benchmark present in both runs; status is "regression" when
+    # the median got slower than baseline by more than threshold (0.10 = 10%)
+    rows: List[Dict[str, Any]] = []
+    cur = current.get("results", {})
+    base = baseline.get("results", {})
+    for name in sorted(set(cur) & set(base)):
+        b = base[name]["median_s"]
+        c = cur[name]["median_s"]
+        ratio = c / b if b > 0 else float("inf")
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 - threshold:
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append({"name": name, "baseline_s": b, "current_s": c, "ratio": ratio, "status": status})
+    return rows
+
+
+def print_comparison(rows: List[Dict[str, Any]]) -> int:
+    regressions = 0
+    for r in rows:
+        flag = {"regression": "  <-- REGRESSION", "improvement": "  (faster)"}.get(r["status"], "")
+        print(
+            f"{r['name']:<44} {r['baseline_s'] * 1000:10.1f} -> {r['current_s'] * 1000:10.1f} ms"
+            f"  x{r['ratio']:.2f}{flag}"
+        )
+        regressions += r["status"] == "regression"
+    return regressions
@@ -0,0 +1,405 @@
+# Concurrent load test: N virtual dashboard users replay a scripted traffic mix
+# against the FastAPI app and the run reports throughput, p50/p95/p99 latency
+# and error rate per endpoint and per time interval.
+#
+#   python -m benchmarks.loadtest --users 50 --duration 30 --mix dashboard --out bench/load.json
+#   python -m benchmarks.loadtest --server uvicorn --users 50 --baseline bench/load.json
+#
+# --server inprocess drives the ASGI app through httpx in this process (sync
+# handlers still run on Starlette's threadpool, but share the GIL with the
+# load generator); --server uvicorn starts a local single-process uvicorn on
+# the same synthetic data, which is closer to a deployment. Everything runs
+# offline against the cached synthetic events.csv (see datagen).
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from .datagen import SIZES, SUMMER_GAMES, WINTER_GAMES, cached_events_csv, parse_size
+from .harness import BenchResults, compare, load_results, print_comparison
+from .macro import configure_app
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data")
+
+NOCS = ["USA", "GBR", "FRA", "GER", "ITA", "CAN", "JPN", "SWE", "AUS", "CHN", "RUS", "KEN"]
+SPORTS = ["Athletics", "Swimming", "Rowing", "Fencing", "Alpine Skiing", "Ice Hockey"]
+NAMES = ["smith", "wang", "anna", "rossi", "kim", "olga"]
+RECENT_GAMES = [y for y in SUMMER_GAMES + WINTER_GAMES if y >= 1960]
+
+
+# ---------- traffic ----------
+# A request template takes the user's RNG and returns a URL. Endpoint names
+# group the per-endpoint statistics.
+def _leaderboard(rnd: random.Random) -> str:
+    if rnd.random() < 0.3:
+        return f"/api/leaderboard?top_n={rnd.choice([10, 20, 50])}"
+    return f"/api/leaderboard?year={rnd.choice(RECENT_GAMES)}&top_n=20"
+
+
+def _efficiency(rnd: random.Random) -> str:
+    sort_by = rnd.choice(["Medals%20per%20million%20people", "Medals%20per%20billion%20GDP", "Total%20medals"])
+    return f"/api/efficiency?year={rnd.choice(RECENT_GAMES)}&sort_by={sort_by}"
+
+
+def _search(rnd: random.Random) -> str:
+    params = [f"page={rnd.randint(1, 3)}"]
+    if rnd.random() < 0.5:
+        params.append(f"name={rnd.choice(NAMES)}")
+    if rnd.random() < 0.4:
+        params.append(f"noc={rnd.choice(NOCS)}")
+    if rnd.random() < 0.3:
+        params.append(f"sport={rnd.choice(SPORTS).replace(' ', '%20')}")
+    if rnd.random() < 0.3:
+        y = rnd.choice(RECENT_GAMES)
+        params.append(f"year_min={y}&year_max={y + 8}")
+    if rnd.random() < 0.3:
+        params.append("medal_only=false")
+    return "/api/athletes/search?" + "&".join(params)
+
+
+def _timeseries(rnd: random.Random) -> str:
+    return f"/api/medals/timeseries?noc={','.join(rnd.sample(NOCS, 3))}"
+
+
+def _fixed(url: str) -> Callable[[random.Random], str]:
+    return lambda rnd: url
+
+
+# mix name -> [(endpoint name, weight, template)]
+MIXES: Dict[str, List[Tuple[str, int, Callable[[random.Random], str]]]] = {
+    # a dashboard page load: mostly the leaderboard and efficiency views plus searches
+    "dashboard": [
+        ("leaderboard", 35, _leaderboard),
+        ("efficiency", 25, _efficiency),
+        ("athletes_search", 25, _search),
+        ("sports", 10, _fixed("/api/sports")),
+        ("medals_timeseries", 5, _timeseries),
+    ],
+    "search": [
+        ("athletes_search", 85, _search),
+        ("sports", 15, _fixed("/api/sports")),
+    ],
+    "analytics": [
+        ("leaderboard", 40, _leaderboard),
+        ("efficiency", 40, _efficiency),
+        ("medals_timeseries", 20, _timeseries),
+    ],
+}
+
+
+# ---------- load generation ----------
+class Sample:
+    __slots__ = ("endpoint", "start", "latency", "status", "error")
+
+    def __init__(self, endpoint: str, start: float, latency: float, status: int, error: Optional[str]):
+        self.endpoint = endpoint
+        self.start = start
+        self.latency = latency
+        self.status = status
+        self.error = error
+
+
+async def _user(
+    client: Any,
+    uid: int,
+    mix: List[Tuple[str, int, Callable[[random.Random], str]]],
+    t0: float,
+    start_at: float,
+    stop_at: float,
+    think: float,
+    seed: int,
+    samples: List[Sample],
+) -> None:
+    rnd = random.Random(seed * 1_000_003 + uid)
+    names = [m[0] for m in mix]
+    weights = [m[1] for m in mix]
+    templates = {m[0]: m[2] for m in mix}
+    await asyncio.sleep(max(0.0, start_at - time.perf_counter()))
+    while time.perf_counter() < stop_at:
+        endpoint = rnd.choices(names, weights)[0]
+        url = templates[endpoint](rnd)
+        started = time.perf_counter()
+        status, error = 0, None
+        try:
+            resp = await client.get(url)
+            status = resp.status_code
+            if status >= 400:
+                error = f"HTTP {status}"
+        except Exception as e:  # timeouts, connection resets, app errors
+            error = type(e).__name__
+        samples.append(Sample(endpoint, started - t0, time.perf_counter() - started, status, error))
+        if think:
+            await asyncio.sleep(rnd.expovariate(1.0 / think))
+
+
+async def _drive(client: Any, args: argparse.Namespace) -> Tuple[List[Sample], float]:
+    mix = MIXES[args.mix]
+    samples: List[Sample] = []
+    t0 = time.perf_counter()
+    stop_at = t0 + args.duration
+    users = [
+        # users join evenly over the ramp-up period
+        _user(client, uid, mix, t0, t0 + args.ramp * uid / args.users, stop_at, args.think, args.seed, samples)
+        for uid in range(args.users)
+    ]
+    await asyncio.gather(*users)
+    return samples, time.perf_counter() - t0
+
+
+async def _warm(client: Any, args: argparse.Namespace) -> None:
+    # one request per endpoint of the mix so cold caches (medal cube, shared
+    # column files) are built before the clock starts
+    rnd = random.Random(args.seed)
+    for endpoint, _, template in MIXES[args.mix]:
+        resp = await client.get(template(rnd))
+        print(f"warm-up {endpoint}: HTTP {resp.status_code}")
+
+
+class _Lifespan:
+    # runs the app's ASGI lifespan (startup hooks such as attaching the shared
+    # tables), which httpx.ASGITransport does not do
+    def __init__(self, app: Any):
+        self.app = app
+        self._inbox: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self._outbox: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _send_and_wait(self, event: str) -> None:
+        await self._inbox.put({"type": f"lifespan.{event}"})
+        msg = await self._outbox.get()
+        if msg["type"] != f"lifespan.{event}.complete":
+            raise RuntimeError(f"lifespan {event} failed: {msg.get('message', msg['type'])}")
+
+    async def __aenter__(self) -> "_Lifespan":
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}}
+        self._task = asyncio.create_task(self.app(scope, self._inbox.get, self._outbox.put))
+        await self._send_and_wait("startup")
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self._send_and_wait("shutdown")
+        await self._task
+
+
+async def run_inprocess(events_csv: str, args: argparse.Namespace) -> Tuple[List[Sample], float]:
+    import httpx
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        app = configure_app(events_csv, state_dir)
+        transport = httpx.ASGITransport(app=app)
+        async with _Lifespan(app), httpx.AsyncClient(
+            transport=transport, base_url="http://loadtest", timeout=args.timeout
+        ) as client:
+            await _warm(client, args)
+            return await _drive(client, args)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run_uvicorn(events_csv: str, args: argparse.Namespace) -> Tuple[List[Sample], float]:
+    import httpx
+
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as state_dir:
+        cmd = [
+            sys.executable, "-m", "benchmarks.loadtest", "--serve", str(port),
+            "--events-csv", events_csv, "--state-dir", state_dir,
+        ]
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        server = subprocess.Popen(cmd, cwd=backend_dir)
+        try:
+            limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+            async with httpx.AsyncClient(
+                base_url=f"http://127.0.0.1:{port}", timeout=args.timeout, limits=limits
+            ) as client:
+                deadline = time.perf_counter() + 60
+                while True:
+                    try:
+                        if (await client.get("/api/health")).status_code == 200:
+                            break
+                    except httpx.TransportError:
+                        pass
+                    if server.poll() is not None or time.perf_counter() > deadline:
+                        raise RuntimeError("uvicorn did not come up")
+                    await asyncio.sleep(0.2)
+                await _warm(client, args)
+                return await _drive(client, args)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def serve(port: int, events_csv: str, state_dir: str) -> None:
+    import uvicorn
+
+    app = configure_app(events_csv, state_dir)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+# ---------- reporting ----------
+def _percentile(ordered: List[float], q: float) -> float:
+    # nearest-rank percentile of an ascending list
+    if not ordered:
+        return 0.0
+    k = max(0, min(len(ordered) - 1, math.ceil(q * len(ordered) / 100.0) - 1))
+    return ordered[k]
+
+
+def _summary(samples: List[Sample], elapsed: float) -> Dict[str, Any]:
+    lat = sorted(s.latency for s in samples)
+    errors = sum(1 for s in samples if s.error is not None)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": errors / len(samples) if samples else 0.0,
+        "throughput_rps": len(samples) / elapsed if elapsed > 0 else 0.0,
+        "median_s": _percentile(lat, 50),
+        "p95_s": _percentile(lat, 95),
+        "p99_s": _percentile(lat, 99),
+        "max_s": lat[-1] if lat else 0.0,
+        "mean_s": sum(lat) / len(lat) if lat else 0.0,
+    }
+
+
+def summarize(
+    samples: List[Sample], elapsed: float, duration: float, interval: float
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    # per-endpoint (plus "all") summaries over the whole run (including the
+    # drain of requests still in flight at `duration`) and a timeline of
+    # `interval`-second buckets by request start time
+    by_endpoint: Dict[str, List[Sample]] = {}
+    for s in samples:
+        by_endpoint.setdefault(s.endpoint, []).append(s)
+    results = {f"load.{name}": _summary(group, elapsed) for name, group in sorted(by_endpoint.items())}
+    results["load.all"] = _summary(samples, elapsed)
+    error_kinds: Dict[str, int] = {}
+    for s in samples:
+        if s.error is not None:
+            error_kinds[s.error] = error_kinds.get(s.error, 0) + 1
+    results["load.all"]["error_kinds"] = error_kinds
+
+    buckets: Dict[int, List[Sample]] = {}
+    for s in samples:
+        buckets.setdefault(int(s.start // interval), []).append(s)
+    timeline = []
+    for b in range(math.ceil(duration / interval)):
+        group = buckets.get(b, [])
+        entry = _summary(group, interval)
+        timeline.append({
+            "t_s": b * interval,
+            "requests": entry["requests"],
+            "throughput_rps": entry["throughput_rps"],
+            "error_rate": entry["error_rate"],
+            "p50_s": entry["median_s"],
+            "p95_s": entry["p95_s"],
+            "p99_s": entry["p99_s"],
+        })
+    return results, timeline
+
+
+def print_report(results: Dict[str, Any], timeline: List[Dict[str, Any]]) -> None:
+    print(f"{'endpoint':<28} {'reqs':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'err%':>6}")
+    for name, r in results.items():
+        print(
+            f"{name:<28} {r['requests']:>7} {r['throughput_rps']:>8.1f} {r['median_s'] * 1000:>9.1f}"
+            f" {r['p95_s'] * 1000:>9.1f} {r['p99_s'] * 1000:>9.1f} {r['max_s'] * 1000:>9.1f}"
+            f" {r['error_rate'] * 100:>6.2f}"
+        )
+    if results["load.all"]["error_kinds"]:
+        print("errors:", ", ".join(f"{k} x{v}" for k, v in sorted(results["load.all"]["error_kinds"].items())))
+    print(f"\n{'t (s)':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'err%':>6}")
+    for t in timeline:
+        print(
+            f"{t['t_s']:>7.0f} {t['throughput_rps']:>8.1f} {t['p50_s'] * 1000:>9.1f}"
+            f" {t['p95_s'] * 1000:>9.1f} {t['p99_s'] * 1000:>9.1f} {t['error_rate'] * 100:>6.2f}"
+        )
+
+
+def _tail_view(data: Dict[str, Any], key: str) -> Dict[str, Any]:
+    # results with `key` as median_s, so harness.compare() can diff tail latencies
+    return {"results": {f"{n} {key[:-2]}": {"median_s": r[key]} for n, r in data.get("results", {}).items()}}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="OlympiaScope concurrent load test")
+    ap.add_argument("--rows", default="100k", help="row count or one of: " + ", ".join(SIZES))
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="where generated CSVs are cached")
+    ap.add_argument("--server", choices=["inprocess", "uvicorn"], default="inprocess")
+    ap.add_argument("--mix", choices=sorted(MIXES), default="dashboard")
+    ap.add_argument("--users", type=int, default=50, help="concurrent virtual users")
+    ap.add_argument("--duration", type=float, default=30.0, help="seconds of load after start")
+    ap.add_argument("--ramp", type=float, default=5.0, help="seconds over which users join")
+    ap.add_argument("--think", type=float, default=0.5, help="mean think time between a user's requests (s)")
+    ap.add_argument("--timeout", type=float, default=60.0, help="per-request client timeout (s)")
+    ap.add_argument("--interval", type=float, default=5.0, help="timeline bucket width (s)")
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--baseline", help="earlier results JSON to compare p50/p95/p99 against")
+    ap.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown (0.10 = 10%%)")
+    # internal: run the app under uvicorn (used by --server uvicorn)
+    ap.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    ap.add_argument("--events-csv", help=argparse.SUPPRESS)
+    ap.add_argument("--state-dir", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.events_csv, args.state_dir)
+        return 0
+
+    n_rows = parse_size(args.rows)
+    events_csv = cached_events_csv(args.data_dir, n_rows, args.seed)
+    runner = run_uvicorn if args.server == "uvicorn" else run_inprocess
+    print(f"{args.users} users, mix={args.mix}, {args.duration:g}s on {n_rows} rows ({args.server})")
+    samples, elapsed = asyncio.run(runner(events_csv, args))
+    results, timeline = summarize(samples, elapsed, args.duration, args.interval)
+    print_report(results, timeline)
+
+    run = BenchResults({
+        "rows": n_rows, "seed": args.seed, "suite": "load", "server": args.server, "mix": args.mix,
+        "users": args.users, "duration_s": args.duration, "ramp_s": args.ramp, "think_s": args.think,
+    })
+    run.results = results
+    current = {**run.to_dict(), "timeline": timeline}
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        baseline = load_results(args.baseline)
+        for k in ("rows", "mix", "users", "server"):
+            if baseline.get("meta", {}).get(k) != current["meta"][k]:
+                print(f"warning: baseline was recorded with a different {k}")
+        regressions = 0
+        for key in ("median_s", "p95_s", "p99_s"):
+            print()
+            regressions += print_comparison(
+                compare(_tail_view(current, key), _tail_view(baseline, key), args.threshold)
+            )
+        for name, r in current["results"].items():
+            before = baseline.get("results", {}).get(name, {}).get("error_rate")
+            if before is not None and r["error_rate"] > before + 0.01:
+                print(f"{name}: error rate {before:.2%} -> {r['error_rate']:.2%}  <-- REGRESSION")
+                regressions += 1
+        if regressions:
+            print(f"{regressions} regression(s) over {args.threshold:.0%} (or +1% errors)")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
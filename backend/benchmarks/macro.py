@@ -0,0 +1,68 @@
+# Macro-benchmarks: FastAPI endpoints through the in-process test client,
+# pointed at a synthetic events file.
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from .harness import BenchResults
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = [
+    ("api.health", "/api/health"),
+    ("api.preview_events", "/api/preview/events?limit=50"),
+    ("api.sports", "/api/sports"),
+    ("api.athletes_search", "/api/athletes/search?name=smith&page=2"),
+    ("api.athletes_search_broad", "/api/athletes/search?medal_only=false"),
+    ("api.leaderboard", "/api/leaderboard"),
+    ("api.leaderboard_year", "/api/leaderboard?year=2016"),
+    ("api.medals_timeseries", "/api/medals/timeseries?noc=USA,GBR"),
+    ("api.athletes_per_noc", "/api/athletes/per-noc"),
+    ("api.efficiency", "/api/efficiency?year=2016"),
+    ("api.efficiency_gdp", "/api/efficiency?year=1992&season=Summer&sort_by=Medals%20per%20billion%20GDP"),
+    ("api.join_demo", "/api/join-demo"),
+]
+
+
+def configure_app(events_csv: str, state_dir: str):
+    # Points main.py and the engine's module-level paths at the benchmark data;
+    # the dimension CSVs are the real ones shipped in backend/.
+    import main
+    import my_sql_engine
+
+    main.EVENTS_CSV = events_csv
+    main.EVENTS_PARTITIONED = os.path.join(state_dir, "events")
+    main.STATE_DIR = state_dir
+    # the medal cube and shared tables were bound to the real paths at import
+    main.CUBE.events_csv = events_csv
+    main.CUBE.state_path = os.path.join(state_dir, "medal_cube.pkl")
+    main.SHARED.directory = os.path.join(state_dir, "shared")
+    main.SHARED.register("events", events_csv, schema=my_sql_engine.EVENTS_SCHEMA)
+    my_sql_engine.EVENTS_CSV = events_csv
+    my_sql_engine.NOC_COUNTRYCODE_CSV = os.path.join(BACKEND_DIR, "noc_to_countrycode.csv")
+    my_sql_engine.COUNTRY_YEAR_STATS_CSV = os.path.join(BACKEND_DIR, "country_year_stats.csv")
+    return main.app
+
+
+def run_macro(results: BenchResults, events_csv: str, repeat: int = 3) -> None:
+    try:
+        from fastapi.testclient import TestClient
+    except ImportError as e:  # httpx is needed by the test client
+        print(f"skipping endpoint benchmarks: {e}")
+        return
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        client = TestClient(configure_app(events_csv, state_dir))
+
+        def call(url: str):
+            def fn():
+                resp = client.get(url)
+                resp.raise_for_status()
+                body = resp.json()
+                return len(body) if isinstance(body, list) else None
+            return fn
+
+        for name, url in ENDPOINTS:
+            results.run(name, call(url), repeat)
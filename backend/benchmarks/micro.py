@@ -0,0 +1,108 @@
+# Micro-benchmarks: one entry per engine operator on a synthetic events file.
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from my_sql_engine import (
+    EVENTS_SCHEMA,
+    MyCSVParser,
+    MyDataFrame,
+    group_by_streaming,
+    iter_filter_project_streaming,
+    iter_join_streaming_small_big,
+    iter_order_by_streaming,
+    medals_per_noc_year_streaming,
+)
+
+from .harness import BenchResults
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COUNTRIES_CSV = os.path.join(BACKEND_DIR, "countries.csv")
+CHUNK_SIZE = 50_000
+
+
+def _count(it) -> int:
+    return sum(1 for _ in it)
+
+
+def run_micro(results: BenchResults, events_csv: str, repeat: int = 3) -> None:
+    countries = MyDataFrame.from_rows(MyCSVParser(COUNTRIES_CSV).iter_rows())
+
+    # --- parsing ---
+    results.run("parse.iter_rows", lambda: _count(MyCSVParser(events_csv).iter_rows()), repeat)
+    results.run(
+        "parse.iter_rows_schema",
+        lambda: _count(MyCSVParser(events_csv, schema=EVENTS_SCHEMA).iter_rows()),
+        repeat,
+    )
+    results.run(
+        "parse.iter_chunks",
+        lambda: sum(len(c) for c in MyCSVParser(events_csv, chunk_size=CHUNK_SIZE).iter_chunks()),
+        repeat,
+    )
+    results.run(
+        "parse.iter_batches",
+        lambda: sum(b.nrows() for b in MyCSVParser(events_csv, chunk_size=CHUNK_SIZE).iter_batches()),
+        repeat,
+    )
+    rows = list(MyCSVParser(events_csv).iter_rows())
+    results.run("frame.from_rows", lambda: MyDataFrame.from_rows(rows).nrows(), repeat)
+
+    # --- in-memory operators ---
+    df = MyDataFrame.from_rows(rows)
+    del rows
+    results.run("frame.filter", lambda: df.filter(lambda r: r["Medal"] is not None).nrows(), repeat)
+    results.run("frame.project", lambda: df.project(["NOC", "Year", "Medal"]).compact().nrows(), repeat)
+    results.run("frame.project_head", lambda: df.project(["NOC", "Year"]).head(20).compact().nrows(), repeat)
+    results.run(
+        "frame.group_by",
+        lambda: df.group_by(["NOC", "Year"], {"Medal": "count_col", "Age": "avg"}).nrows(),
+        repeat,
+    )
+    results.run("frame.join", lambda: df.join(countries, on_key="NOC", how="left").nrows(), repeat)
+    results.run(
+        "frame.order_by",
+        lambda: df.order_by([("Year", "desc"), ("NOC", "asc")]).compact().nrows(),
+        repeat,
+    )
+    del df
+
+    # --- streaming operators ---
+    results.run(
+        "stream.group_by",
+        lambda: group_by_streaming(
+            MyCSVParser(events_csv, chunk_size=CHUNK_SIZE), ["NOC"], {"Medal": "count_col"}
+        ).nrows(),
+        repeat,
+    )
+    results.run(
+        "stream.filter_project",
+        lambda: _count(
+            iter_filter_project_streaming(
+                MyCSVParser(events_csv, chunk_size=CHUNK_SIZE),
+                cond_func=lambda r: r["Medal"] is not None,
+                project_cols=["Name", "NOC", "Year", "Medal"],
+            )
+        ),
+        repeat,
+    )
+    results.run(
+        "stream.join_small_big",
+        lambda: _count(
+            iter_join_streaming_small_big(
+                MyCSVParser(events_csv, chunk_size=CHUNK_SIZE), countries, on_key="NOC"
+            )
+        ),
+        repeat,
+    )
+    results.run(
+        "stream.order_by",
+        lambda: _count(iter_order_by_streaming(MyCSVParser(events_csv, chunk_size=CHUNK_SIZE), by="ID")),
+        repeat,
+    )
+    results.run(
+        "stream.medals_per_noc_year",
+        lambda: medals_per_noc_year_streaming(events_csv=events_csv, chunk_size=CHUNK_SIZE).nrows(),
+        repeat,
+    )
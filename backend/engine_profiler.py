@@ -0,0 +1,233 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+import time
+import tracemalloc
+
+# Per-operator profiling for my_sql_engine.
+#
+# Operators are wrapped with @instrumented(name). While no query is being
+# profiled the wrapper costs one ContextVar lookup; inside profile_query()
+# every call records wall time, rows in/out, bytes read and (optionally)
+# peak traced memory into an OpProfile tree. Repeated calls of the same
+# operator under the same parent (e.g. from_rows once per chunk) are merged
+# into one node with a call count.
+#
+# Memory peaks come from tracemalloc, whose peak counter is process-wide:
+# profile_query(trace_memory=True) starts tracing if needed and leaves it on,
+# and memory-profiled queries must not overlap (callers serialize them) or
+# they reset each other's peaks.
+
+_current_op: ContextVar[Optional["OpProfile"]] = ContextVar("olympiascope_current_op", default=None)
+
+
+class OpProfile:
+    def __init__(self, name: str, trace_memory: bool = False):
+        self.name = name
+        self.trace_memory = trace_memory
+        self.calls = 0
+        self.wall_s = 0.0
+        # time spent in next() of generators created elsewhere (e.g. from_rows
+        # draining csv.iter_rows); already counted on the generator's own node
+        self.foreign_s = 0.0
+        self.rows_in: Optional[int] = None
+        self.rows_out: Optional[int] = None
+        self.bytes_read = 0
+        self.peak_mem_bytes: Optional[int] = None
+        self.children: Dict[str, "OpProfile"] = {}
+        # tracemalloc bookkeeping for the segment currently running
+        self._mem_start = 0
+        self._peak_abs = 0
+
+    def child(self, name: str) -> "OpProfile":
+        node = self.children.get(name)
+        if node is None:
+            node = OpProfile(name, self.trace_memory)
+            self.children[name] = node
+        node.calls += 1
+        return node
+
+    def add_rows_in(self, n: int) -> None:
+        self.rows_in = (self.rows_in or 0) + n
+
+    def add_rows_out(self, n: int) -> None:
+        self.rows_out = (self.rows_out or 0) + n
+
+    def self_s(self) -> float:
+        nested = sum(c.wall_s - c.foreign_s for c in self.children.values())
+        return max(0.0, self.wall_s - nested - self.foreign_s)
+
+    def walk(self, depth: int = 0) -> Iterator[tuple]:
+        yield depth, self
+        for c in self.children.values():
+            yield from c.walk(depth + 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "op": self.name,
+            "calls": self.calls,
+            "wall_ms": round(self.wall_s * 1000, 3),
+            "self_ms": round(self.self_s() * 1000, 3),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "bytes_read": self.bytes_read,
+            "peak_mem_bytes": self.peak_mem_bytes,
+            "children": [c.to_dict() for c in self.children.values()],
+        }
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for depth, node in self.walk():
+            parts = [
+                f"{'  ' * depth}{node.name}",
+                f"calls={node.calls}",
+                f"wall={node.wall_s * 1000:.1f}ms",
+                f"self={node.self_s() * 1000:.1f}ms",
+            ]
+            if node.rows_in is not None:
+                parts.append(f"rows_in={node.rows_in}")
+            if node.rows_out is not None:
+                parts.append(f"rows_out={node.rows_out}")
+            if node.bytes_read:
+                parts.append(f"bytes={node.bytes_read}")
+            if node.peak_mem_bytes is not None:
+                parts.append(f"peak_mem={node.peak_mem_bytes / 1024:.0f}KiB")
+            lines.append("  ".join(parts))
+        return "\n".join(lines)
+
+
+def current_op() -> Optional[OpProfile]:
+    return _current_op.get()
+
+
+# `outer` is the operator running when a segment starts; it is the tree parent
+# for plain calls but may differ for generator segments.
+def _enter(node: OpProfile, outer: Optional[OpProfile]):
+    if node.trace_memory and tracemalloc.is_tracing():
+        cur, peak = tracemalloc.get_traced_memory()
+        if outer is not None:
+            outer._peak_abs = max(outer._peak_abs, peak)
+        tracemalloc.reset_peak()
+        node._mem_start = cur
+        node._peak_abs = cur
+    return _current_op.set(node), time.perf_counter()
+
+
+def _exit(node: OpProfile, outer: Optional[OpProfile], entered) -> float:
+    token, t0 = entered
+    elapsed = time.perf_counter() - t0
+    node.wall_s += elapsed
+    _current_op.reset(token)
+    if node.trace_memory and tracemalloc.is_tracing():
+        _, peak = tracemalloc.get_traced_memory()
+        node._peak_abs = max(node._peak_abs, peak)
+        seg_peak = node._peak_abs - node._mem_start
+        node.peak_mem_bytes = max(node.peak_mem_bytes or 0, seg_peak)
+        if outer is not None:
+            outer._peak_abs = max(outer._peak_abs, node._peak_abs)
+    return elapsed
+
+
+def _count_rows(value: Any) -> Optional[int]:
+    if hasattr(value, "nrows") and not isinstance(value, type):
+        return value.nrows()
+    if isinstance(value, list):
+        return len(value)
+    return None
+
+
+def _profiled_iter(node: OpProfile, parent: OpProfile, it: Iterator[Any]) -> Iterator[Any]:
+    # time only the producer side: each next() is one profiled segment
+    try:
+        while True:
+            outer = _current_op.get()
+            entered = _enter(node, outer)
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            finally:
+                elapsed = _exit(node, outer, entered)
+                if outer is not None and outer is not parent:
+                    outer.foreign_s += elapsed
+            node.add_rows_out(len(item) if isinstance(item, list) else 1)
+            yield item
+    finally:
+        close = getattr(it, "close", None)
+        if close is not None:
+            close()
+
+
+def instrumented(name: str, streaming: bool = False) -> Callable:
+    # streaming=True for generator functions: the returned iterator is wrapped so
+    # rows_out counts yielded rows (chunks count their length)
+    def deco(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            parent = _current_op.get()
+            if parent is None:
+                return fn(*args, **kwargs)
+            node = parent.child(name)
+            for a in args:
+                if hasattr(a, "nrows") and not isinstance(a, type):
+                    node.add_rows_in(a.nrows())
+            if streaming:
+                return _profiled_iter(node, parent, fn(*args, **kwargs))
+            entered = _enter(node, parent)
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                _exit(node, parent, entered)
+            n = _count_rows(result)
+            if n is not None:
+                node.add_rows_out(n)
+            return result
+
+        return wrapper
+
+    return deco
+
+
+def counting_lines(lines: Iterable[str]) -> Iterable[str]:
+    # attributes consumed characters (+1 per newline) to the running operator
+    node = _current_op.get()
+    if node is None:
+        return lines
+    return _count_line_bytes(node, lines)
+
+
+def _count_line_bytes(node: OpProfile, lines: Iterable[str]) -> Iterator[str]:
+    for line in lines:
+        node.bytes_read += len(line) + 1
+        yield line
+
+
+@contextmanager
+def profile_query(name: str = "query", trace_memory: bool = False) -> Iterator[OpProfile]:
+    # with profile_query("efficiency") as prof: ...; print(prof.render())
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    root = OpProfile(name, trace_memory)
+    root.calls = 1
+    parent = _current_op.get()
+    entered = _enter(root, parent)
+    try:
+        yield root
+    finally:
+        _exit(root, parent, entered)
+
+
+def explain_analyze(
+    fn: Callable[..., Any],
+    *args: Any,
+    trace_memory: bool = False,
+    **kwargs: Any,
+) -> tuple:
+    # runs fn(*args, **kwargs) under a profile; returns (result, OpProfile)
+    with profile_query("query", trace_memory=trace_memory) as prof:
+        result = fn(*args, **kwargs)
+        n = _count_rows(result)
+        if n is not None:
+            prof.add_rows_out(n)
+    return result, prof
@@ -0,0 +1,90 @@
+from typing import Callable, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl
+import hashlib
+import os
+
+# Conditional GET for read-only endpoints.
+#
+# Responses depend only on the request (path + query) and the dataset, whose
+# version is derived from the identity of the source files (see
+# file_version). The ETag is a strong hash of both, so a GET whose
+# If-None-Match already names it is answered 304 before the endpoint runs;
+# other 200 responses get the ETag and a Cache-Control header. The version is
+# taken again when the response starts, and a response whose data changed
+# mid-request gets no ETag.
+
+
+def file_version(paths: Iterable[str]) -> str:
+    # (inode, size, mtime) of every file; a replaced or rewritten file changes it
+    parts = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            parts.append(f"{path}:-")
+            continue
+        parts.append(f"{path}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}")
+    return "|".join(parts)
+
+
+def make_etag(version: str, path: str, query_string: bytes) -> str:
+    # the query is normalized so parameter order does not matter
+    query = sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True))
+    h = hashlib.blake2b(digest_size=16)
+    h.update(version.encode())
+    h.update(b"\0" + path.encode() + b"\0" + repr(query).encode())
+    return f'"{h.hexdigest()}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison: W/"x" matches "x"
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) == etag:
+            return True
+    return False
+
+
+class ConditionalGetMiddleware:
+    # pure ASGI: a 304 is sent without calling the app at all
+    def __init__(
+        self,
+        app,
+        version: Callable[[], str],
+        paths: Iterable[str],
+        max_age: int = 0,
+        bypass_header: Optional[bytes] = None,
+    ):
+        self.app = app
+        self.version = version
+        self.paths = frozenset(paths)
+        self.cache_control = f"public, max-age={max_age}, must-revalidate".encode()
+        # requests carrying this header always run (e.g. to collect a profile)
+        self.bypass_header = bypass_header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        version = self.version()
+        etag = make_etag(version, scope["path"], scope.get("query_string", b""))
+        if_none_match: Optional[str] = None
+        for name, value in scope["headers"]:
+            if name == b"if-none-match":
+                if_none_match = value.decode("latin-1")
+            elif name == self.bypass_header:
+                await self.app(scope, receive, send)
+                return
+        headers: List[Tuple[bytes, bytes]] = [(b"etag", etag.encode()), (b"cache-control", self.cache_control)]
+        if if_none_match is not None and etag_matches(if_none_match, etag):
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_etag(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                if self.version() == version:
+                    message = {**message, "headers": list(message.get("headers", [])) + headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
@@ -1,22 +1,60 @@
 
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import FastAPI, Query, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from typing import List, Optional, Dict, Any
+from glob import glob
+import asyncio
 import os
 import sys
+import time
+import tracemalloc
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from my_sql_engine import (
+    EVENTS_SCHEMA,
     MyCSVParser,
     MyDataFrame,
-    group_by_streaming_csv,
+    PartitionedDataset,
+    group_by_sampled,
+    group_by_streaming,
+    iter_filter_project_batches,
     medals_efficiency_for_year,
-    medals_per_noc_year_streaming,
+    profile_query,
 )
+from query_context import QueryCancelled, QueryContext, QueryTimeout, query_scope
+from http_cache import ConditionalGetMiddleware, file_version
+from metrics import MetricsRegistry, route_label
+from medal_cube import MedalCube
+from shared_dataset import SharedTables
+from sql_frontend import SQLEngine
 
 app = FastAPI(title="Olympic Medal Insights API")
 
+# Read-only endpoints get a dataset-versioned ETag and answer a matching
+# If-None-Match with 304 before any engine work (see http_cache). Added first
+# so that CORS headers and request metrics cover the 304s as well.
+CACHEABLE_PATHS = [
+    "/api/preview/events",
+    "/api/preview/countries",
+    "/api/athletes/search",
+    "/api/sports",
+    "/api/leaderboard",
+    "/api/medals/timeseries",
+    "/api/athletes/per-noc",
+    "/api/efficiency",
+    "/api/join-demo",
+]
+CACHE_MAX_AGE = int(os.environ.get("OLYMPIASCOPE_CACHE_MAX_AGE", "0"))
+app.add_middleware(
+    ConditionalGetMiddleware,
+    version=lambda: dataset_version(),
+    paths=CACHEABLE_PATHS,
+    max_age=CACHE_MAX_AGE,
+    bypass_header=b"x-explain-analyze",
+)
+
 # Enable CORS
 app.add_middleware(
     CORSMiddleware,
@@ -26,12 +64,170 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# OLYMPIASCOPE_PROFILE=1 profiles every request's engine operators,
+# =memory additionally tracks peak allocations with tracemalloc. Tracing is
+# started once here and left on; its peak counter is process-wide, so
+# memory-profiled requests run one at a time.
+PROFILE_MODE = os.environ.get("OLYMPIASCOPE_PROFILE", "").strip().lower()
+PROFILE_ALL = PROFILE_MODE in ("1", "true", "yes", "memory")
+PROFILE_MEMORY = PROFILE_MODE == "memory"
+if PROFILE_MEMORY:
+    tracemalloc.start()
+MEMORY_PROFILE_LOCK = asyncio.Lock()
+
+METRICS = MetricsRegistry()
+# most recent operator profile per endpoint, served by /api/explain
+LAST_PROFILES: Dict[str, Dict[str, Any]] = {}
+
+
+@app.middleware("http")
+async def observe_requests(request: Request, call_next):
+    # Per-endpoint latency for /api/metrics; engine operator profiling when
+    # enabled globally or requested with an "X-Explain-Analyze: 1" header.
+    profile = PROFILE_ALL or request.headers.get("x-explain-analyze") == "1"
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        if profile and PROFILE_MEMORY:
+            async with MEMORY_PROFILE_LOCK:
+                with profile_query(request.url.path, trace_memory=True) as prof:
+                    response = await call_next(request)
+        elif profile:
+            with profile_query(request.url.path) as prof:
+                response = await call_next(request)
+        else:
+            response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - t0
+        endpoint = route_label(request.scope, request.url.path if status != 404 else None)
+        METRICS.observe_request(endpoint, status, elapsed)
+        if profile:
+            METRICS.observe_profile(prof)
+            LAST_PROFILES[endpoint] = {
+                "query": str(request.url.query),
+                "status": status,
+                "tree": prof.to_dict(),
+                "text": prof.render(),
+            }
+
+# Every request runs under a QueryContext: engine scans stop once
+# OLYMPIASCOPE_QUERY_TIMEOUT seconds have passed (0 disables; a client may ask
+# for less with an X-Query-Timeout header) or as soon as the client
+# disconnects, so abandoned or runaway scans give their worker thread back.
+QUERY_TIMEOUT = float(os.environ.get("OLYMPIASCOPE_QUERY_TIMEOUT", "30"))
+
+
+def request_timeout(headers: List[Any]) -> Optional[float]:
+    timeout = QUERY_TIMEOUT if QUERY_TIMEOUT > 0 else None
+    for name, value in headers:
+        if name == b"x-query-timeout":
+            try:
+                asked = float(value)
+            except ValueError:
+                break
+            if asked > 0:
+                timeout = min(asked, timeout) if timeout else asked
+    return timeout
+
+
+class QueryDeadlineMiddleware:
+    # pure ASGI so it can watch receive() for http.disconnect while the
+    # endpoint is still running in the threadpool
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        ctx = QueryContext(request_timeout(scope["headers"]))
+        messages: asyncio.Queue = asyncio.Queue()
+
+        async def watch_disconnect():
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message["type"] == "http.disconnect":
+                    ctx.cancel("client disconnected")
+                    return
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            with query_scope(ctx):
+                await self.app(scope, messages.get, send)
+        finally:
+            watcher.cancel()
+
+
+app.add_middleware(QueryDeadlineMiddleware)
+
+
+@app.exception_handler(QueryTimeout)
+async def query_timeout(request: Request, exc: QueryTimeout):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+
+@app.exception_handler(QueryCancelled)
+async def query_cancelled(request: Request, exc: QueryCancelled):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
 EVENTS_CSV = os.path.join(os.path.dirname(__file__), "events.csv")
 COUNTRIES_CSV = os.path.join(os.path.dirname(__file__), "countries.csv")
+# optional copy of events.csv partitioned by Season/Year (see repartition.py);
+# used by row scans while it is at least as new as events.csv
+EVENTS_PARTITIONED = os.path.join(os.path.dirname(__file__), "events")
+SCAN_WORKERS = int(os.environ.get("OLYMPIASCOPE_SCAN_WORKERS", "4"))
+# every column the athlete search returns, typed up front: inferred types
+# depend on where inference starts, which differs between events.csv and
+# each partition file
+SEARCH_SCHEMA = {
+    **EVENTS_SCHEMA,
+    "ID": int, "Sex": str, "Age": int, "Height": float, "Weight": float,
+    "Team": str, "Games": str, "City": str,
+}
 CHUNK_SIZE = 50_000
+# share of events.csv read by approx=true requests
+APPROX_FRACTION = float(os.environ.get("OLYMPIASCOPE_APPROX_FRACTION", "0.1"))
+# saved aggregate state for incremental refreshes of events.csv
+STATE_DIR = os.environ.get(
+    "OLYMPIASCOPE_STATE_DIR", os.path.join(os.path.dirname(__file__), ".state")
+)
+
+# the backend's own sources, so a deploy changes every ETag too
+CODE_VERSION = file_version(sorted(glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py"))))
+
+
+def dataset_version() -> str:
+    # identity of every file a cacheable response can be computed from
+    from my_sql_engine import COUNTRY_YEAR_STATS_CSV, NOC_COUNTRYCODE_CSV
+
+    sources = [EVENTS_CSV, EVENTS_PARTITIONED, COUNTRIES_CSV, NOC_COUNTRYCODE_CSV, COUNTRY_YEAR_STATS_CSV]
+    return CODE_VERSION + "|" + file_version(sources)
+
+SQL = SQLEngine()
+# medal counts by (NOC, Year, Season, Medal, Sport), refreshed when events.csv changes
+CUBE = MedalCube(os.path.join(STATE_DIR, "medal_cube.pkl"), events_csv=EVENTS_CSV, chunk_size=CHUNK_SIZE)
+# columns files mapped read-only by every worker process (see shared_dataset)
+SHARED = SharedTables(os.path.join(STATE_DIR, "shared"))
+SHARED.register("events", EVENTS_CSV, schema=EVENTS_SCHEMA)
+SHARED.register("countries", COUNTRIES_CSV)
+
+@app.on_event("startup")
+def attach_shared_tables():
+    # the first worker builds missing/stale files, the others wait and attach
+    SHARED.preload()
 
 # --- Helpers ---
 
+def sql_engine() -> SQLEngine:
+    # tables are registered on first use so the app starts without the CSVs
+    if not SQL.tables():
+        SQL.register_csv("events", EVENTS_CSV, schema=EVENTS_SCHEMA, chunk_size=CHUNK_SIZE)
+        SQL.register_csv("countries", COUNTRIES_CSV)
+    return SQL
+
 def df_to_records(df: MyDataFrame) -> List[Dict[str, Any]]:
     """Convert MyDataFrame to list of dicts."""
     return list(df.iter_rows())
@@ -40,6 +236,19 @@ def df_to_records(df: MyDataFrame) -> List[Dict[str, Any]]:
 def health_check():
     return {"status": "ok"}
 
+@app.get("/api/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/explain")
+def get_explain(endpoint: Optional[str] = None):
+    # EXPLAIN ANALYZE-style operator trees of the last profiled request(s)
+    if endpoint is None:
+        return LAST_PROFILES
+    if endpoint not in LAST_PROFILES:
+        raise HTTPException(status_code=404, detail=f"no profile recorded for {endpoint}")
+    return LAST_PROFILES[endpoint]
+
 @app.get("/api/preview/events")
 def get_events_preview(limit: int = 50):
     parser = MyCSVParser(EVENTS_CSV)
@@ -60,6 +269,22 @@ def get_countries_preview(limit: int = 20):
         rows.append(row)
     return rows
 
+def events_scan(conditions: List[tuple], null_passing: List[tuple] = (), **parser_args: Any):
+    # the partitioned layout pruned to `conditions` on Season/Year when it is
+    # present and current, else a plain parser over events.csv.
+    # `null_passing` conditions prune too but keep NULL partitions, for
+    # filters the caller applies row by row with NULLs let through.
+    try:
+        fresh = os.path.getmtime(EVENTS_PARTITIONED) >= os.path.getmtime(EVENTS_CSV)
+    except OSError:
+        fresh = False
+    if fresh:
+        ds = PartitionedDataset(EVENTS_PARTITIONED, workers=SCAN_WORKERS, **parser_args)
+        cols = ds.partition_columns()
+        ds = ds.where([c for c in conditions if c[0] in cols])
+        return ds.where([c for c in null_passing if c[0] in cols], keep_nulls=True)
+    return MyCSVParser(EVENTS_CSV, **parser_args)
+
 @app.get("/api/athletes/search")
 def search_athletes(
     name: Optional[str] = Query(None),
@@ -73,69 +298,93 @@ def search_athletes(
     page_size: int = 50
 ):
 
-    parser = MyCSVParser(EVENTS_CSV)
-   
-    from my_sql_engine import iter_filter_project_streaming
-    
+    conditions = [
+        (col, "==", value)
+        for col, value in (("Season", season), ("NOC", noc), ("Sport", sport))
+        if value != "All"
+    ]
+    # rows without a Year pass the year range, so it only prunes partitions
+    # here and is checked row by row in cond
+    year_range = [("Year", ">=", year_min), ("Year", "<=", year_max)]
+    parser = events_scan(conditions, year_range, chunk_size=CHUNK_SIZE, schema=SEARCH_SCHEMA)
+
     name_lower = name.strip().lower() if name else ""
-    
+
     def cond(row):
         if name_lower and name_lower not in (row.get("Name") or "").lower():
             return False
         if medal_only and row.get("Medal") is None:
             return False
         year = row.get("Year")
-        if year is not None:
-            if not (year_min <= year <= year_max):
-                return False
-        if season != "All" and row.get("Season") != season:
-            return False
-        if noc != "All" and row.get("NOC") != noc:
-            return False
-        if sport != "All" and row.get("Sport") != sport:
+        if year is not None and not (year_min <= year <= year_max):
             return False
         return True
 
-   
-    filtered_rows = list(iter_filter_project_streaming(parser, cond_func=cond))
-    
-    filtered_rows.sort(key=lambda x: x.get("Year") or 0)
-    
-    total = len(filtered_rows)
+    # the filters run on column batches; only the returned page becomes dicts
+    batches = iter_filter_project_batches(parser, cond_func=cond, conditions=conditions)
+    # Season and ID break ties within a year, so the partitioned layout (one
+    # directory per Season/Year) pages exactly like events.csv; NULL keys
+    # sort last
+    matches = MyDataFrame.concat(batches, columns=parser.headers()).order_by(
+        [("Year", "asc"), ("Season", "asc"), ("ID", "asc")]
+    )
+
     start = (page - 1) * page_size
-    end = start + page_size
-    data = filtered_rows[start:end]
-    
+    data = df_to_records(matches.offset(start).limit(page_size))
+
     return {
         "data": data,
-        "total": total,
+        "total": matches.nrows(),
         "page": page,
         "page_size": page_size
     }
 
 @app.get("/api/sports")
 def get_sports():
-    parser = MyCSVParser(EVENTS_CSV)
-    sports = set()
-    for row in parser.iter_rows():
-        s = row.get("Sport")
-        if s:
-            sports.add(s)
-    return sorted(list(sports))
+    df = sql_engine().execute(
+        "SELECT Sport FROM events WHERE Sport IS NOT NULL AND Sport != '' "
+        "GROUP BY Sport ORDER BY Sport"
+    )
+    return df.get_col("Sport")
+
+def approx_medal_counts(year: Optional[int]) -> MyDataFrame:
+    # sampled medal counts per NOC (optionally for one year), scaled to the
+    # full file, with a 95% error half-width per count
+    parser = MyCSVParser(EVENTS_CSV, chunk_size=CHUNK_SIZE, schema=EVENTS_SCHEMA)
+    key_filter = ("Year", lambda y: y == year) if year is not None else None
+    return group_by_sampled(
+        parser, ["NOC"], {"Medal": "count_col"}, fraction=APPROX_FRACTION, key_filter=key_filter
+    )
 
 @app.get("/api/leaderboard")
-def get_leaderboard(year: Optional[int] = None, top_n: int = 20):
-    c_parser = MyCSVParser(COUNTRIES_CSV)
-    countries = MyDataFrame.from_rows(c_parser.iter_rows())
+def get_leaderboard(
+    year: Optional[int] = None,
+    top_n: int = 20,
+    approx: bool = False,
+    distinct_events: bool = False,
+):
+    # distinct_events=true counts a team medal once, not once per athlete
+    countries = SHARED.frame("countries")
     
-    if year is None:
-        df_counts = group_by_streaming_csv(
-            EVENTS_CSV,
-            keys=["NOC"],
-            agg_spec={"Medal": "count_col"},
-            sep=",",
-            chunk_size=CHUNK_SIZE,
+    if approx and distinct_events:
+        raise HTTPException(status_code=400, detail="approx cannot be combined with distinct_events")
+    if approx:
+        df_counts = approx_medal_counts(year)
+        count_col = "count_Medal" if year is None else "medal_count"
+        cols = {"NOC": df_counts.get_col("NOC")}
+        if year is not None:
+            cols["Year"] = [year] * df_counts.nrows()
+        cols[count_col] = df_counts.get_col("count_Medal")
+        cols[f"{count_col}_err"] = df_counts.get_col("count_Medal_err")
+        joined = MyDataFrame(cols).join(
+            countries,
+            on_key="NOC",
+            how="left",
+            suffixes=("_counts", "_country"),
         )
+        result = joined.order_by([(count_col, "desc")]).head(top_n)
+    elif year is None:
+        df_counts = CUBE.rollup(["NOC"], value_name="count_Medal", distinct_events=distinct_events)
         joined = df_counts.join(
             countries,
             on_key="NOC",
@@ -146,13 +395,7 @@ def get_leaderboard(year: Optional[int] = None, top_n: int = 20):
         result = joined_sorted.head(top_n)
     else:
         # Specific year
-        noc_year_df = medals_per_noc_year_streaming(
-            events_csv=EVENTS_CSV,
-            chunk_size=CHUNK_SIZE,
-            season=None,
-            medal_filter=None,
-        )
-        df_year = noc_year_df.filter(lambda r: r["Year"] == year)
+        df_year = CUBE.rollup(["NOC", "Year"], {"Year": year}, distinct_events=distinct_events)
         joined = df_year.join(
             countries,
             on_key="NOC",
@@ -164,6 +407,53 @@ def get_leaderboard(year: Optional[int] = None, top_n: int = 20):
         
     return df_to_records(result)
 
+@app.get("/api/medals/timeseries")
+def get_medal_timeseries(
+    season: str = "All",
+    medal: str = "All",
+    noc: Optional[str] = None,
+    window: int = 3,
+    distinct_events: bool = False,
+):
+    # whole NOC x Year medal series in one request: per-Games count, rank among
+    # NOCs that year, cumulative total, previous Games and a moving average
+    if window < 1:
+        raise HTTPException(status_code=400, detail="window must be >= 1")
+    season_arg = None if season == "All" else season
+    medal_arg = None if medal == "All" else medal
+    counts = CUBE.medals_per_noc_year(
+        season=season_arg, medal_filter=medal_arg, distinct_events=distinct_events
+    )
+    ranked = counts.window("Year", [("medal_count", "desc")], {"rank": ("rank",)})
+    series = ranked.window(
+        "NOC",
+        [("Year", "asc")],
+        {
+            "cumulative_medals": ("running_sum", "medal_count"),
+            "prev_medal_count": ("lag", "medal_count"),
+            "moving_avg": ("moving_avg", "medal_count", window),
+        },
+    )
+    if noc:
+        wanted = {n.strip() for n in noc.split(",") if n.strip()}
+        series = series.filter([("NOC", "in", wanted)])
+    return df_to_records(series)
+
+@app.get("/api/athletes/per-noc")
+def get_athletes_per_noc(top_n: int = 20, approx: bool = False):
+    # distinct athletes per NOC; approx=true counts with HyperLogLog sketches
+    # instead of holding every (NOC, athlete) pair
+    parser = MyCSVParser(EVENTS_CSV, chunk_size=CHUNK_SIZE, schema=EVENTS_SCHEMA)
+    if approx:
+        df = group_by_streaming(parser, ["NOC"], {"ID": "approx_count_distinct"})
+        counts = df.get_col("approx_count_distinct_ID")
+    else:
+        pairs = group_by_streaming(parser, ["NOC", "ID"], {"ID": "count"})
+        df = pairs.group_by(["NOC"], {"ID": "count"})
+        counts = df.get_col("count_all")
+    result = MyDataFrame({"NOC": df.get_col("NOC"), "athletes": counts})
+    return df_to_records(result.order_by([("athletes", "desc")]).head(top_n))
+
 @app.get("/api/efficiency")
 def get_efficiency(
     year: int,
@@ -179,6 +469,7 @@ def get_efficiency(
         year=year,
         season=season_arg,
         medal_filter=medal_arg,
+        medals_df=CUBE.rollup(["NOC", "Year"], {"Year": year, "Season": season_arg, "Medal": medal_arg}),
     )
     
     if sort_by == "Total medals":
@@ -203,16 +494,8 @@ def get_efficiency(
 
 @app.get("/api/join-demo")
 def get_join_demo(limit: int = 100):
-    e_parser = MyCSVParser(EVENTS_CSV)
-    events_rows = []
-    for i, row in enumerate(e_parser.iter_rows()):
-        if i >= 5000:
-            break
-        events_rows.append(row)
-    events_sample = MyDataFrame.from_rows(events_rows)
-    
-    c_parser = MyCSVParser(COUNTRIES_CSV)
-    countries = MyDataFrame.from_rows(c_parser.iter_rows())
+    events_sample = SHARED.frame("events").head(5000)
+    countries = SHARED.frame("countries")
     
     joined = events_sample.join(
         countries, on_key="NOC", how="left", suffixes=("_event", "_country")
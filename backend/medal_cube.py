@@ -0,0 +1,175 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from collections import OrderedDict
+import os
+import threading
+
+from my_sql_engine import (
+    EVENTS_CSV,
+    EVENTS_SCHEMA,
+    DistinctKeys,
+    MyCSVParser,
+    MyDataFrame,
+    incremental_fold_csv,
+    instrumented,
+)
+from query_context import query_scope
+
+# ---------- Medal cube ----------
+#
+# Row counts of events.csv grouped by every cube dimension, i.e. one cell per
+# distinct (NOC, Year, Season, Medal, Sport). Medal is None for rows without a
+# medal, so the cube also answers participation counts. Any question of the
+# form "medals grouped by some dimensions, filtered on others" is a roll-up:
+# sum the cells over the dimensions that are dropped.
+#
+# The cells are folded with incremental_fold_csv, so they are persisted at
+# state_path, appended rows are added on the next refresh and a rewritten file
+# is rebuilt from scratch. In process, a refresh is a stat() of events.csv.
+# Roll-ups over a set of dimensions are cached and derived from the smallest
+# cached roll-up that still has all the needed dimensions.
+#
+# A second measure counts distinct events per medal cell: a team medal is one
+# (cell, Event) however many athletes it lists. An event belongs to a single
+# sport and season, so these counts also add up exactly over any roll-up.
+
+CUBE_DIMENSIONS: Tuple[str, ...] = ("NOC", "Year", "Season", "Medal", "Sport")
+ROLLUP_CACHE_SIZE = 64
+
+
+def _init_state() -> Dict[str, Any]:
+    return {"rows": {}, "events": {}, "seen": DistinctKeys(persistent=True)}
+
+
+def _fold_cells(state: Dict[str, Any], parser: MyCSVParser) -> Dict[str, Any]:
+    cells, events, seen = state["rows"], state["events"], state["seen"]
+    for batch in parser.iter_batches(columns=list(CUBE_DIMENSIONS) + ["Event"]):
+        for *dims, event in zip(*(batch.get_col(c) for c in batch.columns())):
+            key = tuple(dims)
+            cells[key] = cells.get(key, 0) + 1
+            if key[3] is not None and seen.add((key, event)):
+                events[key] = events.get(key, 0) + 1
+    return state
+
+
+class MedalCube:
+    def __init__(self, state_path: str, events_csv: str = EVENTS_CSV, chunk_size: int = 50_000):
+        self.state_path = state_path
+        self.events_csv = events_csv
+        self.chunk_size = chunk_size
+        self.cells: Dict[Tuple[Any, ...], int] = {}
+        self.event_cells: Dict[Tuple[Any, ...], int] = {}
+        self.stats: Dict[str, Any] = {}
+        self._signature: Optional[Tuple[int, int]] = None
+        # (measure, dims tuple in CUBE_DIMENSIONS order) -> {projected key: count}
+        self._rollups: "OrderedDict[Tuple[str, Tuple[str, ...]], Dict[Tuple[Any, ...], int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def refresh(self) -> "MedalCube":
+        # brings the cells up to date with events.csv; a no-op while it is unchanged
+        st = os.stat(self.events_csv)
+        signature = (st.st_size, st.st_mtime_ns)
+        with self._lock:
+            if signature == self._signature:
+                return self
+            stats: Dict[str, Any] = {}
+            # shared work: runs to completion even if the query that triggered
+            # it times out or is cancelled
+            with query_scope():
+                state = incremental_fold_csv(
+                    self.events_csv,
+                    self.state_path,
+                    spec=("medal_cube", CUBE_DIMENSIONS, "events"),
+                    init=_init_state,
+                    fold=_fold_cells,
+                    chunk_size=self.chunk_size,
+                    schema=EVENTS_SCHEMA,
+                    stats=stats,
+                )
+            self.cells = state["rows"]
+            self.event_cells = state["events"]
+            self.stats = stats
+            self._rollups.clear()
+            self._signature = signature
+            return self
+
+    def _rollup_cells(self, dims: Tuple[str, ...], measure: str = "rows") -> Dict[Tuple[Any, ...], int]:
+        # counts of `measure` ("rows" or "events") over `dims` (all other
+        # dimensions summed out); call with _lock held
+        base = self.cells if measure == "rows" else self.event_cells
+        if dims == CUBE_DIMENSIONS:
+            return base
+        cached = self._rollups.get((measure, dims))
+        if cached is not None:
+            self._rollups.move_to_end((measure, dims))
+            return cached
+        src_dims, src = CUBE_DIMENSIONS, base
+        for (cand_measure, cand_dims), cand in self._rollups.items():
+            if cand_measure == measure and set(dims) <= set(cand_dims) and len(cand) < len(src):
+                src_dims, src = cand_dims, cand
+        pos = [src_dims.index(d) for d in dims]
+        out: Dict[Tuple[Any, ...], int] = {}
+        for key, cnt in src.items():
+            k = tuple(key[p] for p in pos)
+            out[k] = out.get(k, 0) + cnt
+        self._rollups[(measure, dims)] = out
+        while len(self._rollups) > ROLLUP_CACHE_SIZE:
+            self._rollups.popitem(last=False)
+        return out
+
+    @instrumented("cube.rollup")
+    def rollup(
+        self,
+        dims: Sequence[str],
+        filters: Optional[Dict[str, Any]] = None,
+        medals_only: bool = True,
+        value_name: str = "medal_count",
+        distinct_events: bool = False,
+    ) -> MyDataFrame:
+        # counts grouped by dims, restricted to cells matching filters
+        # (dimension -> value; None values are ignored). medals_only drops rows
+        # without a medal, as the medal-count queries do. distinct_events counts
+        # each medal-winning event once instead of once per athlete row.
+        if distinct_events and not medals_only:
+            raise ValueError("distinct_events counts medals only")
+        filters = {k: v for k, v in (filters or {}).items() if v is not None}
+        for d in list(dims) + list(filters):
+            if d not in CUBE_DIMENSIONS:
+                raise KeyError(f"'{d}' is not a cube dimension")
+        self.refresh()
+        needed = set(dims) | set(filters)
+        if medals_only:
+            needed.add("Medal")
+        src_dims = tuple(d for d in CUBE_DIMENSIONS if d in needed)
+        with self._lock:
+            src = self._rollup_cells(src_dims, "events" if distinct_events else "rows")
+        checks = [(src_dims.index(d), v) for d, v in filters.items()]
+        medal_pos = src_dims.index("Medal") if medals_only else -1
+        out_pos = [src_dims.index(d) for d in dims]
+
+        counts: Dict[Tuple[Any, ...], int] = {}
+        for key, cnt in src.items():
+            if medal_pos >= 0 and key[medal_pos] is None:
+                continue
+            if any(key[p] != v for p, v in checks):
+                continue
+            k = tuple(key[p] for p in out_pos)
+            counts[k] = counts.get(k, 0) + cnt
+
+        cols: Dict[str, List[Any]] = {d: [] for d in dims}
+        cols[value_name] = []
+        for k, cnt in counts.items():
+            for d, v in zip(dims, k):
+                cols[d].append(v)
+            cols[value_name].append(cnt)
+        return MyDataFrame._wrap(cols)
+
+    def medals_per_noc_year(
+        self,
+        season: Optional[str] = None,
+        medal_filter: Optional[str] = None,
+        distinct_events: bool = False,
+    ) -> MyDataFrame:
+        # same rows as medals_per_noc_year_streaming(season=..., medal_filter=..., distinct_events=...)
+        return self.rollup(
+            ["NOC", "Year"], {"Season": season, "Medal": medal_filter}, distinct_events=distinct_events
+        )
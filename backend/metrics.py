@@ -0,0 +1,114 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import bisect
+import threading
+
+from engine_profiler import OpProfile
+
+# In-process metrics rendered in the Prometheus text exposition format.
+
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: Sequence[Tuple[str, str]]) -> List[str]:
+        lines: List[str] = []
+        cumulative = 0
+        for le, c in zip(self.buckets, self.counts):
+            cumulative += c
+            lines.append(f"{name}_bucket{_labels(list(labels) + [('le', repr(le))])} {cumulative}")
+        cumulative += self.counts[-1]
+        lines.append(f"{name}_bucket{_labels(list(labels) + [('le', '+Inf')])} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {self.sum}")
+        lines.append(f"{name}_count{_labels(labels)} {self.count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self, prefix: str = "olympiascope"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._latency: Dict[str, Histogram] = {}
+        self._requests: Dict[Tuple[str, str], int] = {}
+        # op -> [calls, seconds, rows_out, bytes_read]
+        self._ops: Dict[str, List[float]] = {}
+
+    def observe_request(self, endpoint: str, status: int, seconds: float) -> None:
+        with self._lock:
+            hist = self._latency.get(endpoint)
+            if hist is None:
+                hist = self._latency[endpoint] = Histogram()
+            hist.observe(seconds)
+            key = (endpoint, str(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+    def observe_profile(self, profile: OpProfile) -> None:
+        # folds every operator node of a query profile into per-op totals
+        with self._lock:
+            for depth, node in profile.walk():
+                if depth == 0:
+                    continue
+                acc = self._ops.get(node.name)
+                if acc is None:
+                    acc = self._ops[node.name] = [0, 0.0, 0, 0]
+                acc[0] += node.calls
+                acc[1] += node.self_s()
+                acc[2] += node.rows_out or 0
+                acc[3] += node.bytes_read
+
+    def render(self) -> str:
+        p = self.prefix
+        out: List[str] = []
+        with self._lock:
+            out.append(f"# HELP {p}_http_request_duration_seconds Request latency by endpoint.")
+            out.append(f"# TYPE {p}_http_request_duration_seconds histogram")
+            for endpoint, hist in sorted(self._latency.items()):
+                out.extend(hist.render(f"{p}_http_request_duration_seconds", [("endpoint", endpoint)]))
+
+            out.append(f"# HELP {p}_http_requests_total Requests by endpoint and status.")
+            out.append(f"# TYPE {p}_http_requests_total counter")
+            for (endpoint, status), n in sorted(self._requests.items()):
+                out.append(f"{p}_http_requests_total{_labels([('endpoint', endpoint), ('status', status)])} {n}")
+
+            if self._ops:
+                series = (
+                    ("engine_op_calls_total", "Engine operator invocations.", 0),
+                    ("engine_op_self_seconds_total", "Engine operator self time.", 1),
+                    ("engine_op_rows_out_total", "Rows produced by engine operators.", 2),
+                    ("engine_op_bytes_read_total", "Input bytes consumed by engine operators.", 3),
+                )
+                for suffix, help_text, idx in series:
+                    out.append(f"# HELP {p}_{suffix} {help_text}")
+                    out.append(f"# TYPE {p}_{suffix} counter")
+                    for op, acc in sorted(self._ops.items()):
+                        out.append(f"{p}_{suffix}{_labels([('op', op)])} {acc[idx]}")
+        return "\n".join(out) + "\n"
+
+
+def route_label(scope: dict, default: Optional[str] = None) -> str:
+    # the route template keeps label cardinality bounded (no raw query strings)
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path or default or "unmatched"
@@ -1,5 +1,200 @@
-from typing import Iterable, List, Dict, Iterator, Optional, Callable, Any, Tuple
-from collections import defaultdict
+from typing import Iterable, List, Dict, Iterator, Optional, Callable, Any, Tuple, Sequence
+from collections import defaultdict, deque
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice, repeat
+from urllib.parse import quote, unquote
+import bz2
+import contextvars
+import csv
+import gzip
+import hashlib
+import io
+import lzma
+import math
+import operator
+import os
+import pickle
+import queue
+import random
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import zlib
+
+from engine_profiler import counting_lines, explain_analyze, instrumented, profile_query
+from query_context import check_query
+
+try:
+    import numpy_backend as _vec
+except ImportError:  # NumPy not installed: operators run their pure-Python loops
+    _vec = None
+
+# OLYMPIASCOPE_VECTORIZE=0 keeps MyDataFrame on the pure-Python paths
+VECTORIZE = _vec is not None and os.environ.get("OLYMPIASCOPE_VECTORIZE", "1") != "0"
+
+DEFAULT_NULL_VALUES = frozenset(
+    {"", "NA", "Na", "na", "NULL", "Null", "null", "NONE", "None", "none"}
+)
+
+_SCHEMA_TYPES = {"int": int, "float": float, "bool": bool, "str": str}
+
+# scan loops call check_query() whenever this many lines have been read
+CHECK_EVERY_LINES = 1 << 14
+
+_BOOL_TOKENS = {
+    "true": True, "t": True, "yes": True, "y": True, "1": True,
+    "false": False, "f": False, "no": False, "n": False, "0": False,
+}
+
+
+# ---------- LazyRow (lazy type conversion) ----------
+class LazyRow(Mapping):
+    # keeps the raw fields of one CSV line and converts a column on first access
+    __slots__ = ("_index", "_fields", "_convs", "_vals")
+
+    def __init__(
+        self,
+        index: Dict[str, int],
+        fields: List[str],
+        convs: List[Callable[[str], Any]],
+    ):
+        self._index = index
+        self._fields = fields
+        self._convs = convs
+        self._vals: Dict[str, Any] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        vals = self._vals
+        if key in vals:
+            return vals[key]
+        i = self._index[key]
+        v = self._convs[i](self._fields[i])
+        vals[key] = v
+        return v
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def raw(self, key: str) -> str:
+        return self._fields[self._index[key]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: self[k] for k in self._index}
+
+
+# ---------- compressed input / read-ahead ----------
+_COMPRESSION_EXTS = {".gz": "gzip", ".gzip": "gzip", ".bz2": "bz2", ".xz": "xz", ".lzma": "xz"}
+_COMPRESSION_MAGIC = ((b"\x1f\x8b", "gzip"), (b"BZh", "bz2"), (b"\xfd7zXZ\x00", "xz"))
+_COMPRESSION_OPENERS = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+# queued decompressed blocks per reader for compressed input (read_ahead=None)
+DEFAULT_READ_AHEAD = 4
+READ_BLOCK_SIZE = 1 << 20
+
+
+def detect_compression(filename: str) -> Optional[str]:
+    # "gzip" / "bz2" / "xz" by extension, else by magic bytes; None for plain text
+    ext = os.path.splitext(filename)[1].lower()
+    if ext in _COMPRESSION_EXTS:
+        return _COMPRESSION_EXTS[ext]
+    with open(filename, "rb") as f:
+        head = f.read(6)
+    for magic, kind in _COMPRESSION_MAGIC:
+        if head.startswith(magic):
+            return kind
+    return None
+
+
+class ReadAheadReader(io.RawIOBase):
+    # Reads `src` in block_size blocks on a background thread into a queue of at
+    # most `depth` blocks. File reads and zlib/bz2/lzma decompression release
+    # the GIL, so they overlap with tokenizing on the consumer thread.
+    def __init__(self, src, depth: int = DEFAULT_READ_AHEAD, block_size: int = READ_BLOCK_SIZE):
+        super().__init__()
+        self._src = src
+        self._block_size = block_size
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, depth))
+        self._stop = threading.Event()
+        self._buf = memoryview(b"")
+        self._eof = False
+        self._thread = threading.Thread(target=self._produce, name="csv-read-ahead", daemon=True)
+        self._thread.start()
+
+    def _produce(self) -> None:
+        try:
+            while not self._stop.is_set():
+                block = self._src.read(self._block_size)
+                self._put(block)  # b"" marks the end
+                if not block:
+                    return
+        except BaseException as exc:  # handed to the consumer
+            self._put(exc)
+
+    def _put(self, item: Any) -> None:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if not self._buf:
+            if self._eof:
+                return 0
+            item = self._queue.get()
+            if isinstance(item, BaseException):
+                self._eof = True
+                raise item
+            if not item:
+                self._eof = True
+                return 0
+            self._buf = memoryview(item)
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+    def close(self) -> None:
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+            self._src.close()
+        super().close()
+
+
+def open_text(
+    filename: str,
+    encoding: str = "utf-8",
+    read_ahead: Optional[int] = None,
+    compression: Optional[str] = None,
+):
+    # text stream over a plain or compressed file; read_ahead is the queue depth
+    # of background-read blocks (None: DEFAULT_READ_AHEAD for compressed input,
+    # off for plain files; 0: off). compression: None detects it, "" means plain.
+    if compression is None:
+        compression = detect_compression(filename)
+    depth = read_ahead if read_ahead is not None else (DEFAULT_READ_AHEAD if compression else 0)
+    if not compression and depth <= 0:
+        return open(filename, "r", encoding=encoding, newline="")
+    src = _COMPRESSION_OPENERS[compression](filename, "rb") if compression else open(filename, "rb", buffering=0)
+    if depth > 0:
+        src = io.BufferedReader(ReadAheadReader(src, depth), buffer_size=READ_BLOCK_SIZE)
+    return io.TextIOWrapper(src, encoding=encoding, newline="")
+
 
 # ---------- MyCSVParser Class ----------
 class MyCSVParser:
@@ -9,18 +204,58 @@ class MyCSVParser:
         sep: str = ",",
         chunk_size: Optional[int] = None,
         encoding: str = "utf-8",
+        schema: Optional[Dict[str, Any]] = None,
+        null_values: Optional[Iterable[str]] = None,
+        lazy: bool = False,
+        start_offset: Optional[int] = None,
+        read_ahead: Optional[int] = None,
     ):
+        # schema maps column -> int/float/bool/str (or their names); listed columns
+        # skip type inference and use dedicated converters, the rest are inferred.
+        # lazy=True yields LazyRow objects that convert a field only when accessed
+        # (inferred types are still settled in file order, see _settle).
+        # start_offset makes iter_chunks resume at a byte offset (see there).
+        # gzip/bz2/xz files are decompressed transparently; read_ahead sets the
+        # background read-ahead depth (see open_text).
         self.filename = filename
         self.sep = sep
         self.chunk_size = chunk_size
         self.encoding = encoding
+        self.schema = {k: _SCHEMA_TYPES.get(t, t) for k, t in (schema or {}).items()}
+        for col, t in self.schema.items():
+            if t not in (int, float, bool, str):
+                raise ValueError(f"Unsupported schema type for '{col}': {t!r}")
+        self.null_values = frozenset(null_values) if null_values is not None else DEFAULT_NULL_VALUES
+        # null tokens with case and surrounding whitespace folded away; a cell
+        # longer than the longest of them can only match if it is padded
+        self._null_folded = frozenset(v.strip().lower() for v in self.null_values)
+        self._null_width = max(map(len, self._null_folded), default=0)
+        self.lazy = lazy
+        self.start_offset = start_offset
+        self.read_ahead = read_ahead
+        self.last_offset: Optional[int] = None
+        # True when last_offset is the end of a final line with no newline
+        self.last_line_open = False
+        self._compression: Optional[str] = None
         self._headers: List[str] = []
 
     # ---- public APIs ----
+    def compression(self) -> Optional[str]:
+        if self._compression is None:
+            self._compression = detect_compression(self.filename) or ""
+        return self._compression or None
+
+    def _open_text(self):
+        return open_text(self.filename, self.encoding, self.read_ahead, self.compression() or "")
+
+    def _require_plain(self, what: str) -> None:
+        if self.compression() is not None:
+            raise ValueError(f"{what} needs an uncompressed file: {self.filename}")
+
     def headers(self) -> List[str]:
         if self._headers:
             return self._headers
-        with open(self.filename, "r", encoding=self.encoding, newline="") as f:
+        with self._open_text() as f:
             first = self._readline(f)
             self._headers = self._parse_line(first)
             if self._headers and isinstance(self._headers[0], str):
@@ -82,17 +317,28 @@ class MyCSVParser:
         for line in f:
             yield self._strip_newline(line)
 
+    @instrumented("csv.iter_rows", streaming=True)
     def iter_rows(self) -> Iterator[Dict[str, Any]]:
-        with open(self.filename, "r", encoding=self.encoding, newline="") as f:
+        with self._open_text() as f:
             header = self._parse_line(self._readline(f))
             if header and isinstance(header[0], str):
                 header[0] = header[0].lstrip("\ufeff")  
-            converters = [self._make_converter() for _ in header]
-            for raw in self._iter_data_lines(f):
+            convs = self._column_converters(header)
+            index = {h: i for i, h in enumerate(header)}
+            pending = self._inferred_columns(header) if self.lazy else []
+            for n, raw in enumerate(counting_lines(self._iter_data_lines(f))):
+                if not n % CHECK_EVERY_LINES:
+                    check_query()
                 fields = self._parse_line(raw)
                 fields = self._pad_or_trim(fields, len(header))
-                row = [self._convert(fields[i], converters[i]) for i in range(len(header))]
-                yield {header[i]: row[i] for i in range(len(header))}
+                if self.lazy:
+                    row = LazyRow(index, fields, convs)
+                    if pending:
+                        for i, v in self._settle(pending, convs, fields):
+                            row._vals[header[i]] = v
+                    yield row
+                else:
+                    yield {h: c(v) for h, c, v in zip(header, convs, fields)}
 
     def __iter__(self):
         return self.iter_rows() if not self.chunk_size else self.iter_chunks()
@@ -104,6 +350,67 @@ class MyCSVParser:
             return fields[:target]
         return fields
 
+    def _column_converters(self, header: List[str]) -> List[Callable[[str], Any]]:
+        # one full converter (null handling included) per column
+        convs: List[Callable[[str], Any]] = []
+        for h in header:
+            t = self.schema.get(h)
+            if t is None:
+                convs.append(partial(self._convert, conv=self._make_converter()))
+            else:
+                convs.append(self._schema_converter(t))
+        return convs
+
+    def _inferred_columns(self, header: List[str]) -> List[int]:
+        return [i for i, h in enumerate(header) if h not in self.schema]
+
+    def _settle(
+        self, pending: List[int], convs: List[Callable[[str], Any]], fields: List[str]
+    ) -> List[Tuple[int, Any]]:
+        # An inferred converter fixes its type on the first non-null value it
+        # sees. Lazy rows and key filters would let access order and the
+        # predicate pick that value, so those paths run the still-undecided
+        # converters over every row, in file order, like an eager parse does.
+        # Returns this row's converted values; decided columns leave pending.
+        out = [(i, convs[i](fields[i])) for i in pending]
+        pending[:] = [i for i in pending if self._is_null(fields[i])]
+        return out
+
+    def _schema_converter(self, t: Any) -> Callable[[str], Any]:
+        # null tokens match like in inference: surrounding whitespace and case
+        # are ignored (numbers and bools that aren't valid come out as None).
+        # The exact lookup comes first; only cells short enough or padded enough
+        # to be a null token pay for the fold.
+        nulls, folded, width = self.null_values, self._null_folded, self._null_width
+
+        if t is str:
+            def conv_str(s: str) -> Any:
+                if s in nulls:
+                    return None
+                if len(s) > width and not (s[:1].isspace() or s[-1:].isspace()):
+                    return s
+                return None if s.strip().lower() in folded else s
+            return conv_str
+
+        if t is bool:
+            def conv_bool(s: str) -> Any:
+                if s in nulls:
+                    return None
+                b = s.strip().lower()
+                return None if b in folded else _BOOL_TOKENS.get(b)
+            return conv_bool
+
+        def conv_num(s: str) -> Any:
+            if s in nulls:
+                return None
+            if (len(s) <= width or s[:1].isspace() or s[-1:].isspace()) and s.strip().lower() in folded:
+                return None
+            try:
+                return t(s)
+            except ValueError:
+                return None
+        return conv_num
+
     def _make_converter(self) -> Callable[[str], Any]:
         # returns a stateful converter that promotes types as needed
         inferred: List[Callable[[str], Any]] = [
@@ -132,10 +439,17 @@ class MyCSVParser:
 
         return conv
 
+    def _is_null(self, s: str) -> bool:
+        # blank cells and the parser's null tokens (case and padding ignored)
+        if s in self.null_values or not s or s.isspace():
+            return True
+        if len(s) > self._null_width and not (s[0].isspace() or s[-1].isspace()):
+            return False
+        return s.strip().lower() in self._null_folded
+
     def _convert(self, s: str, conv: Callable[[str], Any]) -> Any:
-        stripped = s.strip()
-        if stripped == "" or stripped.lower() in {"na", "null", "none"}:
-            return None 
+        if self._is_null(s):
+            return None
         try:
             return conv(s)
         except Exception:
@@ -143,7 +457,7 @@ class MyCSVParser:
 
     # primitive parsers
     def _to_none(self, s: str) -> Any:
-        if s.strip() == "" or s.strip().lower() in {"na", "null", "none"}:
+        if self._is_null(s):
             return None
         raise ValueError
 
@@ -180,40 +494,782 @@ class MyCSVParser:
     def _identity(self, s: str) -> str:
         return s
 
-    def iter_chunks(self) -> Iterator[List[Dict[str, Any]]]:
-        with open(self.filename, "r", encoding=self.encoding, newline="") as f:
-            header = self._parse_line(self._readline(f))
-            if header and isinstance(header[0], str):
-                header[0] = header[0].lstrip("\ufeff")
-            converters = [self._make_converter() for _ in header]
-            buf: List[Dict[str, Any]] = []
-            for raw in self._iter_data_lines(f):
-                fields = self._parse_line(raw)
-                fields = self._pad_or_trim(fields, len(header))
-                row = [self._convert(fields[i], converters[i]) for i in range(len(header))]
-                buf.append({header[i]: row[i] for i in range(len(header))})
-                if self.chunk_size and len(buf) >= self.chunk_size:
-                    yield buf
-                    buf = []
-            if buf:
+    @instrumented("csv.iter_chunks", streaming=True)
+    def iter_chunks(
+        self,
+        key_filter: Optional[Tuple[str, Callable[[Any], bool]]] = None,
+        stats: Optional[Dict[str, int]] = None,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        # key_filter=(column, predicate): only that column is converted first and
+        # rows whose key fails the predicate are dropped before the rest of the
+        # row is type-converted.
+        # With self.start_offset set, reading resumes at that byte offset (clamped
+        # to the end of the header) and self.last_offset tracks the byte position
+        # just past the last line read; self.last_line_open is set when that line
+        # had no trailing newline (a later append may extend it).
+        yield from self._scan(partial(self._chunks, key_filter=key_filter, stats=stats))
+
+    @instrumented("csv.iter_batches", streaming=True)
+    def iter_batches(
+        self,
+        columns: Optional[List[str]] = None,
+        key_filter: Optional[Tuple[str, Callable[[Any], bool]]] = None,
+        stats: Optional[Dict[str, int]] = None,
+    ) -> Iterator["RecordBatch"]:
+        # iter_chunks() in columnar form: the same rows and values, but each chunk
+        # is a RecordBatch of column lists converted a column at a time and no row
+        # dicts are built. columns= restricts the batch (and the conversion work)
+        # to those columns; key_filter and stats behave as in iter_chunks.
+        yield from self._scan(partial(self._batches, columns=columns, key_filter=key_filter, stats=stats))
+
+    def _scan(self, read: Callable[[List[str], Iterable[str]], Iterator[Any]]) -> Iterator[Any]:
+        # runs read(header, data lines) over the file, from self.start_offset if set
+        start_offset = self.start_offset
+        if start_offset is None:
+            with self._open_text() as f:
+                header = self._parse_line(self._readline(f))
+                yield from read(header, self._iter_data_lines(f))
+        else:
+            self._require_plain("resuming at a byte offset")
+            with open(self.filename, "rb") as fb:
+                first = fb.readline()
+                if not first:
+                    raise ValueError("Empty file or missing header")
+                header = self._parse_line(self._strip_newline(first.decode(self.encoding)))
+                lines = self._iter_data_lines_from(fb, max(start_offset, fb.tell()))
+                yield from read(header, lines)
+
+    def _iter_data_lines_from(self, fb, pos: int) -> Iterator[str]:
+        fb.seek(pos)
+        self.last_offset = pos
+        for bline in fb:
+            pos += len(bline)
+            self.last_offset = pos
+            self.last_line_open = not bline.endswith(b"\n")
+            yield self._strip_newline(bline.decode(self.encoding))
+
+    def iter_sampled_chunks(
+        self,
+        fraction: float,
+        block_size: int = 1 << 20,
+        seed: int = 0,
+        key_filter: Optional[Tuple[str, Callable[[Any], bool]]] = None,
+        stats: Optional[Dict[str, int]] = None,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        # Block sampling: the data region is cut into block_size byte blocks and
+        # each block is read with probability `fraction` (at least one block), so
+        # unread blocks cost no I/O. A line belongs to the block its first byte is
+        # in. stats gets sampled_bytes / total_bytes for scaling estimates.
+        # Assumes no quoted newlines inside fields.
+        if not 0.0 < fraction <= 1.0:
+            raise ValueError("fraction must be in (0, 1]")
+        self._require_plain("block sampling")
+        with open(self.filename, "rb") as fb:
+            first = fb.readline()
+            if not first:
+                raise ValueError("Empty file or missing header")
+            header = self._parse_line(self._strip_newline(first.decode(self.encoding)))
+            data_start = fb.tell()
+            size = os.fstat(fb.fileno()).st_size
+            starts = list(range(data_start, size, block_size))
+            rnd = random.Random(seed)
+            chosen = [a for a in starts if rnd.random() < fraction]
+            if not chosen and starts:
+                chosen = [rnd.choice(starts)]
+            if stats is not None:
+                stats["total_bytes"] = stats.get("total_bytes", 0) + (size - data_start)
+                stats["sampled_bytes"] = stats.get("sampled_bytes", 0) + sum(
+                    min(a + block_size, size) - a for a in chosen
+                )
+            lines = self._iter_block_lines(fb, data_start, chosen, block_size)
+            yield from self._chunks(header, lines, key_filter, stats)
+
+    def _iter_block_lines(self, fb, data_start: int, starts: List[int], block_size: int) -> Iterator[str]:
+        for a in starts:
+            if a > data_start:
+                fb.seek(a - 1)
+                fb.readline()  # finish the line that started before this block
+            else:
+                fb.seek(a)
+            pos = fb.tell()
+            end = a + block_size
+            while pos < end:
+                bline = fb.readline()
+                if not bline:
+                    break
+                pos += len(bline)
+                yield self._strip_newline(bline.decode(self.encoding))
+
+    def _chunks(
+        self,
+        header: List[str],
+        lines: Iterable[str],
+        key_filter: Optional[Tuple[str, Callable[[Any], bool]]],
+        stats: Optional[Dict[str, int]],
+    ) -> Iterator[List[Dict[str, Any]]]:
+        if header and isinstance(header[0], str):
+            header[0] = header[0].lstrip("\ufeff")
+        convs = self._column_converters(header)
+        index = {h: i for i, h in enumerate(header)}
+        key_idx = -1
+        key_pred: Optional[Callable[[Any], bool]] = None
+        if key_filter is not None:
+            if key_filter[0] not in header:
+                raise KeyError(f"filter key '{key_filter[0]}' not found in {self.filename}")
+            key_idx = header.index(key_filter[0])
+            key_pred = key_filter[1]
+        pending = self._inferred_columns(header) if self.lazy or key_pred is not None else []
+        scanned = pruned = 0
+        buf: List[Dict[str, Any]] = []
+        for raw in counting_lines(lines):
+            fields = self._parse_line(raw)
+            fields = self._pad_or_trim(fields, len(header))
+            scanned += 1
+            if not scanned % CHECK_EVERY_LINES:
+                check_query()
+            settled = self._settle(pending, convs, fields) if pending else ()
+            if key_pred is not None:
+                key_val = convs[key_idx](fields[key_idx])
+                if not key_pred(key_val):
+                    pruned += 1
+                    continue
+            if self.lazy:
+                lazy_row = LazyRow(index, fields, convs)
+                for i, v in settled:
+                    lazy_row._vals[header[i]] = v
+                if key_pred is not None:
+                    lazy_row._vals[header[key_idx]] = key_val
+                buf.append(lazy_row)
+            else:
+                buf.append({h: c(v) for h, c, v in zip(header, convs, fields)})
+            if self.chunk_size and len(buf) >= self.chunk_size:
+                if stats is not None:
+                    _add_scan_stats(stats, scanned, pruned)
+                    scanned = pruned = 0
+                check_query()
                 yield buf
+                buf = []
+        if stats is not None:
+            _add_scan_stats(stats, scanned, pruned)
+        if buf:
+            yield buf
+
+    def _batches(
+        self,
+        header: List[str],
+        lines: Iterable[str],
+        columns: Optional[List[str]],
+        key_filter: Optional[Tuple[str, Callable[[Any], bool]]],
+        stats: Optional[Dict[str, int]],
+    ) -> Iterator["RecordBatch"]:
+        # the loop of _chunks, but rows are kept as field lists and each chunk is
+        # converted column by column. Every column's converter still sees its
+        # values in file order, so inferred types come out as in _chunks.
+        if header and isinstance(header[0], str):
+            header[0] = header[0].lstrip("\ufeff")
+        names = list(header) if columns is None else list(columns)
+        for c in names:
+            if c not in header:
+                raise KeyError(f"column '{c}' not found in {self.filename}")
+        convs = self._column_converters(header)
+        picks = [(c, header.index(c)) for c in names]
+        schema = {c: self.schema.get(c) for c in names}
+        key_idx = -1
+        key_pred: Optional[Callable[[Any], bool]] = None
+        if key_filter is not None:
+            if key_filter[0] not in header:
+                raise KeyError(f"filter key '{key_filter[0]}' not found in {self.filename}")
+            key_idx = header.index(key_filter[0])
+            key_pred = key_filter[1]
+        width = len(header)
+        # pruned rows never reach batch(), so settle inference on every row
+        pending = self._inferred_columns(header) if key_pred is not None else []
+        scanned = pruned = 0
+        buf: List[List[str]] = []
+        key_vals: List[Any] = []
+
+        def batch() -> RecordBatch:
+            cols: Dict[str, List[Any]] = {}
+            for c, i in picks:
+                if i == key_idx:
+                    cols[c] = key_vals
+                else:
+                    cols[c] = list(map(convs[i], map(operator.itemgetter(i), buf)))
+            return RecordBatch.from_columns(cols, schema, len(buf))
+
+        for raw in counting_lines(lines):
+            fields = self._parse_line(raw)
+            if len(fields) != width:
+                fields = self._pad_or_trim(fields, width)
+            scanned += 1
+            if not scanned % CHECK_EVERY_LINES:
+                check_query()
+            if pending:
+                self._settle(pending, convs, fields)
+            if key_pred is not None:
+                key_val = convs[key_idx](fields[key_idx])
+                if not key_pred(key_val):
+                    pruned += 1
+                    continue
+                key_vals.append(key_val)
+            buf.append(fields)
+            if self.chunk_size and len(buf) >= self.chunk_size:
+                if stats is not None:
+                    _add_scan_stats(stats, scanned, pruned)
+                    scanned = pruned = 0
+                check_query()
+                yield batch()
+                buf = []
+                key_vals = []
+        if stats is not None:
+            _add_scan_stats(stats, scanned, pruned)
+        if buf:
+            yield batch()
+
+
+def _add_scan_stats(stats: Dict[str, int], scanned: int, pruned: int) -> None:
+    stats["rows_scanned"] = stats.get("rows_scanned", 0) + scanned
+    stats["rows_pruned"] = stats.get("rows_pruned", 0) + pruned
+
+
+# ---------- partitioned datasets (Hive-style directories) ----------
+# root/Season=Summer/Year=2016/part-00000.csv[.gz] holds the rows of one
+# partition without the partition columns, whose values are encoded (URL-
+# quoted) in the directory names; NULL is __HIVE_DEFAULT_PARTITION__.
+HIVE_NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+_CODEC_EXTS = {"gzip": ".gz", "bz2": ".bz2", "xz": ".xz"}
+# chunks a worker may read ahead of the consumer in each file it scans
+PARTITION_QUEUE_DEPTH = 4
+
+
+class PartitionedDataset:
+    # A partitioned directory read as one table, with the iter_chunks() /
+    # headers() interface of MyCSVParser so streaming operators accept it.
+    # Rows carry the file columns followed by the partition columns. where()
+    # prunes partitions by conditions on partition columns before any file is
+    # opened; workers > 1 scans the remaining files on a thread pool, each
+    # worker feeding a bounded queue of chunks (chunks still come out in
+    # partition order).
+    def __init__(
+        self,
+        root: str,
+        sep: str = ",",
+        chunk_size: Optional[int] = 50_000,
+        encoding: str = "utf-8",
+        schema: Optional[Dict[str, Any]] = None,
+        null_values: Optional[Iterable[str]] = None,
+        read_ahead: Optional[int] = None,
+        workers: int = 1,
+        conditions: Optional[List[Tuple[str, str, Any]]] = None,
+    ):
+        if not os.path.isdir(root):
+            raise FileNotFoundError(f"partitioned dataset not found: {root}")
+        self.root = root
+        self.filename = root
+        self.sep = sep
+        self.chunk_size = chunk_size
+        self.encoding = encoding
+        self.schema = {k: _SCHEMA_TYPES.get(t, t) for k, t in (schema or {}).items()}
+        self.null_values = null_values
+        self.read_ahead = read_ahead
+        self.workers = workers
+        self.conditions = list(conditions or [])
+        # conditions that keep NULL partitions as well (see where)
+        self.null_conditions: List[Tuple[str, str, Any]] = []
+        self._partitions: Optional[List[Tuple[Dict[str, Any], List[str]]]] = None
+        self._columns: List[str] = []
+
+    def _discover(self) -> None:
+        partitions: List[Tuple[Dict[str, Any], List[str]]] = []
+        columns: Optional[List[str]] = None
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames.sort()
+            files = sorted(f for f in filenames if f.startswith("part-"))
+            if not files:
+                continue
+            rel = os.path.relpath(dirpath, self.root)
+            parts = [] if rel == "." else rel.split(os.sep)
+            values: Dict[str, Any] = {}
+            for part in parts:
+                col, eq, raw = part.partition("=")
+                if not eq:
+                    raise ValueError(f"not a partition directory: {dirpath}")
+                values[col] = self._partition_value(col, unquote(raw))
+            if columns is None:
+                columns = list(values)
+            elif list(values) != columns:
+                raise ValueError(f"inconsistent partition columns under {self.root}: {parts}")
+            partitions.append((values, [os.path.join(dirpath, f) for f in files]))
+        self._partitions = partitions
+        self._columns = columns or []
+
+    def _partition_value(self, col: str, raw: str) -> Any:
+        if raw == HIVE_NULL_PARTITION:
+            return None
+        t = self.schema.get(col)
+        if t is str:
+            return raw
+        if t is bool:
+            return _BOOL_TOKENS.get(raw.lower(), raw)
+        if t is not None:
+            return t(raw)
+        for conv in (int, float):
+            try:
+                return conv(raw)
+            except ValueError:
+                pass
+        return raw
+
+    def partition_columns(self) -> List[str]:
+        if self._partitions is None:
+            self._discover()
+        return self._columns
+
+    def partitions(self) -> List[Tuple[Dict[str, Any], List[str]]]:
+        # (partition values, files) of every partition left after pruning
+        if self._partitions is None:
+            self._discover()
+        tests = [(col, _condition_test(op, value)) for col, op, value in self.conditions]
+        tests += [(col, _null_or(_condition_test(op, value))) for col, op, value in self.null_conditions]
+        return [(vals, files) for vals, files in self._partitions if all(t(vals[c]) for c, t in tests)]
+
+    def where(self, conditions: List[Tuple[str, str, Any]], keep_nulls: bool = False) -> "PartitionedDataset":
+        # a copy restricted to partitions satisfying every (column, op, value)
+        # condition (ops as in MyDataFrame.filter); columns must be partition
+        # columns. keep_nulls=True also keeps the NULL partition of each
+        # condition's column, for callers that let NULLs through row by row.
+        cols = self.partition_columns()
+        for col, op, _ in conditions:
+            if col not in cols:
+                raise ValueError(f"'{col}' is not a partition column of {self.root}")
+            if op != "in" and op not in _CMP_OPS:
+                raise ValueError(f"Unsupported filter op: {op}")
+        ds = PartitionedDataset.__new__(PartitionedDataset)
+        ds.__dict__.update(self.__dict__)
+        if keep_nulls:
+            ds.null_conditions = self.null_conditions + list(conditions)
+        else:
+            ds.conditions = self.conditions + list(conditions)
+        return ds
+
+    def _parser(self, path: str) -> MyCSVParser:
+        return MyCSVParser(
+            path, self.sep, self.chunk_size, self.encoding, schema=self.schema,
+            null_values=self.null_values, read_ahead=self.read_ahead,
+        )
+
+    def headers(self) -> List[str]:
+        parts = self.partitions() or self._partitions
+        if not parts:
+            return list(self._columns)
+        return self._parser(parts[0][1][0]).headers() + self._columns
+
+    def _scan_file(
+        self,
+        path: str,
+        values: Dict[str, Any],
+        key_filter: Optional[Tuple[str, Callable[[Any], bool]]],
+        stats: Optional[Dict[str, int]],
+    ) -> Iterator[List[Dict[str, Any]]]:
+        for chunk in self._parser(path).iter_chunks(key_filter, stats):
+            for row in chunk:
+                row.update(values)
+            yield chunk
+
+    def _scan_file_batches(
+        self,
+        path: str,
+        values: Dict[str, Any],
+        key_filter: Optional[Tuple[str, Callable[[Any], bool]]],
+        stats: Optional[Dict[str, int]],
+        columns: Optional[List[str]] = None,
+    ) -> Iterator["RecordBatch"]:
+        # partition columns become constant columns of each batch
+        file_cols = None if columns is None else [c for c in columns if c not in values]
+        for batch in self._parser(path).iter_batches(file_cols, key_filter, stats):
+            n = batch.nrows()
+            cols = batch._base
+            for c, v in values.items():
+                cols[c] = [v] * n
+            if columns is not None:
+                batch._base = {c: cols[c] for c in columns}
+            batch.schema = {c: self.schema.get(c) for c in batch._base}
+            yield batch
+
+    def _scan_file_into(
+        self,
+        task: Tuple[Any, ...],
+        out: "queue.Queue[Any]",
+        stats: Dict[str, int],
+        stop: threading.Event,
+    ) -> None:
+        # worker side of _iter_files: the file's chunks, then _END (or the
+        # exception), go to `out`; gives up once `stop` is set
+        def put(item: Any) -> bool:
+            while not stop.is_set():
+                try:
+                    out.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        scan, path, values, key_filter = task
+        chunks = scan(path, values, key_filter, stats)
+        try:
+            for chunk in chunks:
+                if not put(chunk):
+                    return
+            put(_END)
+        except BaseException as exc:  # handed to the consumer
+            put(exc)
+        finally:
+            chunks.close()
+
+    @instrumented("partitioned.iter_chunks", streaming=True)
+    def iter_chunks(
+        self,
+        key_filter: Optional[Tuple[str, Callable[[Any], bool]]] = None,
+        stats: Optional[Dict[str, int]] = None,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        yield from self._iter_files(self._scan_file, key_filter, stats)
+
+    @instrumented("partitioned.iter_batches", streaming=True)
+    def iter_batches(
+        self,
+        columns: Optional[List[str]] = None,
+        key_filter: Optional[Tuple[str, Callable[[Any], bool]]] = None,
+        stats: Optional[Dict[str, int]] = None,
+    ) -> Iterator["RecordBatch"]:
+        if columns is not None:
+            missing = [c for c in columns if c not in self.headers()]
+            if missing:
+                raise KeyError(f"columns not found in {self.root}: {missing}")
+        yield from self._iter_files(partial(self._scan_file_batches, columns=columns), key_filter, stats)
+
+    def _iter_files(
+        self,
+        scan: Callable[..., Iterator[Any]],
+        key_filter: Optional[Tuple[str, Callable[[Any], bool]]],
+        stats: Optional[Dict[str, int]],
+    ) -> Iterator[Any]:
+        # scan(path, partition values, key_filter, stats) over every file left
+        # after pruning, in partition order
+        if self._partitions is None:
+            self._discover()
+        kept = self.partitions()
+        if key_filter is not None and key_filter[0] in self._columns:
+            # a filter on a partition column prunes whole partitions
+            col, pred = key_filter
+            kept = [(vals, files) for vals, files in kept if pred(vals[col])]
+            key_filter = None
+        if stats is not None:
+            stats["partitions_total"] = stats.get("partitions_total", 0) + len(self._partitions)
+            stats["partitions_scanned"] = stats.get("partitions_scanned", 0) + len(kept)
+        tasks = [(scan, path, vals, key_filter) for vals, files in kept for path in files]
+        if stats is not None:
+            stats["files_scanned"] = stats.get("files_scanned", 0) + len(tasks)
+        if self.workers <= 1 or len(tasks) <= 1:
+            for _, path, vals, kf in tasks:
+                yield from scan(path, vals, kf, stats)
+            return
+
+        # at most 2 * workers files are in flight ahead of the consumer, each
+        # holding at most PARTITION_QUEUE_DEPTH chunks
+        stop = threading.Event()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending: "deque[Tuple[queue.Queue[Any], Dict[str, int]]]" = deque()
+
+            def submit(task: Tuple[Any, ...]) -> None:
+                out: "queue.Queue[Any]" = queue.Queue(maxsize=PARTITION_QUEUE_DEPTH)
+                file_stats: Dict[str, int] = {}
+                ctx = contextvars.copy_context()
+                pool.submit(ctx.run, self._scan_file_into, task, out, file_stats, stop)
+                pending.append((out, file_stats))
+
+            it = iter(tasks)
+            try:
+                for task in islice(it, 2 * self.workers):
+                    submit(task)
+                while pending:
+                    out, file_stats = pending.popleft()
+                    while True:
+                        item = out.get()
+                        if item is _END:
+                            break
+                        if isinstance(item, BaseException):
+                            raise item
+                        yield item
+                    task = next(it, None)
+                    if task is not None:
+                        submit(task)
+                    if stats is not None:
+                        for k, v in file_stats.items():
+                            stats[k] = stats.get(k, 0) + v
+            finally:
+                stop.set()
+
+def open_table(
+    path: str,
+    chunk_size: Optional[int] = 50_000,
+    schema: Optional[Dict[str, Any]] = None,
+    workers: int = 1,
+) -> Any:
+    # MyCSVParser for a file, PartitionedDataset for a partitioned directory
+    if os.path.isdir(path):
+        return PartitionedDataset(path, chunk_size=chunk_size, schema=schema, workers=workers)
+    return MyCSVParser(path, chunk_size=chunk_size, schema=schema)
+
+
+@instrumented("repartition_csv")
+def repartition_csv(
+    src: str,
+    root: str,
+    by: List[str],
+    sep: str = ",",
+    encoding: str = "utf-8",
+    compression: Optional[str] = None,
+    rows_per_file: Optional[int] = None,
+) -> Dict[str, int]:
+    # Rewrites a CSV as a partitioned directory (see PartitionedDataset), one
+    # pass, copying field text unchanged. The tree is built next to root and
+    # swapped in at the end, replacing any previous layout.
+    if compression is not None and compression not in _CODEC_EXTS:
+        raise ValueError(f"Unsupported compression: {compression}")
+    parser = MyCSVParser(src, sep=sep, chunk_size=50_000, encoding=encoding, lazy=True)
+    header = parser.headers()
+    missing = [c for c in by if c not in header]
+    if missing:
+        raise KeyError(f"partition columns not in {src}: {missing}")
+    data_cols = [c for c in header if c not in by]
+    null_values = parser.null_values
+
+    tmp = root.rstrip("/\\") + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    ext = ".csv" + (_CODEC_EXTS[compression] if compression else "")
+    opener = _COMPRESSION_OPENERS[compression] if compression else open
+    # partition dir -> [file, writer, rows in file, files written]
+    open_files: Dict[str, List[Any]] = {}
+    counts = {"rows": 0, "partitions": 0, "files": 0}
+
+    def next_file(d: str, state: Optional[List[Any]]) -> List[Any]:
+        n = 0 if state is None else state[3] + 1
+        if state is not None:
+            state[0].close()
+        f = opener(os.path.join(tmp, d, f"part-{n:05d}{ext}"), "wt", encoding=encoding, newline="")
+        w = csv.writer(f, delimiter=sep, lineterminator="\n")
+        w.writerow(data_cols)
+        counts["files"] += 1
+        return [f, w, 0, n]
+
+    try:
+        for chunk in parser.iter_chunks():
+            for row in chunk:
+                parts = []
+                for c in by:
+                    raw = row.raw(c)
+                    val = HIVE_NULL_PARTITION if raw in null_values else quote(raw, safe=" ")
+                    parts.append(f"{c}={val}")
+                d = os.path.join(*parts)
+                state = open_files.get(d)
+                if state is None:
+                    os.makedirs(os.path.join(tmp, d), exist_ok=True)
+                    state = open_files[d] = next_file(d, None)
+                    counts["partitions"] += 1
+                elif rows_per_file and state[2] >= rows_per_file:
+                    state = open_files[d] = next_file(d, state)
+                state[1].writerow([row.raw(c) for c in data_cols])
+                state[2] += 1
+                counts["rows"] += 1
+    finally:
+        for state in open_files.values():
+            state[0].close()
+
+    os.utime(tmp)  # the layout is as new as the finished rewrite
+    old = root.rstrip("/\\") + ".old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(root):
+        os.replace(root, old)
+    os.replace(tmp, root)
+    shutil.rmtree(old, ignore_errors=True)
+    return counts
 
 
 # ---------- MyDataFrame Class ----------
+class SortWrapper:
+    # inverts comparisons so descending keys sort with ascending ones
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return self.value > other.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def _sort_key(spec: List[Tuple[Sequence[Any], bool]]) -> Callable[[int], List[Any]]:
+    # spec: (column values, ascending?) per sort key; keys are row positions.
+    # NULL sorts after every value, so NULLs come last ascending and first
+    # descending (the SQL default); columns without NULLs compare raw values.
+    keys = [(v, asc, None in v) for v, asc in spec]
+    if not any(nullable for _, _, nullable in keys):
+        def sort_key(i):
+            return [v[i] if asc else SortWrapper(v[i]) for v, asc in spec]
+
+        return sort_key
+
+    def null_safe_key(i):
+        out = []
+        for v, asc, nullable in keys:
+            x = (v[i] is None, v[i]) if nullable else v[i]
+            out.append(x if asc else SortWrapper(x))
+        return out
+
+    return null_safe_key
+
+
+WINDOW_FUNCS = ("row_number", "rank", "dense_rank", "running_sum", "lag", "lead", "moving_avg")
+
+
+def _window_sweep(
+    spec: Tuple[Any, ...],
+    seg: List[int],
+    cols: Dict[str, List[Any]],
+    ord_cols: List[List[Any]],
+    out: List[Any],
+) -> None:
+    # fills out[i] for the rows i of one partition, given in window order
+    fn = spec[0]
+    if fn == "row_number":
+        for pos, i in enumerate(seg, 1):
+            out[i] = pos
+    elif fn in ("rank", "dense_rank"):
+        prev = None
+        rank = 0
+        for pos, i in enumerate(seg, 1):
+            key = [v[i] for v in ord_cols]
+            if key != prev:
+                rank = pos if fn == "rank" else rank + 1
+                prev = key
+            out[i] = rank
+    elif fn == "running_sum":
+        vals = cols[spec[1]]
+        acc = 0
+        for i in seg:
+            v = vals[i]
+            if v is not None:
+                acc += v
+            out[i] = acc
+    elif fn in ("lag", "lead"):
+        vals = cols[spec[1]]
+        k = spec[2] if len(spec) > 2 else 1
+        default = spec[3] if len(spec) > 3 else None
+        step = -k if fn == "lag" else k
+        m = len(seg)
+        for pos, i in enumerate(seg):
+            j = pos + step
+            out[i] = vals[seg[j]] if 0 <= j < m else default
+    else:  # moving_avg
+        vals = cols[spec[1]]
+        width = spec[2]
+        if width < 1:
+            raise ValueError("moving_avg width must be >= 1")
+        total = 0
+        count = 0
+        for pos, i in enumerate(seg):
+            v = vals[i]
+            if v is not None:
+                total += v
+                count += 1
+            if pos >= width:
+                old = vals[seg[pos - width]]
+                if old is not None:
+                    total -= old
+                    count -= 1
+            out[i] = total / count if count else None
+
+
 class MyDataFrame:
+    # Frames produced by project/filter/limit/offset/head/tail/order_by are views:
+    # they share the parent's column lists and carry a selection (a range for
+    # contiguous slices, a list of row indices otherwise). A view is materialized
+    # into its own lists on compact(), get_col(), or when an operator needs
+    # positional column access; slicing chains therefore cost O(output).
     def __init__(self, columns: Dict[str, List[Any]]):
+        self._sel: Optional[Sequence[int]] = None
+        self._shared = False
+        self._enc: Dict[int, Any] = {}
         if not columns:
-            self._cols: Dict[str, List[Any]] = {}
+            self._base: Dict[str, List[Any]] = {}
             self._n = 0
             return
         lens = {len(v) for v in columns.values()}
         if len(lens) > 1:
             raise ValueError("All columns must have equal length")
-        self._cols = {k: list(v) for k, v in columns.items()}
+        self._base = {k: list(v) for k, v in columns.items()}
         self._n = next(iter(lens))
 
+    @classmethod
+    def _wrap(cls, columns: Dict[str, List[Any]]) -> "MyDataFrame":
+        # takes ownership of freshly built column lists (no defensive copy)
+        df = cls.__new__(cls)
+        df._base = columns
+        df._sel = None
+        df._shared = False
+        df._enc = {}
+        df._n = len(next(iter(columns.values()))) if columns else 0
+        return df
+
+    def _view(
+        self,
+        cols: List[str],
+        sel: Optional[Sequence[int]],
+    ) -> "MyDataFrame":
+        df = MyDataFrame.__new__(MyDataFrame)
+        df._base = {c: self._base[c] for c in cols}
+        df._sel = sel
+        df._shared = True
+        df._enc = self._enc
+        df._n = len(sel) if sel is not None else self._n
+        self._shared = True
+        return df
+
+    def _index(self) -> Sequence[int]:
+        return self._sel if self._sel is not None else range(self._n)
+
+    @property
+    def _cols(self) -> Dict[str, List[Any]]:
+        # positional (0..n-1) read access to the columns
+        if self._sel is not None:
+            self.compact()
+        return self._base
+
+    @instrumented("frame.compact")
+    def compact(self) -> "MyDataFrame":
+        # materialize a view into column lists owned by this frame
+        if self._sel is None and not self._shared:
+            return self
+        sel = self._sel
+        if sel is None:
+            self._base = {k: v[:] for k, v in self._base.items()}
+        elif isinstance(sel, range) and sel.step == 1:
+            self._base = {k: v[sel.start:sel.stop] for k, v in self._base.items()}
+        else:
+            self._base = {k: [v[i] for i in sel] for k, v in self._base.items()}
+        self._sel = None
+        self._shared = False
+        self._enc = {}
+        return self
+
+    def is_view(self) -> bool:
+        return self._sel is not None or self._shared
+
     # ---------- construction & basics ----------
     @classmethod
+    @instrumented("frame.from_rows")
     def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> "MyDataFrame":
         cols: Dict[str, List[Any]] = {}
         initialized = False
@@ -225,200 +1281,232 @@ class MyDataFrame:
                 initialized = True
             for k in order:
                 cols[k].append(r.get(k))
-        return cls(cols)
+        return cls._wrap(cols)
+
+    @classmethod
+    @instrumented("frame.concat")
+    def concat(cls, frames: Iterable["MyDataFrame"], columns: Optional[List[str]] = None) -> "MyDataFrame":
+        # frames (e.g. a stream of RecordBatches) stacked into one frame, column
+        # by column; the column list comes from the first frame, or `columns`
+        # when there are no frames
+        cols: Optional[Dict[str, List[Any]]] = None
+        for df in frames:
+            if cols is None:
+                cols = {c: [] for c in df.columns()}
+            sel = df._sel
+            for c, out in cols.items():
+                v = df._base[c]
+                out.extend(v if sel is None else map(v.__getitem__, sel))
+        if cols is None:
+            cols = {c: [] for c in columns or []}
+        return cls._wrap(cols)
 
     def nrows(self) -> int:
         return self._n
 
     def ncols(self) -> int:
-        return len(self._cols)
+        return len(self._base)
 
     def columns(self) -> List[str]:
-        return list(self._cols.keys())
+        return list(self._base.keys())
 
     def get_col(self, name: str) -> List[Any]:
-        return self._cols[name]
+        # returns a list owned by this frame, so callers may mutate it
+        if self.is_view():
+            self.compact()
+        self._enc.pop(id(self._base[name]), None)
+        return self._base[name]
 
+    @instrumented("frame.iter_rows", streaming=True)
     def iter_rows(self) -> Iterable[Dict[str, Any]]:
-        keys = self.columns()
-        for i in range(self._n):
-            yield {k: self._cols[k][i] for k in keys}
+        pairs = list(self._base.items())
+        for i in self._index():
+            yield {k: v[i] for k, v in pairs}
 
     # ---------- core ops (single-frame) ----------
 
+    @instrumented("frame.project")
     def project(self, cols: List[str]) -> "MyDataFrame":
-        return MyDataFrame({c: self._cols[c][:] for c in cols})
-
-    def filter(self, cond_func: Callable[[Dict[str, Any]], bool]) -> "MyDataFrame":
-        keys = self.columns()
-        out: Dict[str, List[Any]] = {k: [] for k in keys}
-        for i in range(self._n):
-            row = {k: self._cols[k][i] for k in keys}
-            if cond_func(row):
-                for k in keys:
-                    out[k].append(self._cols[k][i])
-        return MyDataFrame(out)
-
+        for c in cols:
+            if c not in self._base:
+                raise KeyError(c)
+        return self._view(cols, self._sel)
+
+    @instrumented("frame.filter")
+    def filter(self, cond) -> "MyDataFrame":
+        # cond: a row predicate, or a list of (column, op, value) conditions that
+        # must all hold, op one of == != < <= > >= in (NULL matches none of
+        # them). Conditions run as NumPy masks when the backend is available.
+        check_query()
+        if callable(cond):
+            pairs = list(self._base.items())
+            sel = [i for i in self._index() if cond({k: v[i] for k, v in pairs})]
+            return self._view(self.columns(), sel)
+
+        for col, op, _ in cond:
+            if col not in self._base:
+                raise KeyError(col)
+            if op != "in" and op not in _CMP_OPS:
+                raise ValueError(f"Unsupported filter op: {op}")
+        sel: Sequence[int] = self._index()
+        if cond and self._vectorize(len(sel)):
+            vsel = self._vector_filter(cond)
+            if vsel is not None:
+                return self._view(self.columns(), vsel)
+        for col, op, value in cond:
+            v = self._base[col]
+            test = _condition_test(op, value)
+            sel = [i for i in sel if test(v[i])]
+        return self._view(self.columns(), sel)
+
+    def _slice(self, s: slice) -> "MyDataFrame":
+        return self._view(self.columns(), self._index()[s])
+
+    @instrumented("frame.limit")
     def limit(self, n: int) -> "MyDataFrame":
-        out_cols = {k: v[:n] for k, v in self._cols.items()}
-        return MyDataFrame(out_cols)
+        return self._slice(slice(None, n))
 
+    @instrumented("frame.offset")
     def offset(self, m: int) -> "MyDataFrame":
-        out_cols = {k: v[m:] for k, v in self._cols.items()}
-        return MyDataFrame(out_cols)
+        return self._slice(slice(m, None))
 
+    @instrumented("frame.head")
     def head(self, n: int = 5) -> "MyDataFrame":
-        out_cols = {k: v[:n] for k, v in self._cols.items()}
-        return MyDataFrame(out_cols)
+        return self._slice(slice(None, n))
 
+    @instrumented("frame.tail")
     def tail(self, n: int = 5) -> "MyDataFrame":
-        out_cols = {k: v[-n:] if n != 0 else [] for k, v in self._cols.items()}
-        return MyDataFrame(out_cols)
+        if n == 0:
+            return self._slice(slice(0, 0))
+        return self._slice(slice(-n, None))
 
+    @instrumented("frame.order_by")
     def order_by(self, columns: List[Tuple[str, str]]) -> "MyDataFrame":
         if not columns:
             return self
-
-        keys = self.columns()
-        data_rows = [tuple(self._cols[k][i] for k in keys) for i in range(self._n)]
-
-        class SortWrapper:
-
-            def __init__(self, value):
-                self.value = value
-
-            def __lt__(self, other):
-                return self.value > other.value
-
-            def __eq__(self, other):
-                return self.value == other.value
-
-        def sort_key(row):
-            result = []
-            for col, direction in columns:
-                val = row[keys.index(col)]
-                result.append(val if direction.lower() == "asc" else SortWrapper(val))
-            return result
-
-        sorted_rows = sorted(data_rows, key=sort_key)
-        sorted_cols = {k: [] for k in keys}
-        for row in sorted_rows:
-            for i, k in enumerate(keys):
-                sorted_cols[k].append(row[i])
-
-        return MyDataFrame(sorted_cols)
-
-    def group_by(self, keys, agg_spec: Dict[str, str]) -> "MyDataFrame":
+        check_query()
+
+        spec = [(self._base[col], direction.lower() == "asc") for col, direction in columns]
+        if self._vectorize(self._n):
+            encs = [(self._encoded(col), direction.lower() == "asc") for col, direction in columns]
+            if all(enc is not None for enc, _ in encs):
+                sel = _vec.sort_rows(encs, _vec.as_index(self._sel), self._n)
+                if sel is not None:
+                    return self._view(self.columns(), sel)
+        return self._view(self.columns(), sorted(self._index(), key=_sort_key(spec)))
+
+    @instrumented("frame.window")
+    def window(
+        self,
+        partition_by,
+        order_by: List[Tuple[str, str]],
+        funcs: Dict[str, Tuple[Any, ...]],
+    ) -> "MyDataFrame":
+        # funcs maps an output column to (function, column, *args):
+        #   ("row_number",) ("rank",) ("dense_rank",)  by the order_by keys
+        #   ("running_sum", col)                       cumulative sum, NULLs skipped
+        #   ("lag", col[, k=1[, default]]) ("lead", col[, k=1[, default]])
+        #   ("moving_avg", col, width)                 mean of the last `width` rows
+        #                                              (current included), NULLs skipped
+        # One sort by (partition, order) keys, then one sweep over each partition.
+        # Returns a view in that order with the new columns appended.
+        check_query()
+        if isinstance(partition_by, str):
+            partition_by = [partition_by]
+        for name, spec in funcs.items():
+            if name in self._base:
+                raise ValueError(f"window output '{name}' already exists")
+            if spec[0] not in WINDOW_FUNCS:
+                raise ValueError(f"Unsupported window function: {spec[0]}")
+
+        cols = self._cols
+        n = self._n
+        part_cols = [cols[c] for c in partition_by]
+        ord_cols = [cols[c] for c, _ in order_by]
+        sort_spec = [(v, True) for v in part_cols] + [
+            (cols[c], d.lower() == "asc") for c, d in order_by
+        ]
+        order = sorted(range(n), key=_sort_key(sort_spec)) if sort_spec else list(range(n))
+        out: Dict[str, List[Any]] = {name: [None] * n for name in funcs}
+
+        start = 0
+        while start < n:
+            first = order[start]
+            end = start + 1
+            while end < n and all(v[order[end]] == v[first] for v in part_cols):
+                end += 1
+            seg = order[start:end]
+            for name, spec in funcs.items():
+                _window_sweep(spec, seg, cols, ord_cols, out[name])
+            start = end
+
+        self._shared = True
+        base = dict(cols)
+        base.update(out)
+        df = MyDataFrame._wrap(base)
+        return df._view(df.columns(), order)
+
+    @instrumented("frame.group_by")
+    def group_by(
+        self,
+        keys,
+        agg_spec: Dict[str, str],
+        memory_budget: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+    ) -> "MyDataFrame":
+        # memory_budget (bytes): see HashAggregator for the spill-to-disk path
+        check_query()
         if isinstance(keys, str):
             keys = [keys]
 
-        state: Dict[Tuple[Any, ...], Dict[Tuple[str, str], Any]] = {}
-
-        def init_state():
-            s: Dict[Tuple[str, str], Any] = {}
-            for col, agg in agg_spec.items():
-                if agg == "avg":
-                    s[(col, "sum")] = 0.0
-                    s[(col, "count")] = 0
-                elif agg == "sum":
-                    s[(col, "sum")] = 0.0
-                elif agg == "min":
-                    s[(col, "min")] = None
-                elif agg == "max":
-                    s[(col, "max")] = None
-                elif agg == "count":
-                    s[(col, "count")] = 0
-                elif agg == "count_col":
-                    s[(col, "count_col")] = 0
-                else:
-                    raise ValueError(f"Unsupported agg: {agg}")
-            return s
-
-        def update(s, i):
-            for col, agg in agg_spec.items():
-                v = self._cols[col][i]
-
-                if agg == "sum":
-                    s[(col, "sum")] += (v if v is not None else 0)
-
-                elif agg == "min":
-                    cur = s[(col, "min")]
-                    if cur is None:
-                        s[(col, "min")] = v
-                    elif v is not None and v < cur:
-                        s[(col, "min")] = v
-
-                elif agg == "max":
-                    cur = s[(col, "max")]
-                    if cur is None:
-                        s[(col, "max")] = v
-                    elif v is not None and v > cur:
-                        s[(col, "max")] = v
-
-                elif agg == "count":
-                    s[(col, "count")] += 1
-
-                elif agg == "count_col":
-                    if v is not None:
-                        s[(col, "count_col")] += 1
+        if keys and memory_budget is None and self._vectorize(self._n):
+            out = self._vector_group_by(keys, agg_spec)
+            if out is not None:
+                return out
 
-                elif agg == "avg":
-                    if v is not None:
-                        s[(col, "sum")] += v
-                        s[(col, "count")] += 1
-
-        for i in range(self._n):
-            ktuple = tuple(self._cols[k][i] for k in keys)
-            s = state.get(ktuple)
-            if s is None:
-                s = init_state()
-                state[ktuple] = s
-            update(s, i)
-
-        out_cols: Dict[str, List[Any]] = {k: [] for k in keys}
-        output_specs: List[Tuple[str, str, str]] = []
-
-        for col, agg in agg_spec.items():
-            if agg == "sum":
-                name = f"sum_{col}"
-            elif agg == "min":
-                name = f"min_{col}"
-            elif agg == "max":
-                name = f"max_{col}"
-            elif agg == "count":
-                name = "count_all"
-            elif agg == "count_col":
-                name = f"count_{col}"
-            elif agg == "avg":
-                name = f"avg_{col}"
-            else:
-                raise ValueError(f"Unsupported agg: {agg}")
-
-            output_specs.append((col, agg, name))
-            out_cols[name] = []
-
-        for ktuple, s in state.items():
-            for j, k in enumerate(keys):
-                out_cols[k].append(ktuple[j])
-
-            for col, agg, name in output_specs:
-                if agg == "sum":
-                    val = s[(col, "sum")]
-                elif agg == "min":
-                    val = s[(col, "min")]
-                elif agg == "max":
-                    val = s[(col, "max")]
-                elif agg == "count":
-                    val = s[(col, "count")]
-                elif agg == "count_col":
-                    val = s[(col, "count_col")]
-                elif agg == "avg":
-                    c = s[(col, "count")]
-                    val = (s[(col, "sum")] / c) if c > 0 else None
-                out_cols[name].append(val)
-
-        return MyDataFrame(out_cols)
+        cols = self._cols
+        key_cols = [cols[k] for k in keys]
+        agg_cols = [cols[c] for c in agg_spec]
+        agg = HashAggregator(keys, agg_spec, memory_budget=memory_budget, spill_dir=spill_dir)
+        try:
+            agg.add_columns(key_cols, agg_cols)
+            return agg.to_df()
+        finally:
+            agg.close()
 
+    @instrumented("frame.distinct")
+    def distinct(
+        self,
+        cols=None,
+        memory_budget: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+    ) -> "MyDataFrame":
+        # first row of each distinct combination of cols (default: all columns),
+        # as a view keeping all columns and the current row order.
+        # memory_budget (bytes): see DistinctKeys for the spill-to-disk path
+        check_query()
+        if cols is None:
+            cols = self.columns()
+        elif isinstance(cols, str):
+            cols = [cols]
+        for c in cols:
+            if c not in self._base:
+                raise KeyError(c)
+
+        idx = self._index()
+        key_cols = [self._base[c] for c in cols]
+        if len(key_cols) == 1:
+            v = key_cols[0]
+            items = ((v[i], j) for j, i in enumerate(idx))
+        else:
+            items = ((tuple(v[i] for v in key_cols), j) for j, i in enumerate(idx))
+        seen = DistinctKeys(memory_budget, spill_dir)
+        keep = list(seen.filter(items))
+        if seen.stats["spilled_rows"]:
+            keep.sort()
+        return self._view(self.columns(), [idx[j] for j in keep])
+
+    @instrumented("frame.join")
     def join(
         self,
         other: "MyDataFrame",
@@ -426,19 +1514,32 @@ class MyDataFrame:
         how: str = "inner",
         suffixes: Tuple[str, str] = ("_x", "_y"),
     ) -> "MyDataFrame":
-        if on_key not in self._cols or on_key not in other._cols:
+        if on_key not in self._base or on_key not in other._base:
             raise KeyError(f"join key '{on_key}' missing in one of the DataFrames")
+        check_query()
 
-        right_index: Dict[Any, List[int]] = defaultdict(list)
+        left_cols = self.columns()
         right_cols = other.columns()
+        right_nonkey = [c for c in right_cols if c != on_key]
+
+        if self._vectorize(self._n + other._n):
+            rows = self._vector_join(other, on_key, how)
+            if rows is not None:
+                lrows, rrows = rows
+                out = {c: _gather(self._base[c], lrows) for c in left_cols}
+                for c in right_nonkey:
+                    name = c if c not in left_cols else c + suffixes[1]
+                    out[name] = _gather(other._base[c], rrows)
+                return MyDataFrame._wrap(out)
+
+        lcols = self._cols
+        rcols = other._cols
+        right_index: Dict[Any, List[int]] = defaultdict(list)
 
         for j in range(other._n):
-            key_val = other._cols[on_key][j]
+            key_val = rcols[on_key][j]
             right_index[key_val].append(j)
 
-        left_cols = self.columns()
-        right_nonkey = [c for c in right_cols if c != on_key]
-
         out_cols: Dict[str, List[Any]] = {}
         for c in left_cols:
             out_cols[c] = []
@@ -448,25 +1549,25 @@ class MyDataFrame:
 
         # left side rows
         for i in range(self._n):
-            lk = self._cols[on_key][i]
+            lk = lcols[on_key][i]
             matches = right_index.get(lk)
 
             if matches:
                 for j in matches:
                     for c in left_cols:
-                        out_cols[c].append(self._cols[c][i])
+                        out_cols[c].append(lcols[c][i])
                     for c in right_nonkey:
                         name = c if c not in left_cols else c + suffixes[1]
-                        out_cols[name].append(other._cols[c][j])
+                        out_cols[name].append(rcols[c][j])
             elif how == "left":
                 for c in left_cols:
-                    out_cols[c].append(self._cols[c][i])
+                    out_cols[c].append(lcols[c][i])
                 for c in right_nonkey:
                     name = c if c not in left_cols else c + suffixes[1]
                     out_cols[name].append(None)
 
         if how == "right":
-            left_key_vals = set(self._cols[on_key])
+            left_key_vals = set(lcols[on_key])
             for key_val, idxs in right_index.items():
                 if key_val not in left_key_vals:
                     for j in idxs:
@@ -474,132 +1575,616 @@ class MyDataFrame:
                             out_cols[c].append(None)
                         for c in right_nonkey:
                             name = c if c not in left_cols else c + suffixes[1]
-                            out_cols[name].append(other._cols[c][j])
+                            out_cols[name].append(rcols[c][j])
+
+        return MyDataFrame._wrap(out_cols)
+
+    # ---------- NumPy backend ----------
+    def _vectorize(self, n: int) -> bool:
+        return VECTORIZE and n >= _vec.MIN_ROWS
+
+    def _encoded(self, name: str) -> Any:
+        return _vec.encoded(self._base[name], self._enc)
+
+    def _vector_filter(self, cond: List[Tuple[str, str, Any]]) -> Optional[List[int]]:
+        mask = None
+        for col, op, value in cond:
+            enc = self._encoded(col)
+            m = None if enc is None else _vec.compare(enc, _CMP_OPS.get(op), value)
+            if m is None:
+                return None
+            mask = m if mask is None else mask & m
+        return _vec.select(mask, self._sel)
+
+    def _vector_group_by(self, keys: List[str], agg_spec: Dict[str, str]) -> Optional["MyDataFrame"]:
+        key_encs = [self._encoded(k) for k in keys]
+        agg_specs = [
+            (agg, col, None if agg == "count" else self._encoded(col)) for col, agg in agg_spec.items()
+        ]
+        if any(enc is None for enc in key_encs) or any(
+            enc is None for agg, _, enc in agg_specs if agg != "count"
+        ):
+            return None
+        res = _vec.group_by(
+            key_encs, [self._base[k] for k in keys], agg_specs, _vec.as_index(self._sel), self._n
+        )
+        if res is None:
+            return None
+        keys_out, aggs_out = res
+        out: Dict[str, List[Any]] = dict(zip(keys, keys_out))
+        for (col, agg), values in zip(agg_spec.items(), aggs_out):
+            out[_agg_output_name(col, agg)] = values
+        return MyDataFrame._wrap(out)
+
+    def _vector_join(self, other: "MyDataFrame", on_key: str, how: str) -> Optional[Tuple[List[int], List[int]]]:
+        lenc = self._encoded(on_key)
+        renc = other._encoded(on_key)
+        if lenc is None or renc is None:
+            return None
+        return _vec.join_rows(lenc, renc, _vec.as_index(self._sel), _vec.as_index(other._sel), how)
 
-        return MyDataFrame(out_cols)
 
-#for chunk size
-def group_by_streaming(
-    parser: MyCSVParser,
-    keys,
-    agg_spec: Dict[str, str],
-) -> MyDataFrame:
-    if isinstance(keys, str):
-        keys = [keys]
+_CMP_OPS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
 
-    state: Dict[Tuple[Any, ...], Dict[Tuple[str, str], Any]] = {}
 
-    def init_state() -> Dict[Tuple[str, str], Any]:
-        s: Dict[Tuple[str, str], Any] = {}
-        for col, agg in agg_spec.items():
-            if agg == "avg":
-                s[(col, "sum")] = 0.0
-                s[(col, "count")] = 0
-            elif agg == "sum":
-                s[(col, "sum")] = 0.0
-            elif agg == "min":
-                s[(col, "min")] = None
-            elif agg == "max":
-                s[(col, "max")] = None
-            elif agg == "count":
-                s[(col, "count")] = 0
-            elif agg == "count_col":
-                s[(col, "count_col")] = 0
+class RecordBatch(MyDataFrame):
+    # One chunk of a scan in columnar form (MyCSVParser.iter_batches): column
+    # lists plus schema, column -> declared type (None where the parser infers
+    # it). Being a frame, a batch goes through filter / project / group_by
+    # without row dicts; those are built only by iter_rows() at the boundary.
+    schema: Dict[str, Any]
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, List[Any]], schema: Dict[str, Any], nrows: int) -> "RecordBatch":
+        batch = cls._wrap(columns)
+        batch._n = nrows
+        batch.schema = schema
+        return batch
+
+
+def _condition_test(op: str, value: Any) -> Callable[[Any], bool]:
+    if op == "in":
+        return lambda x: x is not None and x in value
+    fn = _CMP_OPS[op]
+    return lambda x: x is not None and fn(x, value)
+
+
+def _null_or(test: Callable[[Any], bool]) -> Callable[[Any], bool]:
+    return lambda x: x is None or test(x)
+
+
+def _gather(col: Sequence[Any], rows: List[int]) -> List[Any]:
+    # col values at rows; -1 gives None
+    if rows and min(rows) < 0:
+        return [col[i] if i >= 0 else None for i in rows]
+    return list(map(col.__getitem__, rows))
+
+#for chunk size
+# ---------- sketches (approximate aggregates) ----------
+def _stable_hash64(value: Any) -> int:
+    # unlike hash(), stable across processes, so sketches can be persisted and merged
+    return int.from_bytes(hashlib.blake2b(repr(value).encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class MyHyperLogLog:
+    # distinct-count estimate in 2**precision registers (relative standard error
+    # 1.04 / sqrt(2**precision)); exact while it has seen few distinct values
+    SPARSE_LIMIT = 256
+
+    def __init__(self, precision: int = 12):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.m = 1 << precision
+        self._sparse: Optional[set] = set()
+        self._registers: Optional[bytearray] = None
+
+    def __sizeof__(self) -> int:
+        size = object.__sizeof__(self)
+        if self._sparse is not None:
+            size += sys.getsizeof(self._sparse) + 32 * len(self._sparse)
+        if self._registers is not None:
+            size += sys.getsizeof(self._registers)
+        return size
+
+    def add(self, value: Any) -> None:
+        h = _stable_hash64(value)
+        if self._sparse is not None:
+            self._sparse.add(h)
+            if len(self._sparse) > self.SPARSE_LIMIT:
+                self._densify()
+            return
+        self._add_hash(h)
+
+    def _add_hash(self, h: int) -> None:
+        p = self.precision
+        idx = h >> (64 - p)
+        rest = h & ((1 << (64 - p)) - 1)
+        rank = (64 - p) - rest.bit_length() + 1
+        if rank > self._registers[idx]:
+            self._registers[idx] = rank
+
+    def _densify(self) -> None:
+        self._registers = bytearray(self.m)
+        for h in self._sparse:
+            self._add_hash(h)
+        self._sparse = None
+
+    def merge(self, other: "MyHyperLogLog") -> "MyHyperLogLog":
+        if other.precision != self.precision:
+            raise ValueError("cannot merge HyperLogLogs of different precision")
+        if other._sparse is not None:
+            if self._sparse is not None:
+                self._sparse |= other._sparse
+                if len(self._sparse) > self.SPARSE_LIMIT:
+                    self._densify()
             else:
-                raise ValueError(f"Unsupported agg: {agg}")
-        return s
+                for h in other._sparse:
+                    self._add_hash(h)
+            return self
+        if self._sparse is not None:
+            self._densify()
+        regs = self._registers
+        for i, r in enumerate(other._registers):
+            if r > regs[i]:
+                regs[i] = r
+        return self
+
+    def count(self) -> int:
+        if self._sparse is not None:
+            return len(self._sparse)
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self._registers)
+        zeros = self._registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # linear counting for small ranges
+        return int(round(estimate))
+
+    def relative_error(self) -> float:
+        return 0.0 if self._sparse is not None else 1.04 / math.sqrt(self.m)
+
+
+class MyQuantileSketch:
+    # mergeable quantile sketch (KLL-style compactors): level h holds items of
+    # weight 2**h; a full level is sorted and every other item is promoted.
+    # Rank error is roughly O(log(n / k) / k); the result is deterministic.
+    def __init__(self, k: int = 200):
+        self.k = k
+        self.n = 0
+        self._levels: List[List[Any]] = [[]]
+        self._flip = 0
+
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + sum(sys.getsizeof(lv) + 24 * len(lv) for lv in self._levels)
+
+    def add(self, value: Any) -> None:
+        self._levels[0].append(value)
+        self.n += 1
+        if len(self._levels[0]) >= self.k:
+            self._compress()
+
+    def _compress(self) -> None:
+        h = 0
+        while h < len(self._levels):
+            level = self._levels[h]
+            if len(level) >= self.k:
+                level.sort()
+                if h + 1 == len(self._levels):
+                    self._levels.append([])
+                self._levels[h + 1].extend(level[self._flip::2])
+                self._flip ^= 1
+                self._levels[h] = []
+            h += 1
+
+    def merge(self, other: "MyQuantileSketch") -> "MyQuantileSketch":
+        for h, level in enumerate(other._levels):
+            if h == len(self._levels):
+                self._levels.append([])
+            self._levels[h].extend(level)
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantile(self, q: float) -> Any:
+        if not 0.0 <= q <= 1.0:
+            raise ValueError("quantile must be in [0, 1]")
+        weighted = sorted(
+            (v, 1 << h) for h, level in enumerate(self._levels) for v in level
+        )
+        if not weighted:
+            return None
+        target = q * sum(w for _, w in weighted)
+        seen = 0
+        for v, w in weighted:
+            seen += w
+            if seen >= target:
+                return v
+        return weighted[-1][0]
 
-    def update_state_for_chunk(chunk_df: MyDataFrame) -> None:
-        for i in range(chunk_df.nrows()):
-            group_key = tuple(chunk_df._cols[k][i] for k in keys)
-            s = state.get(group_key)
-            if s is None:
-                s = init_state()
-                state[group_key] = s
-
-            for col, agg in agg_spec.items():
-                v = chunk_df._cols[col][i]
-
-                if agg == "sum":
-                    s[(col, "sum")] += (v if v is not None else 0)
-
-                elif agg == "min":
-                    cur = s[(col, "min")]
-                    if cur is None:
-                        s[(col, "min")] = v
-                    elif v is not None and v < cur:
-                        s[(col, "min")] = v
-
-                elif agg == "max":
-                    cur = s[(col, "max")]
-                    if cur is None:
-                        s[(col, "max")] = v
-                    elif v is not None and v > cur:
-                        s[(col, "max")] = v
-
-                elif agg == "count":
-                    s[(col, "count")] += 1
-
-                elif agg == "count_col":
-                    if v is not None:
-                        s[(col, "count_col")] += 1
-
-                elif agg == "avg":
-                    if v is not None:
-                        s[(col, "sum")] += v
-                        s[(col, "count")] += 1
-
-    # stream all chunks
-    for chunk_rows in parser.iter_chunks():
-        if not chunk_rows:
-            continue
-        chunk_df = MyDataFrame.from_rows(chunk_rows)
-        update_state_for_chunk(chunk_df)
+    def median(self) -> Any:
+        return self.quantile(0.5)
+
+
+_APPROX_PCT_RE = re.compile(r"approx_p(\d{1,2}(?:\.\d+)?)$")
 
-    # finalize state into output dataframe
-    out_cols: Dict[str, List[Any]] = {k: [] for k in keys}
-    output_specs: List[Tuple[str, str, str]] = []
 
+def _approx_quantile(agg: str) -> Optional[float]:
+    # "approx_median" -> 0.5, "approx_p90" -> 0.9, anything else -> None
+    if agg == "approx_median":
+        return 0.5
+    m = _APPROX_PCT_RE.match(agg)
+    return float(m.group(1)) / 100 if m else None
+
+
+# ---------- hash aggregation (shared by group_by / group_by_streaming) ----------
+def _agg_init_state(agg_spec: Dict[str, str]) -> Dict[Tuple[str, str], Any]:
+    s: Dict[Tuple[str, str], Any] = {}
     for col, agg in agg_spec.items():
+        if agg == "avg":
+            s[(col, "sum")] = 0.0
+            s[(col, "count")] = 0
+        elif agg == "sum":
+            s[(col, "sum")] = 0.0
+        elif agg == "sum_exact":
+            # SQL SUM: no float start value, so ints add up exactly; None
+            # until the first non-null value
+            s[(col, "sum_exact")] = None
+        elif agg == "min":
+            s[(col, "min")] = None
+        elif agg == "max":
+            s[(col, "max")] = None
+        elif agg == "count":
+            s[(col, "count")] = 0
+        elif agg == "count_col":
+            s[(col, "count_col")] = 0
+        elif agg == "approx_count_distinct":
+            s[(col, "hll")] = MyHyperLogLog()
+        elif _approx_quantile(agg) is not None:
+            s[(col, "quantiles")] = MyQuantileSketch()
+        else:
+            raise ValueError(f"Unsupported agg: {agg}")
+    return s
+
+
+def _agg_update(
+    s: Dict[Tuple[str, str], Any],
+    agg_items: List[Tuple[str, str]],
+    values: Sequence[Any],
+) -> None:
+    # values[j] is the input value for agg_items[j]
+    for (col, agg), v in zip(agg_items, values):
+        if agg == "sum":
+            s[(col, "sum")] += (v if v is not None else 0)
+
+        elif agg == "sum_exact":
+            if v is not None:
+                cur = s[(col, "sum_exact")]
+                s[(col, "sum_exact")] = v if cur is None else cur + v
+
+        elif agg == "min":
+            cur = s[(col, "min")]
+            if cur is None:
+                s[(col, "min")] = v
+            elif v is not None and v < cur:
+                s[(col, "min")] = v
+
+        elif agg == "max":
+            cur = s[(col, "max")]
+            if cur is None:
+                s[(col, "max")] = v
+            elif v is not None and v > cur:
+                s[(col, "max")] = v
+
+        elif agg == "count":
+            s[(col, "count")] += 1
+
+        elif agg == "count_col":
+            if v is not None:
+                s[(col, "count_col")] += 1
+
+        elif agg == "avg":
+            if v is not None:
+                s[(col, "sum")] += v
+                s[(col, "count")] += 1
+
+        elif agg == "approx_count_distinct":
+            if v is not None:
+                s[(col, "hll")].add(v)
+
+        elif v is not None:  # approx_median / approx_pNN
+            s[(col, "quantiles")].add(v)
+
+
+def _agg_output_name(col: str, agg: str) -> str:
+    if agg in ("sum", "sum_exact", "min", "max", "avg"):
+        return f"{agg}_{col}"
+    if agg == "count":
+        return "count_all"
+    if agg == "count_col":
+        return f"count_{col}"
+    if agg == "approx_count_distinct" or _approx_quantile(agg) is not None:
+        return f"{agg}_{col}"
+    raise ValueError(f"Unsupported agg: {agg}")
+
+
+def _agg_finalize(s: Dict[Tuple[str, str], Any], agg_items: List[Tuple[str, str]]) -> Tuple[Any, ...]:
+    # output values of one group's aggregate state, in agg_spec order
+    out = []
+    for col, agg in agg_items:
         if agg == "sum":
-            name = f"sum_{col}"
+            val = s[(col, "sum")]
+        elif agg == "sum_exact":
+            val = s[(col, "sum_exact")]
         elif agg == "min":
-            name = f"min_{col}"
+            val = s[(col, "min")]
         elif agg == "max":
-            name = f"max_{col}"
+            val = s[(col, "max")]
         elif agg == "count":
-            name = "count_all"
+            val = s[(col, "count")]
         elif agg == "count_col":
-            name = f"count_{col}"
+            val = s[(col, "count_col")]
         elif agg == "avg":
-            name = f"avg_{col}"
+            c = s[(col, "count")]
+            val = (s[(col, "sum")] / c) if c > 0 else None
+        elif agg == "approx_count_distinct":
+            val = s[(col, "hll")].count()
         else:
-            raise ValueError(f"Unsupported agg: {agg}")
+            val = s[(col, "quantiles")].quantile(_approx_quantile(agg))
+        out.append(val)
+    return tuple(out)
 
-        output_specs.append((col, agg, name))
+
+def _agg_rows_to_df(
+    rows: Iterable[Tuple[Tuple[Any, ...], Tuple[Any, ...]]],
+    keys: List[str],
+    agg_spec: Dict[str, str],
+) -> MyDataFrame:
+    # (key, finalized values) pairs as a frame of key + aggregate columns
+    names = [_agg_output_name(col, agg) for col, agg in agg_spec.items()]
+    out_cols: Dict[str, List[Any]] = {k: [] for k in keys}
+    for name in names:
         out_cols[name] = []
+    key_lists = [out_cols[k] for k in keys]
+    val_lists = [out_cols[n] for n in names]
 
-    for group_key, s in state.items():
-        for j, k in enumerate(keys):
-            out_cols[k].append(group_key[j])
-
-        for col, agg, name in output_specs:
-            if agg == "sum":
-                val = s[(col, "sum")]
-            elif agg == "min":
-                val = s[(col, "min")]
-            elif agg == "max":
-                val = s[(col, "max")]
-            elif agg == "count":
-                val = s[(col, "count")]
-            elif agg == "count_col":
-                val = s[(col, "count_col")]
-            elif agg == "avg":
-                c = s[(col, "count")]
-                val = (s[(col, "sum")] / c) if c > 0 else None
-            out_cols[name].append(val)
-
-    return MyDataFrame(out_cols)
+    for ktuple, values in rows:
+        for out, v in zip(key_lists, ktuple):
+            out.append(v)
+        for out, v in zip(val_lists, values):
+            out.append(v)
+
+    return MyDataFrame._wrap(out_cols)
+
+
+def _agg_state_to_df(
+    groups: Iterable[Tuple[Tuple[Any, ...], Dict[Tuple[str, str], Any]]],
+    keys: List[str],
+    agg_spec: Dict[str, str],
+) -> MyDataFrame:
+    agg_items = list(agg_spec.items())
+    return _agg_rows_to_df(((k, _agg_finalize(s, agg_items)) for k, s in groups), keys, agg_spec)
+
+
+SPILL_PARTITIONS = 16
+MAX_SPILL_DEPTH = 4
+_SPILL_BATCH = 4096
+
+
+class _SpillFiles:
+    # SPILL_PARTITIONS temp files of pickled item batches, removed on close()
+    def __init__(self, spill_dir: Optional[str], prefix: str):
+        self.tmpdir = tempfile.mkdtemp(prefix=prefix, dir=spill_dir)
+        self._files = [
+            open(os.path.join(self.tmpdir, f"part-{p}.pkl"), "wb") for p in range(SPILL_PARTITIONS)
+        ]
+        self._bufs: List[List[Any]] = [[] for _ in range(SPILL_PARTITIONS)]
+
+    def append(self, p: int, item: Any) -> None:
+        buf = self._bufs[p]
+        buf.append(item)
+        if len(buf) >= _SPILL_BATCH:
+            pickle.dump(buf, self._files[p], protocol=pickle.HIGHEST_PROTOCOL)
+            self._bufs[p] = []
+
+    def finish(self) -> None:
+        # flushes the buffers and closes the files for reading
+        for p, f in enumerate(self._files):
+            if self._bufs[p]:
+                pickle.dump(self._bufs[p], f, protocol=pickle.HIGHEST_PROTOCOL)
+                self._bufs[p] = []
+            f.close()
+
+    def iter_partition(self, p: int) -> Iterator[Any]:
+        with open(os.path.join(self.tmpdir, f"part-{p}.pkl"), "rb") as f:
+            while True:
+                try:
+                    batch = pickle.load(f)
+                except EOFError:
+                    return
+                yield from batch
+
+    def close(self) -> None:
+        for f in self._files:
+            if not f.closed:
+                f.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+class HashAggregator:
+    # Hybrid hash aggregation with an optional memory budget (bytes of estimated
+    # group state). Groups admitted before the budget is reached stay resident
+    # and keep aggregating in memory; rows of any other group are hash-
+    # partitioned to temp files and each partition is aggregated on its own
+    # (recursively, with a fresh hash salt, if it overflows as well). Every group
+    # therefore folds its rows in input order, so results -- including float
+    # sums and the first-seen output order -- match the in-memory path exactly.
+    def __init__(
+        self,
+        keys: List[str],
+        agg_spec: Dict[str, str],
+        memory_budget: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+        state: Optional[Dict[Tuple[Any, ...], Dict[Tuple[str, str], Any]]] = None,
+        _depth: int = 0,
+        _track_order: bool = False,
+    ):
+        if state is not None and memory_budget is not None:
+            raise ValueError("memory_budget cannot be combined with an external state")
+        self.keys = keys
+        self.agg_spec = agg_spec
+        self.agg_items = list(agg_spec.items())
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.state = state if state is not None else {}
+        self.stats: Dict[str, int] = {"spilled_rows": 0, "spill_partitions": 0}
+        self._depth = _depth
+        self._track_order = _track_order or memory_budget is not None
+        self._first_seen: Dict[Tuple[Any, ...], int] = {}
+        self._est_bytes = 0
+        init = _agg_init_state(agg_spec)
+        self._state_bytes = sys.getsizeof(init) + sum(sys.getsizeof(v) for v in init.values()) + 120 * len(
+            self.agg_items
+        )
+        self._spilling = False
+        self._spill_files: Optional[_SpillFiles] = None
+
+    def add(self, ktuple: Tuple[Any, ...], values: Sequence[Any], seq: int = 0) -> None:
+        s = self.state.get(ktuple)
+        if s is None:
+            if self._spilling:
+                self._spill(ktuple, values, seq)
+                return
+            s = _agg_init_state(self.agg_spec)
+            self.state[ktuple] = s
+            if self._track_order:
+                self._first_seen[ktuple] = seq
+            if self.memory_budget is not None:
+                self._est_bytes += self._state_bytes + sys.getsizeof(ktuple) + sum(
+                    sys.getsizeof(part) for part in ktuple
+                )
+                if self._est_bytes > self.memory_budget:
+                    self._start_spilling()
+        _agg_update(s, self.agg_items, values)
+
+    def add_columns(
+        self,
+        key_cols: List[List[Any]],
+        val_cols: List[List[Any]],
+        seq0: int = 0,
+    ) -> None:
+        # bulk add() over aligned column lists; rows get seq numbers seq0, seq0+1, ...
+        key_iter = zip(*key_cols)
+        val_iter = zip(*val_cols) if val_cols else repeat(())
+        if self.memory_budget is not None or self._track_order:
+            for i, (ktuple, values) in enumerate(zip(key_iter, val_iter), seq0):
+                self.add(ktuple, values, i)
+            return
+        state = self.state
+        agg_spec = self.agg_spec
+        agg_items = self.agg_items
+        for ktuple, values in zip(key_iter, val_iter):
+            s = state.get(ktuple)
+            if s is None:
+                s = _agg_init_state(agg_spec)
+                state[ktuple] = s
+            _agg_update(s, agg_items, values)
+
+    def _start_spilling(self) -> None:
+        self._spilling = True
+        self._spill_files = _SpillFiles(self.spill_dir, "olympiascope-agg-")
+        self.stats["spill_partitions"] = SPILL_PARTITIONS
+
+    def _spill(self, ktuple: Tuple[Any, ...], values: Sequence[Any], seq: int) -> None:
+        p = hash((self._depth, ktuple)) % SPILL_PARTITIONS
+        self._spill_files.append(p, (ktuple, tuple(values), seq))
+        self.stats["spilled_rows"] += 1
+
+    def iter_groups(self) -> Iterator[Tuple[int, Tuple[Any, ...], Dict[Tuple[str, str], Any]]]:
+        # (first_seen, key, state) for every group; resident groups first, then
+        # each spilled partition
+        for ktuple, s in self.state.items():
+            yield self._first_seen.get(ktuple, 0), ktuple, s
+        if not self._spilling:
+            return
+        try:
+            self._spill_files.finish()
+            child_budget = self.memory_budget if self._depth + 1 < MAX_SPILL_DEPTH else None
+            for p in range(SPILL_PARTITIONS):
+                check_query()
+                child = HashAggregator(
+                    self.keys,
+                    self.agg_spec,
+                    memory_budget=child_budget,
+                    spill_dir=self.spill_dir,
+                    _depth=self._depth + 1,
+                    _track_order=True,
+                )
+                try:
+                    for ktuple, values, seq in self._spill_files.iter_partition(p):
+                        child.add(ktuple, values, seq)
+                    yield from child.iter_groups()
+                finally:
+                    child.close()
+                self.stats["spilled_rows"] += child.stats["spilled_rows"]
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._spill_files is not None:
+            self._spill_files.close()
+            self._spill_files = None
+
+    def to_df(self) -> MyDataFrame:
+        if not self._spilling:
+            return _agg_state_to_df(((k, s) for _, k, s in self.iter_groups()), self.keys, self.agg_spec)
+        # each group is finalized as it comes out of its partition, so only the
+        # compact output rows -- not every group's state -- are held for the
+        # sort back into first-seen order
+        rows = [(seen, k, _agg_finalize(s, self.agg_items)) for seen, k, s in self.iter_groups()]
+        rows.sort(key=operator.itemgetter(0))
+        return _agg_rows_to_df(((k, v) for _, k, v in rows), self.keys, self.agg_spec)
+
+
+@instrumented("group_by_streaming")
+def group_by_streaming(
+    parser: MyCSVParser,
+    keys,
+    agg_spec: Dict[str, str],
+    state: Optional[Dict[Tuple[Any, ...], Dict[Tuple[str, str], Any]]] = None,
+    memory_budget: Optional[int] = None,
+    spill_dir: Optional[str] = None,
+) -> MyDataFrame:
+    # state: optional per-group aggregate state to continue from; it is updated
+    # in place so callers can persist it (see group_by_incremental_csv).
+    # memory_budget (bytes): see HashAggregator for the spill-to-disk path.
+    if isinstance(keys, str):
+        keys = [keys]
+
+    agg = HashAggregator(keys, agg_spec, memory_budget=memory_budget, spill_dir=spill_dir, state=state)
+    agg_cols = list(agg_spec)
+    seq = 0
+
+    # stream column batches holding only the key and aggregated columns; the
+    # finally removes any spill files if the scan is cancelled or times out
+    try:
+        for batch in parser.iter_batches(columns=list(dict.fromkeys(keys + agg_cols))):
+            if not batch.nrows():
+                continue
+            cols = batch._cols
+            agg.add_columns([cols[k] for k in keys], [cols[c] for c in agg_cols], seq)
+            seq += batch.nrows()
+
+        return agg.to_df()
+    finally:
+        agg.close()
 
 
 def group_by_streaming_csv(
@@ -609,43 +2194,545 @@ def group_by_streaming_csv(
     sep: str = ",",
     chunk_size: int = 50_000,
     encoding: str = "utf-8",
+    memory_budget: Optional[int] = None,
+    spill_dir: Optional[str] = None,
 ) -> MyDataFrame:
     parser = MyCSVParser(filename, sep=sep, chunk_size=chunk_size, encoding=encoding)
-    return group_by_streaming(parser, keys, agg_spec)
+    return group_by_streaming(parser, keys, agg_spec, memory_budget=memory_budget, spill_dir=spill_dir)
+
+
+# ---------- distinct (deduplication) ----------
+_FP2_SALT = 0x9E3779B97F4A7C15
+
+
+class DistinctKeys:
+    # Set of seen keys stored as a 64-bit fingerprint plus a second, independent
+    # 64-bit check hash, instead of the key objects themselves. Keys whose
+    # fingerprints collide (same fingerprint, different check hash) are kept
+    # exactly under that fingerprint, so two keys are only confused when both
+    # hashes collide. persistent=True hashes with blake2b instead of hash(), so
+    # the set stays valid when pickled and loaded by another process.
+    #
+    # filter() honours memory_budget (bytes, estimated) like HashAggregator:
+    # once it is exceeded, keys already held still drop their duplicates, and
+    # rows with unseen keys are hash-partitioned to temp files and deduplicated
+    # partition by partition after the input ends.
+    ENTRY_BYTES = 104
+
+    def __init__(
+        self,
+        memory_budget: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+        persistent: bool = False,
+        _depth: int = 0,
+    ):
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.persistent = persistent
+        self.stats: Dict[str, int] = {"collisions": 0, "spilled_rows": 0, "spill_partitions": 0}
+        self._depth = _depth
+        self._fps: Dict[int, int] = {}
+        self._exact: Dict[int, set] = {}
+        self._est_bytes = 0
+        self._spill_files: Optional[_SpillFiles] = None
+
+    def __len__(self) -> int:
+        return len(self._fps) + sum(len(keys) for keys in self._exact.values())
+
+    def _hashes(self, key: Any) -> Tuple[int, int]:
+        if self.persistent:
+            d = hashlib.blake2b(repr((self._depth, key)).encode("utf-8"), digest_size=16).digest()
+            return int.from_bytes(d[:8], "big"), int.from_bytes(d[8:], "big")
+        return hash((self._depth, key)), hash((key, self._depth, _FP2_SALT))
+
+    def _contains(self, key: Any, fp: int, fp2: int) -> bool:
+        seen = self._fps.get(fp)
+        if seen is None:
+            return False
+        if seen == fp2:
+            return True
+        exact = self._exact.get(fp)
+        return exact is not None and key in exact
+
+    def _insert(self, key: Any, fp: int, fp2: int) -> bool:
+        seen = self._fps.get(fp)
+        if seen is None:
+            self._fps[fp] = fp2
+            self._est_bytes += self.ENTRY_BYTES
+            return True
+        if seen == fp2:
+            return False
+        exact = self._exact.get(fp)
+        if exact is None:
+            exact = self._exact[fp] = set()
+            self.stats["collisions"] += 1
+        if key in exact:
+            return False
+        exact.add(key)
+        self._est_bytes += self.ENTRY_BYTES + sys.getsizeof(key)
+        return True
+
+    def add(self, key: Any) -> bool:
+        # True if key was not seen before; never spills
+        fp, fp2 = self._hashes(key)
+        return self._insert(key, fp, fp2)
+
+    def __contains__(self, key: Any) -> bool:
+        fp, fp2 = self._hashes(key)
+        return self._contains(key, fp, fp2)
+
+    def filter(self, items: Iterable[Tuple[Any, Any]]) -> Iterator[Any]:
+        # payload of each (key, payload) whose key was not seen before, in input
+        # order; after a spill, payloads of keys first seen past the budget come
+        # last, partition by partition
+        try:
+            for key, payload in items:
+                fp, fp2 = self._hashes(key)
+                if self._spill_files is None:
+                    if self._insert(key, fp, fp2):
+                        yield payload
+                        if self.memory_budget is not None and self._est_bytes > self.memory_budget:
+                            self._spill_files = _SpillFiles(self.spill_dir, "olympiascope-distinct-")
+                            self.stats["spill_partitions"] = SPILL_PARTITIONS
+                elif not self._contains(key, fp, fp2):
+                    if isinstance(payload, LazyRow):
+                        payload = payload.to_dict()
+                    self._spill_files.append(fp % SPILL_PARTITIONS, (key, payload))
+                    self.stats["spilled_rows"] += 1
+            if self._spill_files is None:
+                return
+            self._spill_files.finish()
+            child_budget = self.memory_budget if self._depth + 1 < MAX_SPILL_DEPTH else None
+            for p in range(SPILL_PARTITIONS):
+                check_query()
+                child = DistinctKeys(
+                    child_budget, self.spill_dir, self.persistent, _depth=self._depth + 1
+                )
+                yield from child.filter(self._spill_files.iter_partition(p))
+                self.stats["collisions"] += child.stats["collisions"]
+                self.stats["spilled_rows"] += child.stats["spilled_rows"]
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._spill_files is not None:
+            self._spill_files.close()
+            self._spill_files = None
+
+
+@instrumented("iter_distinct_streaming", streaming=True)
+def iter_distinct_streaming(
+    parser: MyCSVParser,
+    cols: List[str],
+    memory_budget: Optional[int] = None,
+    spill_dir: Optional[str] = None,
+    stats: Optional[Dict[str, Any]] = None,
+) -> Iterator[Dict[str, Any]]:
+    # first row of each distinct combination of cols, in one pass over the file
+    # (see DistinctKeys.filter for the order once memory_budget is exceeded)
+    if isinstance(cols, str):
+        cols = [cols]
+    seen = DistinctKeys(memory_budget, spill_dir)
+    names = parser.headers()
+
+    def keyed_values() -> Iterator[Tuple[Tuple[Any, ...], Tuple[Any, ...]]]:
+        # (key, row values) straight from the column batches
+        for batch in parser.iter_batches(columns=names):
+            bc = batch._cols
+            yield from zip(zip(*(bc[c] for c in cols)), zip(*(bc[c] for c in names)))
+
+    try:
+        # only the first row of each key becomes a dict
+        for values in seen.filter(keyed_values()):
+            yield dict(zip(names, values))
+    finally:
+        seen.close()
+        if stats is not None:
+            stats.update(seen.stats)
+
+
+def distinct_streaming_to_df(
+    parser: MyCSVParser,
+    cols: List[str],
+    memory_budget: Optional[int] = None,
+    spill_dir: Optional[str] = None,
+    stats: Optional[Dict[str, Any]] = None,
+) -> MyDataFrame:
+    rows = iter_distinct_streaming(parser, cols, memory_budget=memory_budget, spill_dir=spill_dir, stats=stats)
+    return MyDataFrame.from_rows(rows)
+
+
+# ---------- sampling (approximate group_by) ----------
+_END = object()
+
+
+def reservoir_sample(rows: Iterable[Any], k: int, seed: int = 0) -> Tuple[List[Any], int]:
+    # uniform sample of k items in one pass (Algorithm L); returns (sample, n_seen)
+    rnd = random.Random(seed)
+    it = iter(rows)
+    if k <= 0:
+        return [], sum(1 for _ in it)
+    sample: List[Any] = []
+    for row in it:
+        sample.append(row)
+        if len(sample) == k:
+            break
+    n = len(sample)
+    if n < k:
+        return sample, n
+    w = math.exp(math.log(rnd.random()) / k)
+    while True:
+        skip = int(math.log(rnd.random()) / math.log(1 - w))
+        for _ in range(skip):
+            if next(it, _END) is _END:
+                return sample, n
+            n += 1
+        row = next(it, _END)
+        if row is _END:
+            return sample, n
+        n += 1
+        sample[rnd.randrange(k)] = row
+        w *= math.exp(math.log(rnd.random()) / k)
+
+
+# aggregates a sampled group_by scales by 1/p and reports a "<name>_err" for
+_SCALED_AGGS = ("count", "count_col", "sum", "avg")
+
+
+@instrumented("group_by_sampled")
+def group_by_sampled(
+    parser: MyCSVParser,
+    keys,
+    agg_spec: Dict[str, str],
+    fraction: float = 0.1,
+    method: str = "block",
+    sample_size: Optional[int] = None,
+    block_size: int = 1 << 20,
+    seed: int = 0,
+    confidence: float = 0.95,
+    key_filter: Optional[Tuple[str, Callable[[Any], bool]]] = None,
+    stats: Optional[Dict[str, Any]] = None,
+) -> MyDataFrame:
+    # Approximate group_by over a sample of the rows.
+    #   method="block": reads ~fraction of the file in random byte blocks (saves I/O)
+    #   method="reservoir": one lazy pass keeping sample_size rows (saves
+    #     conversion and aggregation work, not I/O)
+    # count/count_col/sum are scaled by 1/p (p = sampled share of rows) and avg is
+    # the sample mean; each gets a "<output>_err" column with the half-width of a
+    # normal confidence interval. min/max and approx quantiles come from the
+    # sample unscaled. Groups absent from the sample are missing. Block samples
+    # are treated as row samples, so bounds are optimistic for clustered files.
+    if isinstance(keys, str):
+        keys = [keys]
+    for agg in agg_spec.values():
+        if agg in ("approx_count_distinct", "sum_exact"):
+            raise ValueError(f"{agg} cannot be scaled from a sample; use group_by_streaming")
+
+    scan: Dict[str, Any] = {}
+    if method == "block":
+        rows: Iterable[Dict[str, Any]] = (
+            r
+            for chunk in parser.iter_sampled_chunks(fraction, block_size, seed, key_filter, scan)
+            for r in chunk
+        )
+    elif method == "reservoir":
+        if sample_size is None:
+            raise ValueError("method='reservoir' needs sample_size")
+        lazy = MyCSVParser(
+            parser.filename, parser.sep, parser.chunk_size, parser.encoding,
+            schema=parser.schema, null_values=parser.null_values, lazy=True,
+        )
+        rows, n_seen = reservoir_sample(
+            (r for chunk in lazy.iter_chunks(key_filter=key_filter) for r in chunk), sample_size, seed
+        )
+    else:
+        raise ValueError("method must be 'block' or 'reservoir'")
+
+    # per group: row count and, per aggregated column, [n, sum, sum of squares]
+    moments: Dict[Tuple[Any, ...], List[Any]] = {}
+    agg_items = list(agg_spec.items())
+    plain_spec = {c: a for c, a in agg_items if a not in _SCALED_AGGS}
+    plain_items = list(plain_spec.items())
+    plain = HashAggregator(keys, plain_spec) if plain_spec else None
+    for r in rows:
+        ktuple = tuple(r[k] for k in keys)
+        m = moments.get(ktuple)
+        if m is None:
+            m = moments[ktuple] = [0] + [[0, 0.0, 0.0] for _ in agg_items]
+        m[0] += 1
+        for j, (col, agg) in enumerate(agg_items, 1):
+            if agg in ("count_col", "sum", "avg"):
+                v = r[col]
+                if v is not None:
+                    acc = m[j]
+                    acc[0] += 1
+                    acc[1] += v if agg != "count_col" else 0
+                    acc[2] += v * v if agg != "count_col" else 0
+        if plain is not None:
+            plain.add(ktuple, [r[c] for c, _ in plain_items])
+
+    # p: sampled share of the input (bytes for block samples, rows for reservoirs)
+    if method == "block":
+        p = scan["sampled_bytes"] / scan["total_bytes"] if scan.get("total_bytes") else 1.0
+    else:
+        p = len(rows) / n_seen if n_seen else 1.0
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    fpc = 1.0 - p
+    plain_rows = {}
+    if plain is not None:
+        pdf = plain.to_df()
+        pcols = pdf.columns()[len(keys):]
+        for row in pdf.iter_rows():
+            plain_rows[tuple(row[k] for k in keys)] = [row[c] for c in pcols]
+
+    out_cols: Dict[str, List[Any]] = {k: [] for k in keys}
+    specs = []
+    for col, agg in agg_items:
+        name = _agg_output_name(col, agg)
+        specs.append((col, agg, name))
+        out_cols[name] = []
+        if agg in _SCALED_AGGS:
+            out_cols[f"{name}_err"] = []
+
+    for ktuple, m in moments.items():
+        for j, k in enumerate(keys):
+            out_cols[k].append(ktuple[j])
+        plain_vals = iter(plain_rows.get(ktuple, ()))
+        for j, (col, agg, name) in enumerate(specs, 1):
+            if agg not in _SCALED_AGGS:
+                out_cols[name].append(next(plain_vals))
+                continue
+            n, total, sq = m[j]
+            if agg == "count":
+                n = m[0]
+            if agg in ("count", "count_col"):
+                est = round(n / p)
+                err = z * math.sqrt(n * fpc) / p
+            elif agg == "sum":
+                est = total / p
+                err = z * math.sqrt(sq * fpc) / p
+            else:
+                est = total / n if n else None
+                var = (sq - n * est * est) / (n - 1) if n > 1 else 0.0
+                err = z * math.sqrt(max(var, 0.0) / n * fpc) if n else None
+            out_cols[name].append(est)
+            out_cols[f"{name}_err"].append(err)
+
+    if stats is not None:
+        stats.update({"sample_fraction": p, "sampled_groups": len(moments), "confidence": confidence})
+    return MyDataFrame._wrap(out_cols)
+
+
+# ---------- incremental ingestion (append-only files) ----------
+# Read size for re-hashing the consumed prefix (I/O only, nothing is parsed).
+PREFIX_HASH_BLOCK = 1 << 20
+
 
+def _prefix_checksum(filename: str, offset: int, start: int = 0, crc: int = 0) -> int:
+    # crc32 of [0, offset), continuing from crc, the checksum of [0, start)
+    with open(filename, "rb") as fb:
+        fb.seek(start)
+        remaining = offset - start
+        while remaining > 0:
+            block = fb.read(min(remaining, PREFIX_HASH_BLOCK))
+            if not block:
+                break
+            crc = zlib.crc32(block, crc)
+            remaining -= len(block)
+    return crc
 
+
+def _file_identity(st: os.stat_result) -> Tuple[int, int]:
+    # a different (device, inode) means the file was replaced, not appended to
+    return (st.st_dev, st.st_ino)
+
+
+def _load_incremental_state(state_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(state_path, "rb") as f:
+            saved = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+        return None
+    return saved if isinstance(saved, dict) else None
+
+
+def _save_incremental_state(state_path: str, saved: Dict[str, Any]) -> None:
+    state_dir = os.path.dirname(os.path.abspath(state_path))
+    os.makedirs(state_dir, exist_ok=True)
+    tmp = f"{state_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(saved, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, state_path)
+
+
+@instrumented("incremental_fold_csv")
+def incremental_fold_csv(
+    filename: str,
+    state_path: str,
+    spec: Any,
+    init: Callable[[], Any],
+    fold: Callable[[Any, MyCSVParser], Any],
+    sep: str = ",",
+    chunk_size: int = 50_000,
+    encoding: str = "utf-8",
+    schema: Optional[Dict[str, Any]] = None,
+    stats: Optional[Dict[str, Any]] = None,
+) -> Any:
+    # Folds the rows of an append-only CSV into an accumulator persisted at
+    # state_path. A saved accumulator is reused when it was built with the same
+    # spec and the same file (device and inode) still starts with the bytes it
+    # was built from -- checked by a crc32 over the whole consumed prefix unless
+    # size and mtime are unchanged -- and then only the appended tail is parsed.
+    # Otherwise the file is rebuilt from byte 0. A final line without a newline
+    # is folded too; once the file grows past it, the next call rebuilds.
+    # fold(acc, parser) must consume the parser and may return a result value.
+    # Pass a schema so column types don't depend on where inference starts.
+    # Compressed files are always folded from the start.
+    st = os.stat(filename)
+    if detect_compression(filename) is not None:
+        # byte offsets into a compressed stream can't be resumed: always a full
+        # fold, read through the decompressor, and nothing is saved
+        result = fold(init(), MyCSVParser(filename, sep=sep, chunk_size=chunk_size, encoding=encoding, schema=schema))
+        if stats is not None:
+            stats.update({"mode": "full", "start_offset": 0, "end_offset": None, "bytes_read": st.st_size})
+        return result
+
+    saved = _load_incremental_state(state_path)
+    acc = None
+    start = 0
+    crc = 0
+    if (
+        saved is not None
+        and saved.get("spec") == spec
+        and saved.get("filename") == os.path.abspath(filename)
+        and saved.get("identity") == _file_identity(st)
+        and st.st_size >= saved["offset"]
+        # appended bytes would continue a line already folded without its newline
+        and not (saved.get("line_open") and st.st_size > saved["offset"])
+    ):
+        offset = saved["offset"]
+        unchanged = (st.st_size, st.st_mtime_ns) == (saved.get("size"), saved.get("mtime_ns"))
+        # any write since the last fold could have touched the prefix: re-hash
+        # all of it, not just its ends
+        if unchanged or _prefix_checksum(filename, offset) == saved["checksum"]:
+            acc = saved["acc"]
+            start = offset
+            crc = saved["checksum"]
+    if acc is None:
+        acc = init()
+
+    parser = MyCSVParser(
+        filename,
+        sep=sep,
+        chunk_size=chunk_size,
+        encoding=encoding,
+        schema=schema,
+        start_offset=start,
+    )
+    result = fold(acc, parser)
+
+    end = parser.last_offset if parser.last_offset is not None else start
+    line_open = parser.last_line_open if end > start else bool(start and saved.get("line_open"))
+    _save_incremental_state(
+        state_path,
+        {
+            "spec": spec,
+            "filename": os.path.abspath(filename),
+            "identity": _file_identity(st),
+            # stat from before the fold: a write during it forces a re-check
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "offset": end,
+            "line_open": line_open,
+            "checksum": _prefix_checksum(filename, end, start, crc),
+            "acc": acc,
+        },
+    )
+    if stats is not None:
+        stats["mode"] = "delta" if start else "full"
+        stats["start_offset"] = start
+        stats["end_offset"] = end
+        stats["bytes_read"] = end - start
+    return result
+
+
+def group_by_incremental_csv(
+    filename: str,
+    keys,
+    agg_spec: Dict[str, str],
+    state_path: str,
+    sep: str = ",",
+    chunk_size: int = 50_000,
+    encoding: str = "utf-8",
+    schema: Optional[Dict[str, Any]] = None,
+    stats: Optional[Dict[str, Any]] = None,
+) -> MyDataFrame:
+    # group_by_streaming_csv whose per-group state survives between calls
+    if isinstance(keys, str):
+        keys = [keys]
+
+    def fold(state: Dict[Tuple[Any, ...], Dict[Tuple[str, str], Any]], parser: MyCSVParser) -> MyDataFrame:
+        return group_by_streaming(parser, keys, agg_spec, state=state)
+
+    return incremental_fold_csv(
+        filename,
+        state_path,
+        spec=("group_by", tuple(keys), tuple(agg_spec.items())),
+        init=dict,
+        fold=fold,
+        sep=sep,
+        chunk_size=chunk_size,
+        encoding=encoding,
+        schema=schema,
+        stats=stats,
+    )
+
+
+@instrumented("iter_filter_project_streaming", streaming=True)
 def iter_filter_project_streaming(
     parser: MyCSVParser,
     cond_func: Optional[Callable[[Dict[str, Any]], bool]] = None,
     project_cols: Optional[List[str]] = None,
+    conditions: Optional[List[Tuple[str, str, Any]]] = None,
 ) -> Iterable[Dict[str, Any]]:
-    if cond_func is None:
-        def cond_func(row: Dict[str, Any]) -> bool: 
-            return True
-
-    for chunk_rows in parser.iter_chunks():
-        if not chunk_rows:
-            continue
+    for batch in iter_filter_project_batches(parser, cond_func, project_cols, conditions):
+        yield from batch.iter_rows()
 
-        df_chunk = MyDataFrame.from_rows(chunk_rows)
 
+@instrumented("iter_filter_project_batches", streaming=True)
+def iter_filter_project_batches(
+    parser: MyCSVParser,
+    cond_func: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    project_cols: Optional[List[str]] = None,
+    conditions: Optional[List[Tuple[str, str, Any]]] = None,
+) -> Iterator[MyDataFrame]:
+    # one filtered / projected view per scan batch. conditions are (column, op,
+    # value) triples run on the columns (see MyDataFrame.filter); cond_func, a
+    # row predicate, then sees only the rows that passed them. Without
+    # cond_func only the needed columns are parsed.
+    columns = None
+    if cond_func is None and project_cols is not None:
+        columns = list(dict.fromkeys(list(project_cols) + [c for c, _, _ in conditions or []]))
+    for batch in parser.iter_batches(columns=columns):
+        if not batch.nrows():
+            continue
+        if conditions:
+            batch = batch.filter(conditions)
         if cond_func is not None:
-            df_chunk = df_chunk.filter(cond_func)
-
+            batch = batch.filter(cond_func)
         if project_cols is not None:
-            df_chunk = df_chunk.project(project_cols)
-
-        for row in df_chunk.iter_rows():
-            yield row
+            batch = batch.project(project_cols)
+        yield batch
 
 
 def filter_project_streaming_to_df(
     parser: MyCSVParser,
     cond_func: Optional[Callable[[Dict[str, Any]], bool]] = None,
     project_cols: Optional[List[str]] = None,
+    conditions: Optional[List[Tuple[str, str, Any]]] = None,
 ) -> MyDataFrame:
-    rows = iter_filter_project_streaming(parser, cond_func=cond_func, project_cols=project_cols)
-    return MyDataFrame.from_rows(rows)
+    batches = iter_filter_project_batches(parser, cond_func, project_cols, conditions)
+    return MyDataFrame.concat(batches)
 
 
 def filter_project_streaming_csv(
@@ -660,13 +2747,82 @@ def filter_project_streaming_csv(
     return filter_project_streaming_to_df(parser, cond_func=cond_func, project_cols=project_cols)
 
 
+# ---------- Bloom filter (probe-side pruning) ----------
+class MyBloomFilter:
+    def __init__(self, expected_items: int, fp_rate: float = 0.01):
+        expected_items = max(1, expected_items)
+        n_bits = int(-expected_items * math.log(fp_rate) / (math.log(2) ** 2))
+        self.n_bits = max(64, n_bits)
+        self.n_hashes = max(1, round(self.n_bits / expected_items * math.log(2)))
+        self._bits = bytearray((self.n_bits + 7) // 8)
+
+    def _positions(self, key: Any) -> Iterator[int]:
+        # double hashing: h1 + i*h2 gives k independent-enough positions
+        h1 = hash(key)
+        h2 = hash((key, 0x9E3779B9)) | 1
+        for i in range(self.n_hashes):
+            yield (h1 + i * h2) % self.n_bits
+
+    def add(self, key: Any) -> None:
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: Any) -> bool:
+        bits = self._bits
+        for pos in self._positions(key):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+# build sides with at most this many distinct keys are probed through an exact set
+BLOOM_MIN_KEYS = 100_000
+
+
+def build_key_filter(
+    keys: Iterable[Any],
+    bloom_min_keys: int = BLOOM_MIN_KEYS,
+    fp_rate: float = 0.01,
+) -> Callable[[Any], bool]:
+    key_set = set(keys)
+    if len(key_set) < bloom_min_keys:
+        return key_set.__contains__
+    bloom = MyBloomFilter(len(key_set), fp_rate=fp_rate)
+    for k in key_set:
+        bloom.add(k)
+    return bloom.__contains__
+
+
 def iter_join_streaming_small_big(
     big_parser: MyCSVParser,
     small_df: MyDataFrame,
     on_key: str,
     how: str = "inner",
     suffixes: Tuple[str, str] = ("_big", "_small"),
+    stats: Optional[Dict[str, int]] = None,
+    bloom_min_keys: int = BLOOM_MIN_KEYS,
 ) -> Iterable[Dict[str, Any]]:
+    batches = iter_join_streaming_small_big_batches(
+        big_parser, small_df, on_key, how=how, suffixes=suffixes, stats=stats, bloom_min_keys=bloom_min_keys
+    )
+    for batch in batches:
+        yield from batch.iter_rows()
+
+
+@instrumented("iter_join_streaming_small_big", streaming=True)
+def iter_join_streaming_small_big_batches(
+    big_parser: MyCSVParser,
+    small_df: MyDataFrame,
+    on_key: str,
+    how: str = "inner",
+    suffixes: Tuple[str, str] = ("_big", "_small"),
+    stats: Optional[Dict[str, int]] = None,
+    bloom_min_keys: int = BLOOM_MIN_KEYS,
+) -> Iterator[MyDataFrame]:
+    # one joined frame per big-side batch, built by gathering columns at the
+    # matching (big row, small row) positions.
+    # stats (if given) receives rows_scanned / rows_pruned / rows_matched counters;
+    # pruning only applies to inner joins since left joins must keep every row.
     if on_key not in small_df.columns():
         raise KeyError(f"join key '{on_key}' not found in small_df")
 
@@ -674,47 +2830,56 @@ def iter_join_streaming_small_big(
         raise ValueError("iter_join_streaming_small_big supports 'inner' and 'left' only")
 
     right_cols = small_df.columns()
+    small_cols = small_df._cols
     right_index: Dict[Any, List[int]] = defaultdict(list)
-    for j in range(small_df.nrows()):
-        key_val = small_df._cols[on_key][j]
+    for j, key_val in enumerate(small_cols[on_key]):
         right_index[key_val].append(j)
 
     right_nonkey = [c for c in right_cols if c != on_key]
     left_cols: Optional[List[str]] = None
-
-    for chunk_rows in big_parser.iter_chunks():
-        if not chunk_rows:
+    right_names: List[str] = []
+
+    key_filter = None
+    if how == "inner":
+        key_filter = (on_key, build_key_filter(right_index.keys(), bloom_min_keys=bloom_min_keys))
+    if stats is not None:
+        stats.setdefault("rows_scanned", 0)
+        stats.setdefault("rows_pruned", 0)
+        stats.setdefault("rows_matched", 0)
+
+    for batch in big_parser.iter_batches(key_filter=key_filter, stats=stats):
+        if not batch.nrows():
             continue
 
-        df_big = MyDataFrame.from_rows(chunk_rows)
-
-        if on_key not in df_big.columns():
-            raise KeyError(f"join key '{on_key}' not found in big (chunk) DataFrame")
-
         if left_cols is None:
-            left_cols = df_big.columns()
-
-        for i in range(df_big.nrows()):
-            key_val = df_big._cols[on_key][i]
+            left_cols = batch.columns()
+            if on_key not in left_cols:
+                raise KeyError(f"join key '{on_key}' not found in big (chunk) DataFrame")
+            right_names = [c if c not in left_cols else c + suffixes[1] for c in right_nonkey]
+
+        big_cols = batch._cols
+        left_rows: List[int] = []
+        right_rows: List[int] = []
+        matched = 0
+        for i, key_val in enumerate(big_cols[on_key]):
             matches = right_index.get(key_val)
-
             if matches:
+                matched += 1
                 for j in matches:
-                    out_row: Dict[str, Any] = {}
-                    for c in left_cols:
-                        out_row[c] = df_big._cols[c][i]
-                    for c in right_nonkey:
-                        name = c if c not in left_cols else c + suffixes[1]
-                        out_row[name] = small_df._cols[c][j]
-                    yield out_row
+                    left_rows.append(i)
+                    right_rows.append(j)
             elif how == "left":
-                out_row = {}
-                for c in left_cols:
-                    out_row[c] = df_big._cols[c][i]
-                for c in right_nonkey:
-                    name = c if c not in left_cols else c + suffixes[1]
-                    out_row[name] = None
-                yield out_row
+                left_rows.append(i)
+                right_rows.append(-1)
+        if stats is not None:
+            stats["rows_matched"] += matched
+        if not left_rows:
+            continue
+
+        out: Dict[str, List[Any]] = {c: _gather(big_cols[c], left_rows) for c in left_cols}
+        for c, name in zip(right_nonkey, right_names):
+            out[name] = _gather(small_cols[c], right_rows)
+        yield MyDataFrame._wrap(out)
 
 
 def join_streaming_small_big_to_df(
@@ -723,15 +2888,17 @@ def join_streaming_small_big_to_df(
     on_key: str,
     how: str = "inner",
     suffixes: Tuple[str, str] = ("_big", "_small"),
+    stats: Optional[Dict[str, int]] = None,
 ) -> MyDataFrame:
-    rows = iter_join_streaming_small_big(
+    batches = iter_join_streaming_small_big_batches(
         big_parser=big_parser,
         small_df=small_df,
         on_key=on_key,
         how=how,
         suffixes=suffixes,
+        stats=stats,
     )
-    return MyDataFrame.from_rows(rows)
+    return MyDataFrame.concat(batches)
 
 
 def join_streaming_small_big_csv(
@@ -744,6 +2911,7 @@ def join_streaming_small_big_csv(
     big_encoding: str = "utf-8",
     big_chunk_size: int = 50_000,
     suffixes: Tuple[str, str] = ("_big", "_small"),
+    stats: Optional[Dict[str, int]] = None,
 ) -> MyDataFrame:
     small_parser = MyCSVParser(small_filename, sep=sep, chunk_size=None, encoding=small_encoding)
     small_df = MyDataFrame.from_rows(small_parser.iter_rows())
@@ -756,6 +2924,7 @@ def join_streaming_small_big_csv(
         on_key=on_key,
         how=how,
         suffixes=suffixes,
+        stats=stats,
     )
 
 
@@ -764,12 +2933,24 @@ def iter_order_by_streaming(
     by: str,
     reverse: bool = False,
 ) -> Iterator[Dict[str, Any]]:
-    for chunk_rows in parser.iter_chunks():
-        if not chunk_rows:
+    for batch in iter_order_by_batches(parser, by, reverse=reverse):
+        yield from batch.iter_rows()
+
+
+@instrumented("iter_order_by_streaming", streaming=True)
+def iter_order_by_batches(
+    parser: MyCSVParser,
+    by: str,
+    reverse: bool = False,
+) -> Iterator[MyDataFrame]:
+    # each scan batch as a view sorted on `by` (stable, like sorted())
+    for batch in parser.iter_batches():
+        if not batch.nrows():
             continue
-        sorted_rows = sorted(chunk_rows, key=lambda row: row.get(by), reverse=reverse)
-        for row in sorted_rows:
-            yield row
+        n = batch.nrows()
+        col = batch._base.get(by)
+        order = range(n) if col is None else sorted(range(n), key=col.__getitem__, reverse=reverse)
+        yield batch._view(batch.columns(), order)
 
 
 def order_by_streaming_to_df(
@@ -777,8 +2958,7 @@ def order_by_streaming_to_df(
     by: str,
     reverse: bool = False,
 ) -> MyDataFrame:
-    rows = iter_order_by_streaming(parser, by=by, reverse=reverse)
-    return MyDataFrame.from_rows(rows)
+    return MyDataFrame.concat(iter_order_by_batches(parser, by, reverse=reverse))
 
 
 #GDP & Population analytics
@@ -787,6 +2967,17 @@ EVENTS_CSV = "events.csv"
 NOC_COUNTRYCODE_CSV = "noc_to_countrycode.csv"
 COUNTRY_YEAR_STATS_CSV = "country_year_stats.csv"
 
+# explicit types for the events columns the analytics read
+EVENTS_SCHEMA: Dict[str, Any] = {
+    "Name": str,
+    "NOC": str,
+    "Year": int,
+    "Season": str,
+    "Sport": str,
+    "Event": str,
+    "Medal": str,
+}
+
 
 def load_noc_countrycode_df() -> MyDataFrame:
     parser = MyCSVParser(NOC_COUNTRYCODE_CSV)
@@ -798,29 +2989,57 @@ def load_country_year_stats_df() -> MyDataFrame:
     return MyDataFrame.from_rows(parser.iter_rows())
 
 
+@instrumented("medals_per_noc_year_streaming")
 def medals_per_noc_year_streaming(
     events_csv: str = EVENTS_CSV,
     chunk_size: int = 50_000,
     season: Optional[str] = None,         
     medal_filter: Optional[str] = None,   
+    distinct_events: bool = False,
+    year: Optional[int] = None,
 ) -> MyDataFrame:
-    parser = MyCSVParser(events_csv, chunk_size=chunk_size)
-
+    # distinct_events=True counts a medal once per (NOC, Games, event), so a
+    # team gold is one medal rather than one per athlete. events_csv may be a
+    # partitioned directory; season/year then skip non-matching partitions.
+    parser = open_table(events_csv, chunk_size=chunk_size, schema=EVENTS_SCHEMA)
+    if isinstance(parser, PartitionedDataset):
+        pcols = parser.partition_columns()
+        parser = parser.where(
+            [(c, "==", v) for c, v in (("Season", season), ("Year", year)) if v is not None and c in pcols]
+        )
     counts: Dict[Tuple[str, int], int] = {}
+    seen = DistinctKeys() if distinct_events else None
+    _count_medals_per_noc_year(parser, counts, season, medal_filter, seen, year)
+    return _medal_counts_to_df(counts)
 
-    for chunk in parser.iter_chunks():
-        for row in chunk:
-            medal = row["Medal"]
+
+def _count_medals_per_noc_year(
+    parser: MyCSVParser,
+    counts: Dict[Tuple[str, int], int],
+    season: Optional[str],
+    medal_filter: Optional[str],
+    seen: Optional[DistinctKeys] = None,
+    year: Optional[int] = None,
+) -> None:
+    for batch in parser.iter_batches(columns=["NOC", "Year", "Season", "Event", "Medal"]):
+        cols = batch._cols
+        for noc, y, s, event, medal in zip(cols["NOC"], cols["Year"], cols["Season"], cols["Event"], cols["Medal"]):
             if medal is None:
                 continue
             if medal_filter is not None and medal != medal_filter:
                 continue
-            if season is not None and row["Season"] != season:
+            if season is not None and s != season:
+                continue
+            if year is not None and y != year:
                 continue
 
-            key = (row["NOC"], row["Year"])
+            key = (noc, y)
+            if seen is not None and not seen.add((key, s, event, medal)):
+                continue
             counts[key] = counts.get(key, 0) + 1
 
+
+def _medal_counts_to_df(counts: Dict[Tuple[str, int], int]) -> MyDataFrame:
     rows: List[Dict[str, Any]] = []
     for (noc, year), cnt in counts.items():
         rows.append(
@@ -833,17 +3052,58 @@ def medals_per_noc_year_streaming(
 
     return MyDataFrame.from_rows(rows)
 
-def country_medals_with_stats(
+
+def medals_per_noc_year_incremental(
+    state_path: str,
+    events_csv: str = EVENTS_CSV,
+    chunk_size: int = 50_000,
     season: Optional[str] = None,
     medal_filter: Optional[str] = None,
+    distinct_events: bool = False,
+    stats: Optional[Dict[str, Any]] = None,
 ) -> MyDataFrame:
-    medals_df = medals_per_noc_year_streaming(
-        events_csv=EVENTS_CSV,
-        chunk_size=50_000,
-        season=season,
-        medal_filter=medal_filter,
+    # same result as medals_per_noc_year_streaming, but only rows appended since
+    # the last call are parsed; counts (and the seen events) are kept in
+    # state_path between calls
+    def init() -> Tuple[Dict[Tuple[str, int], int], Optional[DistinctKeys]]:
+        return {}, (DistinctKeys(persistent=True) if distinct_events else None)
+
+    def fold(acc: Tuple[Dict[Tuple[str, int], int], Optional[DistinctKeys]], parser: MyCSVParser) -> MyDataFrame:
+        counts, seen = acc
+        _count_medals_per_noc_year(parser, counts, season, medal_filter, seen)
+        return _medal_counts_to_df(counts)
+
+    return incremental_fold_csv(
+        events_csv,
+        state_path,
+        spec=("medals_per_noc_year", season, medal_filter, distinct_events),
+        init=init,
+        fold=fold,
+        chunk_size=chunk_size,
+        schema=EVENTS_SCHEMA,
+        stats=stats,
     )
 
+
+@instrumented("country_medals_with_stats")
+def country_medals_with_stats(
+    season: Optional[str] = None,
+    medal_filter: Optional[str] = None,
+    medals_df: Optional[MyDataFrame] = None,
+    year: Optional[int] = None,
+    events_csv: str = EVENTS_CSV,
+) -> MyDataFrame:
+    # medals_df: precomputed NOC/Year/medal_count rows (e.g. from the medal
+    # cube); scanned from events_csv (file or partitioned directory) when omitted
+    if medals_df is None:
+        medals_df = medals_per_noc_year_streaming(
+            events_csv=events_csv,
+            chunk_size=50_000,
+            season=season,
+            medal_filter=medal_filter,
+            year=year,
+        )
+
     noc_map_df = load_noc_countrycode_df()
 
     medals_with_codes = medals_df.join(
@@ -855,6 +3115,7 @@ def country_medals_with_stats(
 
     stats_df = load_country_year_stats_df()
 
+    @instrumented("add_cc_year_key")
     def add_cc_year_key(df: MyDataFrame) -> MyDataFrame:
         rows: List[Dict[str, Any]] = []
         for row in df.iter_rows():
@@ -880,17 +3141,19 @@ def country_medals_with_stats(
     return joined
 
 
+@instrumented("medals_efficiency_for_year")
 def medals_efficiency_for_year(
     year: int,
     season: Optional[str] = None,
     medal_filter: Optional[str] = None,
+    medals_df: Optional[MyDataFrame] = None,
+    events_csv: str = EVENTS_CSV,
 ) -> MyDataFrame:
-    joined = country_medals_with_stats(season=season, medal_filter=medal_filter)
-
-    def cond(row: Dict[str, Any]) -> bool:
-        return row["Year"] == year
+    joined = country_medals_with_stats(
+        season=season, medal_filter=medal_filter, medals_df=medals_df, year=year, events_csv=events_csv
+    )
 
-    year_df = joined.filter(cond)
+    year_df = joined.filter([("Year", "==", year)])
 
     rows: List[Dict[str, Any]] = []
     for row in year_df.iter_rows():
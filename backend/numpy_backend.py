@@ -0,0 +1,418 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# ---------- NumPy execution backend ----------
+#
+# Vectorized kernels behind MyDataFrame.filter / group_by / order_by / join.
+# my_sql_engine imports this module only if NumPy is installed and falls back
+# to its pure-Python loops otherwise.
+#
+# Columns are encoded once and cached (per frame family for lists, on the
+# column object for shared columns):
+#
+#   NumArray    int64 / float64 values + optional validity mask (nulls)
+#   CodeArray   integer codes into a dictionary of distinct values (which may
+#               include None), for string columns and shared dict columns
+#
+# Only single-typed columns are encoded (plus None); floats containing NaN
+# and ints outside int64 are not. Every kernel returns None when it cannot
+# reproduce the pure-Python result exactly, and the caller then runs the
+# Python path: same API, same values, same row order.
+
+MIN_ROWS = 2048
+# integers up to this magnitude convert to float64 exactly
+_EXACT_INT = 1 << 53
+_NONE = type(None)
+
+
+class NumArray:
+    def __init__(self, values: np.ndarray, valid: Optional[np.ndarray]):
+        self.values = values
+        self.valid = valid  # None: no nulls
+        self.exact = values.dtype.kind == "f" or not len(values) or int(np.abs(values).max()) < _EXACT_INT
+
+
+class CodeArray:
+    def __init__(self, codes: np.ndarray, dictionary: List[Any]):
+        self.codes = codes
+        self.dictionary = dictionary
+        self._numeric: Any = False
+
+    def null_code(self) -> int:
+        for c, v in enumerate(self.dictionary):
+            if v is None:
+                return c
+        return -1
+
+    def numeric(self) -> Optional[NumArray]:
+        # the same column as a NumArray, if the dictionary holds numbers
+        if self._numeric is False:
+            self._numeric = None
+            kinds = {type(v) for v in self.dictionary} - {_NONE}
+            if kinds == {int} or kinds == {float}:
+                dtype = np.int64 if kinds == {int} else np.float64
+                try:
+                    table = np.array([0 if v is None else v for v in self.dictionary], dtype=dtype)
+                except OverflowError:
+                    table = None
+                if table is not None and not (dtype is np.float64 and np.isnan(table).any()):
+                    null = self.null_code()
+                    valid = self.codes != null if null >= 0 else None
+                    self._numeric = NumArray(table[self.codes], valid)
+        return self._numeric
+
+
+def _single_type(types: set) -> bool:
+    types = types - {_NONE}
+    return len(types) <= 1 and bool not in types
+
+
+def _encode_list(col: Sequence[Any]) -> Any:
+    types = set(map(type, col))
+    has_null = _NONE in types
+    kinds = types - {_NONE}
+    n = len(col)
+    if kinds in ({int}, {float}):
+        dtype = np.int64 if kinds == {int} else np.float64
+        try:
+            if has_null:
+                values = np.array([0 if v is None else v for v in col], dtype=dtype)
+            else:
+                values = np.array(col, dtype=dtype)
+        except OverflowError:
+            return None
+        if dtype is np.float64 and np.isnan(values).any():
+            return None
+        valid = np.fromiter((v is not None for v in col), bool, n) if has_null else None
+        return NumArray(values, valid)
+    if not _single_type(types):
+        return None
+    index: Dict[Any, int] = {}
+    codes = np.fromiter((index.setdefault(v, len(index)) for v in col), np.int64, n)
+    return CodeArray(codes, list(index))
+
+
+def _encode_parts(parts: Tuple[Any, ...]) -> Any:
+    if parts[0] == "fixed":
+        view = parts[1]
+        values = np.frombuffer(view, dtype=np.int64 if view.format == "q" else np.float64)
+        if values.dtype.kind == "f" and np.isnan(values).any():
+            return None
+        return NumArray(values, None)
+    _, codes, dictionary = parts
+    if not _single_type({type(v) for v in dictionary}):
+        return None
+    return CodeArray(np.frombuffer(codes, dtype=np.uint32).astype(np.int64), dictionary)
+
+
+def encoded(col: Sequence[Any], cache: Dict[int, Tuple[Any, Any]]) -> Any:
+    # NumArray / CodeArray for col, or None if it cannot be encoded. Lists are
+    # cached in `cache` (keyed by identity, checked by length); columns that
+    # expose vector_parts() cache on themselves in vector_cache.
+    if isinstance(col, list):
+        hit = cache.get(id(col))
+        if hit is not None and hit[0] is col and hit[1] == len(col):
+            return hit[2]
+        enc = _encode_list(col)
+        cache[id(col)] = (col, len(col), enc)
+        return enc
+    parts = getattr(col, "vector_parts", None)
+    if parts is None:
+        return None
+    if col.vector_cache is None:
+        col.vector_cache = (_encode_parts(parts()),)
+    return col.vector_cache[0]
+
+
+def as_index(sel: Optional[Sequence[int]]) -> Optional[np.ndarray]:
+    # a frame's selection as an index array (None: all rows)
+    if sel is None:
+        return None
+    if isinstance(sel, range):
+        return np.arange(sel.start, sel.stop, sel.step, dtype=np.int64)
+    return np.asarray(sel, dtype=np.int64)
+
+
+def _take(a: np.ndarray, sel: Optional[np.ndarray]) -> np.ndarray:
+    return a if sel is None else a[sel]
+
+
+def _valid_at(enc: Any, sel: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    # validity mask of the selected rows (None: all valid)
+    if isinstance(enc, NumArray):
+        return None if enc.valid is None else _take(enc.valid, sel)
+    null = enc.null_code()
+    return None if null < 0 else _take(enc.codes, sel) != null
+
+
+def _as_numeric(enc: Any) -> Optional[NumArray]:
+    return enc if isinstance(enc, NumArray) else enc.numeric()
+
+
+def _is_number(v: Any) -> bool:
+    return type(v) in (int, float)
+
+
+# ---------- filter ----------
+def compare(enc: Any, fn: Optional[Callable[[Any, Any], Any]], value: Any) -> Optional[np.ndarray]:
+    # boolean mask over all rows of fn(col, value), an operator.* comparison,
+    # or of `col in value` when fn is None; NULL never matches
+    if isinstance(enc, CodeArray):
+        if fn is None:
+            table = [v is not None and v in value for v in enc.dictionary]
+        else:
+            table = [v is not None and fn(v, value) for v in enc.dictionary]
+        return np.array(table, dtype=bool)[enc.codes]
+
+    values = list(value) if fn is None else [value]
+    if not all(_is_number(v) for v in values):
+        return None
+    if enc.values.dtype.kind == "i" and not enc.exact and any(type(v) is float for v in values):
+        return None  # int64 vs float compares through float64
+    if fn is None:
+        if enc.values.dtype.kind == "i" and any(type(v) is float and not v.is_integer() for v in values):
+            values = [v for v in values if type(v) is int or v.is_integer()]
+        mask = np.isin(enc.values, np.array(values)) if values else np.zeros(len(enc.values), dtype=bool)
+    else:
+        mask = fn(enc.values, value)
+    if enc.valid is not None:
+        mask &= enc.valid
+    return mask
+
+
+def select(mask: np.ndarray, sel: Optional[Sequence[int]]) -> List[int]:
+    # rows of the selection (all rows if None) whose mask bit is set
+    if sel is None:
+        return np.flatnonzero(mask).tolist()
+    idx = as_index(sel)
+    return idx[mask[idx]].tolist()
+
+
+# ---------- group by ----------
+def _key_codes(enc: Any, sel: Optional[np.ndarray]) -> Tuple[np.ndarray, int]:
+    # dense non-negative codes for the selected rows (NULL is a code of its
+    # own, as None is a group of its own) and the number of codes
+    if isinstance(enc, CodeArray):
+        return _take(enc.codes, sel), len(enc.dictionary)
+    uniq, inv = np.unique(_take(enc.values, sel), return_inverse=True)
+    inv = inv.reshape(-1)
+    if enc.valid is not None:
+        inv = np.where(_take(enc.valid, sel), inv, len(uniq))
+    return inv, len(uniq) + 1
+
+
+def _group_ids(key_encs: List[Any], sel: Optional[np.ndarray], n: int) -> Tuple[np.ndarray, np.ndarray]:
+    # (group id per row, first row of each group), groups numbered by first
+    # appearance like the dict-based aggregator
+    parts = [_key_codes(e, sel) for e in key_encs]
+    width = 1
+    for _, card in parts:
+        width *= max(card, 1)
+    if width < (1 << 62):
+        combined = np.zeros(n, dtype=np.int64)
+        for codes, card in parts:
+            combined = combined * card + codes
+    else:
+        _, combined = np.unique(np.stack([c for c, _ in parts], axis=1), axis=0, return_inverse=True)
+        combined = combined.reshape(-1)
+    _, first, inv = np.unique(combined, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return rank[inv.reshape(-1)], first[order]
+
+
+def _reduce(gid: np.ndarray, values: np.ndarray, ngroups: int, ufunc: Any) -> Tuple[np.ndarray, np.ndarray]:
+    # per-group ufunc.reduce over values -> (result per group, group has rows)
+    order = np.argsort(gid, kind="stable")
+    g = gid[order]
+    v = values[order]
+    present = np.zeros(ngroups, dtype=bool)
+    out = np.zeros(ngroups, dtype=values.dtype)
+    if len(g):
+        starts = np.flatnonzero(np.r_[True, g[1:] != g[:-1]])
+        out[g[starts]] = ufunc.reduceat(v, starts)
+        present[g[starts]] = True
+    return out, present
+
+
+def _min_max(enc: Any, gid: np.ndarray, sel: Optional[np.ndarray], ngroups: int, agg: str) -> Optional[List[Any]]:
+    ufunc = np.minimum if agg == "min" else np.maximum
+    valid = _valid_at(enc, sel)
+    if isinstance(enc, NumArray):
+        vals = _take(enc.values, sel)
+        if valid is not None:
+            vals, gid = vals[valid], gid[valid]
+        out, present = _reduce(gid, vals, ngroups, ufunc)
+        return [v if p else None for v, p in zip(out.tolist(), present.tolist())]
+    # compare dictionary entries in Python once, then reduce their ranks
+    entries = [v for v in enc.dictionary if v is not None]
+    try:
+        ordered = sorted(entries)
+    except TypeError:
+        return None
+    pos = {v: r for r, v in enumerate(ordered)}
+    rank_of = np.array([pos[v] if v is not None else -1 for v in enc.dictionary], dtype=np.int64)
+    ranks = rank_of[_take(enc.codes, sel)]
+    if valid is not None:
+        ranks, gid = ranks[valid], gid[valid]
+    out, present = _reduce(gid, ranks, ngroups, ufunc)
+    return [ordered[r] if p else None for r, p in zip(out.tolist(), present.tolist())]
+
+
+def group_by(
+    key_encs: List[Any],
+    key_cols: List[Sequence[Any]],
+    agg_specs: List[Tuple[str, str, Any]],
+    sel: Optional[np.ndarray],
+    n: int,
+) -> Optional[Tuple[List[List[Any]], List[List[Any]]]]:
+    # -> (key output columns, aggregate output columns) in first-seen group
+    # order, or None. key_cols are the raw columns: output keys are taken from
+    # the first row of each group, exactly as the dict-based path keeps them.
+    # agg_specs: (agg, col, encoding) per output.
+    gid, first = _group_ids(key_encs, sel, n)
+    ngroups = len(first)
+    first_rows = first.tolist() if sel is None else sel[first].tolist()
+    keys_out = [[col[i] for i in first_rows] for col in key_cols]
+
+    aggs_out: List[List[Any]] = []
+    for agg, _, enc in agg_specs:
+        if agg == "count":
+            aggs_out.append(np.bincount(gid, minlength=ngroups).tolist())
+            continue
+        valid = _valid_at(enc, sel)
+        if agg == "count_col":
+            g = gid if valid is None else gid[valid]
+            aggs_out.append(np.bincount(g, minlength=ngroups).tolist())
+        elif agg in ("sum", "avg"):
+            num = _as_numeric(enc)
+            if num is None:
+                return None
+            # bincount adds each group's weights in row order starting from
+            # 0.0, the same float sequence as the Python accumulator
+            vals = _take(num.values, sel).astype(np.float64)
+            if agg == "sum":
+                if valid is not None:
+                    vals = np.where(valid, vals, 0.0)
+                aggs_out.append(np.bincount(gid, weights=vals, minlength=ngroups).tolist())
+            else:
+                g = gid
+                if valid is not None:
+                    vals, g = vals[valid], gid[valid]
+                sums = np.bincount(g, weights=vals, minlength=ngroups).tolist()
+                counts = np.bincount(g, minlength=ngroups).tolist()
+                aggs_out.append([s / c if c > 0 else None for s, c in zip(sums, counts)])
+        elif agg in ("min", "max"):
+            out = _min_max(enc, gid, sel, ngroups, agg)
+            if out is None:
+                return None
+            aggs_out.append(out)
+        else:
+            return None
+    return keys_out, aggs_out
+
+
+# ---------- order by ----------
+def sort_rows(encs: List[Tuple[Any, bool]], sel: Optional[np.ndarray], n: int) -> Optional[List[int]]:
+    # the selected rows (n of them) stably sorted by (encoding, ascending?)
+    # keys, or None when a key holds NULLs (the Python sort places them)
+    keys = []
+    for enc, asc in encs:
+        valid = _valid_at(enc, sel)
+        if valid is not None and not valid.all():
+            return None
+        if isinstance(enc, NumArray):
+            rank = np.unique(_take(enc.values, sel), return_inverse=True)[1].reshape(-1)
+        else:
+            try:
+                ordered = sorted(v for v in enc.dictionary if v is not None)
+            except TypeError:
+                return None
+            pos = {v: r for r, v in enumerate(ordered)}
+            table = np.array([pos.get(v, -1) for v in enc.dictionary], dtype=np.int64)
+            rank = table[_take(enc.codes, sel)]
+        keys.append(rank if asc else -rank)
+    order = np.lexsort(keys[::-1]) if keys else np.arange(n)
+    return (order if sel is None else sel[order]).tolist()
+
+
+# ---------- join ----------
+def _join_codes(left: Any, right: Any, lsel: Optional[np.ndarray], rsel: Optional[np.ndarray]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    # key codes of both sides in one code space (-1: value absent on the right)
+    if isinstance(left, CodeArray) != isinstance(right, CodeArray):
+        left, right = _as_numeric(left), _as_numeric(right)
+        if left is None or right is None:
+            return None
+    if isinstance(left, CodeArray) and isinstance(right, CodeArray):
+        rindex = {v: c for c, v in enumerate(right.dictionary)}
+        lmap = np.array([rindex.get(v, -1) for v in left.dictionary], dtype=np.int64)
+        return lmap[_take(left.codes, lsel)], _take(right.codes, rsel)
+    if isinstance(left, NumArray) and isinstance(right, NumArray):
+        if left.values.dtype != right.values.dtype:
+            return None
+        lv, rv = _take(left.values, lsel), _take(right.values, rsel)
+        uniq, inv = np.unique(np.concatenate([lv, rv]), return_inverse=True)
+        inv = inv.reshape(-1)
+        null = len(uniq)
+        lc, rc = inv[:len(lv)], inv[len(lv):]
+        if left.valid is not None:
+            lc = np.where(_take(left.valid, lsel), lc, null)
+        if right.valid is not None:
+            rc = np.where(_take(right.valid, rsel), rc, null)
+        return lc, rc
+    return None
+
+
+def join_rows(
+    left: Any,
+    right: Any,
+    lsel: Optional[np.ndarray],
+    rsel: Optional[np.ndarray],
+    how: str,
+) -> Optional[Tuple[List[int], List[int]]]:
+    # (left rows, right rows) of the join output, -1 for the missing side of
+    # an outer row, in the order of the hash join: left rows in order with
+    # their matches in right order, then (how="right") unmatched right rows
+    # grouped by key in first-seen order. Right rows are sorted by key once
+    # and each left key finds its run with searchsorted.
+    codes = _join_codes(left, right, lsel, rsel)
+    if codes is None:
+        return None
+    lc, rc = codes
+    nl, nr = len(lc), len(rc)
+    order = np.argsort(rc, kind="stable")
+    rs = rc[order]
+    lo = np.searchsorted(rs, lc, side="left")
+    hi = np.searchsorted(rs, lc, side="right")
+    cnt = hi - lo
+    missing = cnt == 0
+    reps = np.where(missing, 1, cnt) if how == "left" else cnt
+    total = int(reps.sum())
+    li = np.repeat(np.arange(nl), reps)
+    offs = np.arange(total) - np.repeat(np.cumsum(reps) - reps, reps)
+    if nr:
+        ri = order[np.minimum(np.repeat(lo, reps) + offs, nr - 1)]
+    else:
+        ri = np.zeros(total, dtype=np.int64)
+    if how == "left":
+        ri = np.where(np.repeat(missing, reps), -1, ri)
+
+    if how == "right":
+        unmatched = np.flatnonzero(~np.isin(rc, lc))
+        if len(unmatched):
+            ncodes = int(rc.max()) + 1
+            first = np.full(ncodes, nr, dtype=np.int64)
+            np.minimum.at(first, rc, np.arange(nr))
+            unmatched = unmatched[np.lexsort((unmatched, first[rc[unmatched]]))]
+            li = np.concatenate([li, np.full(len(unmatched), -1, dtype=np.int64)])
+            ri = np.concatenate([ri, unmatched])
+    return _to_rows(li, lsel), _to_rows(ri, rsel)
+
+
+def _to_rows(pos: np.ndarray, sel: Optional[np.ndarray]) -> List[int]:
+    # selection positions -> row numbers, keeping -1
+    if sel is not None and len(sel):
+        pos = np.where(pos >= 0, sel[pos], -1)
+    return pos.tolist()
@@ -0,0 +1,71 @@
+from typing import Iterator, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+import threading
+import time
+
+# Deadlines and cooperative cancellation for engine queries.
+#
+# A QueryContext is installed with query_scope() for the duration of a query
+# (main.py does this per HTTP request). The engine's scan and operator loops
+# call check_query() every chunk / every few thousand lines; once the deadline
+# has passed or cancel() was called (e.g. the client disconnected) it raises,
+# unwinding the scan from whatever thread runs it. Outside a scope
+# check_query() is a single ContextVar lookup.
+
+
+class QueryCancelled(Exception):
+    pass
+
+
+class QueryTimeout(QueryCancelled):
+    pass
+
+
+class QueryContext:
+    def __init__(self, timeout: Optional[float] = None):
+        self.started = time.monotonic()
+        self.deadline = self.started + timeout if timeout else None
+        self.reason: Optional[str] = None
+        self._cancelled = threading.Event()
+
+    def cancel(self, reason: str = "cancel() called") -> None:
+        if not self._cancelled.is_set():
+            self.reason = reason
+            self._cancelled.set()
+
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def remaining(self) -> Optional[float]:
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def check(self) -> None:
+        if self._cancelled.is_set():
+            raise QueryCancelled(f"query cancelled: {self.reason}")
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise QueryTimeout(f"query exceeded its {self.deadline - self.started:g}s deadline")
+
+
+_current_query: ContextVar[Optional[QueryContext]] = ContextVar("olympiascope_current_query", default=None)
+
+
+@contextmanager
+def query_scope(ctx: Optional[QueryContext] = None, timeout: Optional[float] = None) -> Iterator[QueryContext]:
+    if ctx is None:
+        ctx = QueryContext(timeout)
+    token = _current_query.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _current_query.reset(token)
+
+
+def current_query() -> Optional[QueryContext]:
+    return _current_query.get()
+
+
+def check_query() -> None:
+    ctx = _current_query.get()
+    if ctx is not None:
+        ctx.check()
@@ -0,0 +1,385 @@
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from abc import abstractmethod
+from collections.abc import Sequence as SequenceABC
+import glob
+import json
+import mmap
+import os
+import pickle
+import struct
+import threading
+
+from my_sql_engine import MyCSVParser, MyDataFrame
+from query_context import query_scope
+
+try:
+    import fcntl
+except ImportError:  # Windows: builds are not serialized across processes
+    fcntl = None
+
+# ---------- Shared columnar dataset ----------
+#
+# A CSV is parsed once into a columns file that every worker process maps
+# read-only, so N uvicorn workers share one copy of the data through the page
+# cache instead of each parsing and holding its own. Columns are typed:
+#
+#   int64 / float64   fixed-width values (columns without nulls)
+#   dict              uint32 codes into a dictionary of distinct values
+#                     (code 0 is NULL); only the dictionary is per process
+#   str               utf-8 blob + int64 offsets for high-cardinality strings
+#
+# File layout: MAGIC, u64 metadata length, JSON metadata, then 8-byte aligned
+# blocks referenced from the metadata by (offset, nbytes).
+#
+# Lifecycle: the file records the source CSV's size and mtime. The first
+# process to find it missing or stale rebuilds it under an exclusive file lock
+# into a temp file and os.replace()s it into place; processes still mapping the
+# previous file keep a valid mapping until they reopen. A restarted worker just
+# maps the existing file again. (A plain mmap'd file is used rather than
+# multiprocessing.shared_memory because named segments are unlinked when the
+# creating process exits, which does not survive worker restarts.)
+
+MAGIC = b"OSCOLS01"
+FORMAT_VERSION = 1
+# string columns with more distinct values than this share of rows are stored
+# raw rather than dictionary-encoded
+DICT_MAX_DISTINCT_RATIO = 0.5
+
+
+class _SharedColumn(SequenceABC):
+    # read-only positional access over a mapped block (subclasses set _n and
+    # implement _get); slices return lists so MyDataFrame.compact() produces
+    # ordinary column lists. vector_cache holds the NumPy backend's encoding of
+    # the column (see numpy_backend.encoded).
+    vector_cache: Optional[Tuple[Any]] = None
+
+    def __len__(self) -> int:
+        return self._n
+
+    @abstractmethod
+    def _get(self, i: int) -> Any:
+        # value at a non-negative, in-range position
+        ...
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._get(j) for j in range(*i.indices(self._n))]
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("column index out of range")
+        return self._get(i)
+
+    def __iter__(self) -> Iterator[Any]:
+        for i in range(self._n):
+            yield self._get(i)
+
+
+class FixedColumn(_SharedColumn):
+    def __init__(self, values: memoryview):
+        self._values = values
+        self._n = len(values)
+
+    def _get(self, i: int) -> Any:
+        return self._values[i]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self._values[i].tolist()
+        return self._values[i]
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._values)
+
+    def vector_parts(self) -> Tuple[Any, ...]:
+        return ("fixed", self._values)
+
+
+class DictColumn(_SharedColumn):
+    def __init__(self, codes: memoryview, dictionary: List[Any]):
+        self._codes = codes
+        self.dictionary = dictionary
+        self._n = len(codes)
+
+    def _get(self, i: int) -> Any:
+        return self.dictionary[self._codes[i]]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return list(map(self.dictionary.__getitem__, self._codes[i]))
+        return self.dictionary[self._codes[i]]
+
+    def __iter__(self) -> Iterator[Any]:
+        return map(self.dictionary.__getitem__, self._codes)
+
+    def vector_parts(self) -> Tuple[Any, ...]:
+        return ("dict", self._codes, self.dictionary)
+
+
+def _span_start(off: int) -> int:
+    return off if off >= 0 else -off - 1
+
+
+class StrColumn(_SharedColumn):
+    # row i spans offsets[i] .. offsets[i + 1] of the blob; a NULL row stores
+    # its start as -(start + 1)
+    def __init__(self, offsets: memoryview, blob: memoryview):
+        self._offsets = offsets
+        self._blob = blob
+        self._n = len(offsets) - 1
+
+    def _get(self, i: int) -> Any:
+        start = self._offsets[i]
+        if start < 0:
+            return None
+        return str(self._blob[start:_span_start(self._offsets[i + 1])], "utf-8")
+
+
+# ---------- building ----------
+def _column_kind(values: List[Any]) -> str:
+    types = {type(v) for v in values}
+    has_null = type(None) in types
+    types.discard(type(None))
+    if types == {int} and not has_null:
+        return "int64"
+    if types == {float} and not has_null:
+        return "float64"
+    if types == {str} and "" not in values:
+        distinct = len(set(values))
+        if distinct > DICT_MAX_DISTINCT_RATIO * max(1, len(values)):
+            return "str"
+    return "dict"
+
+
+def _encode_column(values: List[Any]) -> Tuple[str, Dict[str, bytes], Dict[str, Any]]:
+    # -> (kind, {block name: bytes}, extra metadata)
+    kind = _column_kind(values)
+    if kind == "int64":
+        return kind, {"values": struct.pack(f"<{len(values)}q", *values)}, {}
+    if kind == "float64":
+        return kind, {"values": struct.pack(f"<{len(values)}d", *values)}, {}
+    if kind == "str":
+        blob = bytearray()
+        offsets = []
+        for v in values:
+            if v is None:
+                offsets.append(-len(blob) - 1)
+                continue
+            offsets.append(len(blob))
+            blob += v.encode("utf-8")
+        offsets.append(len(blob))
+        return kind, {"offsets": struct.pack(f"<{len(offsets)}q", *offsets), "blob": bytes(blob)}, {}
+    dictionary: List[Any] = [None]
+    index: Dict[Any, int] = {None: 0}
+    codes = []
+    for v in values:
+        c = index.get(v)
+        if c is None:
+            c = index[v] = len(dictionary)
+            dictionary.append(v)
+        codes.append(c)
+    blocks = {
+        "codes": struct.pack(f"<{len(codes)}I", *codes),
+        "dictionary": pickle.dumps(dictionary, protocol=pickle.HIGHEST_PROTOCOL),
+    }
+    return kind, blocks, {"distinct": len(dictionary) - 1}
+
+
+def _source_signature(csv_path: str) -> Dict[str, Any]:
+    st = os.stat(csv_path)
+    return {"path": os.path.abspath(csv_path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def build_columns_file(
+    csv_path: str,
+    out_path: str,
+    schema: Optional[Dict[str, Any]] = None,
+    chunk_size: int = 50_000,
+) -> str:
+    source = _source_signature(csv_path)
+    parser = MyCSVParser(csv_path, chunk_size=chunk_size, schema=schema)
+    names = parser.headers()
+    cols: Dict[str, List[Any]] = {c: [] for c in names}
+    for batch in parser.iter_batches():
+        for c in names:
+            cols[c].extend(batch.get_col(c))
+    nrows = len(cols[names[0]]) if names else 0
+
+    encoded = []
+    for c in names:
+        kind, blocks, extra = _encode_column(cols[c])
+        cols[c] = []  # release the parsed values as we go
+        encoded.append((c, kind, blocks, extra))
+
+    # block offsets are relative to the data start, which follows the metadata
+    columns_meta = []
+    pos = 0
+    for c, kind, blocks, extra in encoded:
+        refs = {}
+        for name, data in blocks.items():
+            refs[name] = [pos, len(data)]
+            pos += len(data) + (-len(data) % 8)
+        columns_meta.append({"name": c, "kind": kind, "blocks": refs, **extra})
+    meta = {"version": FORMAT_VERSION, "source": source, "nrows": nrows, "columns": columns_meta}
+    meta_bytes = json.dumps(meta).encode("utf-8")
+    header_len = len(MAGIC) + 8 + len(meta_bytes)
+    header_len += -header_len % 8
+
+    tmp = f"{out_path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(meta_bytes)))
+        f.write(meta_bytes)
+        f.write(b"\0" * (header_len - len(MAGIC) - 8 - len(meta_bytes)))
+        for _, _, blocks, _ in encoded:
+            for data in blocks.values():
+                f.write(data)
+                f.write(b"\0" * (-len(data) % 8))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, out_path)
+    return out_path
+
+
+# ---------- attaching ----------
+class SharedDataset:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+        if bytes(buf[:len(MAGIC)]) != MAGIC:
+            buf.release()
+            self._mmap.close()
+            raise ValueError(f"{path} is not a columns file")
+        (meta_len,) = struct.unpack_from("<Q", buf, len(MAGIC))
+        meta_start = len(MAGIC) + 8
+        self.meta = json.loads(bytes(buf[meta_start:meta_start + meta_len]))
+        data_start = meta_start + meta_len
+        data_start += -data_start % 8
+        self._buf = buf
+        self.nrows = self.meta["nrows"]
+        self.columns: Dict[str, _SharedColumn] = {}
+        self._views: List[memoryview] = [buf]
+        for col in self.meta["columns"]:
+            blocks = {
+                name: buf[data_start + off:data_start + off + n]
+                for name, (off, n) in col["blocks"].items()
+            }
+            self._views.extend(blocks.values())
+            kind = col["kind"]
+            if kind in ("int64", "float64"):
+                view = blocks["values"].cast("q" if kind == "int64" else "d")
+                self._views.append(view)
+                self.columns[col["name"]] = FixedColumn(view)
+            elif kind == "str":
+                offsets = blocks["offsets"].cast("q")
+                self._views.append(offsets)
+                self.columns[col["name"]] = StrColumn(offsets, blocks["blob"])
+            else:
+                codes = blocks["codes"].cast("I")
+                self._views.append(codes)
+                dictionary = pickle.loads(blocks["dictionary"])
+                self.columns[col["name"]] = DictColumn(codes, dictionary)
+
+    def frame(self) -> MyDataFrame:
+        # read-only view: operators that need owned lists copy on compact()
+        df = MyDataFrame._wrap(dict(self.columns))
+        df._n = self.nrows
+        df._shared = True
+        return df
+
+    def is_stale(self) -> bool:
+        src = self.meta["source"]
+        try:
+            sig = _source_signature(src["path"])
+        except OSError:
+            return False
+        return sig["size"] != src["size"] or sig["mtime_ns"] != src["mtime_ns"]
+
+    def close(self) -> None:
+        # frames handed out earlier must not be used after close()
+        for col in self.columns.values():
+            col.vector_cache = None  # may hold arrays over the mapping
+        self.columns = {}
+        for v in reversed(self._views):
+            v.release()
+        self._views = []
+        self._mmap.close()
+
+    def __enter__(self) -> "SharedDataset":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _is_fresh(path: str, csv_path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return False
+            (meta_len,) = struct.unpack("<Q", f.read(8))
+            meta = json.loads(f.read(meta_len))
+    except (OSError, ValueError, struct.error):
+        return False
+    return meta.get("version") == FORMAT_VERSION and meta["source"] == _source_signature(csv_path)
+
+
+def open_shared_dataset(
+    csv_path: str,
+    columns_path: str,
+    schema: Optional[Dict[str, Any]] = None,
+    chunk_size: int = 50_000,
+) -> SharedDataset:
+    # attach to columns_path, (re)building it from csv_path first if missing or
+    # stale; concurrent callers wait for a single builder
+    if not _is_fresh(columns_path, csv_path):
+        os.makedirs(os.path.dirname(os.path.abspath(columns_path)), exist_ok=True)
+        with open(columns_path + ".lock", "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if not _is_fresh(columns_path, csv_path):
+                    for leftover in glob.glob(glob.escape(columns_path) + ".tmp*"):
+                        os.remove(leftover)  # from a builder that died mid-write
+                    # not bound to the deadline of the request that found it stale
+                    with query_scope():
+                        build_columns_file(csv_path, columns_path, schema=schema, chunk_size=chunk_size)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+    return SharedDataset(columns_path)
+
+
+class SharedTables:
+    # per-process registry: name -> attached dataset, reattached when the
+    # source CSV changes
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._specs: Dict[str, Tuple[str, Optional[Dict[str, Any]]]] = {}
+        self._open: Dict[str, SharedDataset] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, csv_path: str, schema: Optional[Dict[str, Any]] = None) -> None:
+        self._specs[name] = (csv_path, schema)
+
+    def dataset(self, name: str) -> SharedDataset:
+        with self._lock:
+            ds = self._open.get(name)
+            if ds is not None and not ds.is_stale():
+                return ds
+            csv_path, schema = self._specs[name]
+            fresh = open_shared_dataset(csv_path, os.path.join(self.directory, f"{name}.cols"), schema)
+            # the old mapping stays referenced by frames already handed out and
+            # is released when they are garbage collected
+            self._open[name] = fresh
+            return fresh
+
+    def frame(self, name: str) -> MyDataFrame:
+        return self.dataset(name).frame()
+
+    def preload(self, names: Optional[Sequence[str]] = None) -> None:
+        for name in names if names is not None else list(self._specs):
+            if os.path.exists(self._specs[name][0]):
+                self.dataset(name)
@@ -0,0 +1,885 @@
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from collections import OrderedDict
+import os
+import re
+import threading
+
+from my_sql_engine import (
+    HashAggregator,
+    MyCSVParser,
+    MyDataFrame,
+    instrumented,
+    iter_join_streaming_small_big,
+)
+
+# ---------- SQL front end ----------
+#
+# A small SELECT dialect over CSV tables registered with SQLEngine:
+#
+#   SELECT [DISTINCT] items FROM t [alias]
+#     [[LEFT|INNER] JOIN small [alias] ON a.col = b.col]
+#     [WHERE expr] [GROUP BY cols] [HAVING expr]
+#     [ORDER BY col|alias|position [ASC|DESC], ...] [LIMIT n [OFFSET m]]
+#
+# Expressions: column refs (bare, "quoted" or alias.col), numbers, 'strings',
+# NULL/TRUE/FALSE, ? and :name parameters, + - * /, comparisons, AND/OR/NOT,
+# IS [NOT] NULL, [NOT] IN (...), [NOT] BETWEEN, [NOT] LIKE / ILIKE, LOWER(),
+# UPPER(), COALESCE(), and the aggregates COUNT(*), COUNT, SUM, AVG, MIN, MAX.
+# Comparisons involving NULL are false, as in SQL; aggregates skip NULLs, and
+# SUM (like MIN/MAX/AVG) is NULL when a group has no non-null values. SUM
+# over ints is an exact int. ORDER BY puts NULLs last for ASC and first for
+# DESC.
+#
+# Queries are parsed and planned once per normalized text and the compiled
+# plan is cached; parameters are bound at execution time. The FROM table is
+# streamed chunk by chunk (lazy rows, so only referenced columns are
+# converted; inferred column types still follow file order, so results do
+# not depend on which columns a query reads); an equality on a column against
+# a constant or parameter is pushed into the scan as a key filter. The JOIN
+# table is loaded into memory and probed with iter_join_streaming_small_big.
+
+
+class SQLError(ValueError):
+    pass
+
+
+KEYWORDS = {
+    "SELECT", "DISTINCT", "FROM", "WHERE", "GROUP", "BY", "HAVING", "ORDER", "ASC", "DESC",
+    "LIMIT", "OFFSET", "JOIN", "INNER", "LEFT", "ON", "AS", "AND", "OR", "NOT", "NULL",
+    "IS", "IN", "LIKE", "ILIKE", "BETWEEN", "TRUE", "FALSE",
+}
+AGGREGATES = {"COUNT", "SUM", "AVG", "MIN", "MAX"}
+SCALAR_FUNCS = {"LOWER", "UPPER", "COALESCE"}
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>\s+)
+  | (?P<num>\d+\.\d*|\.\d+|\d+)
+  | (?P<str>'(?:[^']|'')*')
+  | (?P<qident>"(?:[^"]|"")+"|`[^`]+`)
+  | (?P<param>\?|:[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<op><>|!=|<=|>=|[=<>+\-*/(),.])
+    """,
+    re.VERBOSE,
+)
+
+
+def tokenize(sql: str) -> List[Tuple[str, Any]]:
+    tokens: List[Tuple[str, Any]] = []
+    pos = 0
+    n_positional = 0
+    while pos < len(sql):
+        m = _TOKEN_RE.match(sql, pos)
+        if m is None:
+            raise SQLError(f"unexpected character {sql[pos]!r} at {pos}")
+        pos = m.end()
+        kind = m.lastgroup
+        text = m.group()
+        if kind == "ws":
+            continue
+        if kind == "num":
+            tokens.append(("num", float(text) if "." in text else int(text)))
+        elif kind == "str":
+            tokens.append(("str", text[1:-1].replace("''", "'")))
+        elif kind == "qident":
+            tokens.append(("ident", text[1:-1].replace('""', '"')))
+        elif kind == "param":
+            if text == "?":
+                tokens.append(("param", n_positional))
+                n_positional += 1
+            else:
+                tokens.append(("param", text[1:]))
+        elif kind == "ident":
+            upper = text.upper()
+            if upper in KEYWORDS:
+                tokens.append(("kw", upper))
+            else:
+                tokens.append(("ident", text))
+        else:
+            tokens.append(("op", text))
+    tokens.append(("eof", None))
+    return tokens
+
+
+def normalize_sql(sql: str) -> str:
+    # canonical text used as the plan-cache key: whitespace and keyword case
+    # do not matter, literals and identifiers do
+    parts = []
+    for kind, val in tokenize(sql)[:-1]:
+        if kind == "str":
+            parts.append("'" + val.replace("'", "''") + "'")
+        elif kind == "ident":
+            parts.append('"' + val.replace('"', '""') + '"')
+        elif kind == "param":
+            parts.append("?" if isinstance(val, int) else f":{val}")
+        else:
+            parts.append(str(val))
+    return " ".join(parts)
+
+
+# ---------- parser (tokens -> AST tuples) ----------
+class _Parser:
+    def __init__(self, tokens: List[Tuple[str, Any]]):
+        self.toks = tokens
+        self.i = 0
+
+    def peek(self, offset: int = 0) -> Tuple[str, Any]:
+        return self.toks[self.i + offset]
+
+    def next(self) -> Tuple[str, Any]:
+        tok = self.toks[self.i]
+        self.i += 1
+        return tok
+
+    def accept(self, kind: str, val: Any = None) -> bool:
+        k, v = self.peek()
+        if k == kind and (val is None or v == val):
+            self.i += 1
+            return True
+        return False
+
+    def expect(self, kind: str, val: Any = None) -> Any:
+        k, v = self.next()
+        if k != kind or (val is not None and v != val):
+            want = val if val is not None else kind
+            raise SQLError(f"expected {want}, got {v if v is not None else k}")
+        return v
+
+    # ---- statement ----
+    def parse_select(self) -> Dict[str, Any]:
+        self.expect("kw", "SELECT")
+        q: Dict[str, Any] = {"distinct": self.accept("kw", "DISTINCT")}
+        q["items"] = self.parse_select_items()
+        self.expect("kw", "FROM")
+        q["from"] = self.parse_table_ref()
+        q["join"] = None
+        how = None
+        if self.accept("kw", "LEFT"):
+            how = "left"
+        elif self.accept("kw", "INNER"):
+            how = "inner"
+        if how is not None or self.peek() == ("kw", "JOIN"):
+            self.expect("kw", "JOIN")
+            table = self.parse_table_ref()
+            self.expect("kw", "ON")
+            left = self.parse_primary()
+            self.expect("op", "=")
+            right = self.parse_primary()
+            if left[0] != "col" or right[0] != "col":
+                raise SQLError("JOIN ... ON needs a column = column condition")
+            q["join"] = {"table": table, "how": how or "inner", "on": (left, right)}
+        q["where"] = self.parse_expr() if self.accept("kw", "WHERE") else None
+        q["group_by"] = []
+        if self.accept("kw", "GROUP"):
+            self.expect("kw", "BY")
+            q["group_by"].append(self.parse_expr())
+            while self.accept("op", ","):
+                q["group_by"].append(self.parse_expr())
+        q["having"] = self.parse_expr() if self.accept("kw", "HAVING") else None
+        q["order_by"] = []
+        if self.accept("kw", "ORDER"):
+            self.expect("kw", "BY")
+            while True:
+                expr = self.parse_expr()
+                direction = "asc"
+                if self.accept("kw", "DESC"):
+                    direction = "desc"
+                else:
+                    self.accept("kw", "ASC")
+                q["order_by"].append((expr, direction))
+                if not self.accept("op", ","):
+                    break
+        q["limit"] = q["offset"] = None
+        if self.accept("kw", "LIMIT"):
+            q["limit"] = self.parse_primary()
+            if self.accept("kw", "OFFSET"):
+                q["offset"] = self.parse_primary()
+        if self.peek()[0] != "eof":
+            raise SQLError(f"unexpected {self.peek()[1]!r} after end of query")
+        return q
+
+    def parse_table_ref(self) -> Tuple[str, str]:
+        name = self.expect("ident")
+        alias = name
+        if self.accept("kw", "AS"):
+            alias = self.expect("ident")
+        elif self.peek()[0] == "ident":
+            alias = self.next()[1]
+        return name, alias
+
+    def parse_select_items(self) -> List[Tuple[Any, Optional[str]]]:
+        items: List[Tuple[Any, Optional[str]]] = []
+        while True:
+            if self.accept("op", "*"):
+                items.append((("star",), None))
+            else:
+                expr = self.parse_expr()
+                alias = None
+                if self.accept("kw", "AS"):
+                    alias = self.expect("ident")
+                elif self.peek()[0] == "ident":
+                    alias = self.next()[1]
+                items.append((expr, alias))
+            if not self.accept("op", ","):
+                return items
+
+    # ---- expressions ----
+    def parse_expr(self) -> Any:
+        terms = [self.parse_and()]
+        while self.accept("kw", "OR"):
+            terms.append(self.parse_and())
+        return terms[0] if len(terms) == 1 else ("or", terms)
+
+    def parse_and(self) -> Any:
+        terms = [self.parse_not()]
+        while self.accept("kw", "AND"):
+            terms.append(self.parse_not())
+        return terms[0] if len(terms) == 1 else ("and", terms)
+
+    def parse_not(self) -> Any:
+        if self.accept("kw", "NOT"):
+            return ("not", self.parse_not())
+        return self.parse_predicate()
+
+    def parse_predicate(self) -> Any:
+        left = self.parse_additive()
+        k, v = self.peek()
+        if k == "op" and v in ("=", "!=", "<>", "<", "<=", ">", ">="):
+            self.next()
+            return ("cmp", "!=" if v == "<>" else v, left, self.parse_additive())
+        if self.accept("kw", "IS"):
+            negate = self.accept("kw", "NOT")
+            self.expect("kw", "NULL")
+            return ("isnull", left, negate)
+        negate = self.accept("kw", "NOT")
+        if self.accept("kw", "IN"):
+            self.expect("op", "(")
+            values = [self.parse_expr()]
+            while self.accept("op", ","):
+                values.append(self.parse_expr())
+            self.expect("op", ")")
+            return ("in", left, values, negate)
+        if self.accept("kw", "BETWEEN"):
+            low = self.parse_additive()
+            self.expect("kw", "AND")
+            high = self.parse_additive()
+            node = ("and", [("cmp", ">=", left, low), ("cmp", "<=", left, high)])
+            return ("not", node) if negate else node
+        for kw in ("LIKE", "ILIKE"):
+            if self.accept("kw", kw):
+                return ("like", left, self.parse_additive(), negate, kw == "ILIKE")
+        if negate:
+            raise SQLError("expected IN, BETWEEN or LIKE after NOT")
+        return left
+
+    def parse_additive(self) -> Any:
+        node = self.parse_term()
+        while self.peek() in (("op", "+"), ("op", "-")):
+            op = self.next()[1]
+            node = ("arith", op, node, self.parse_term())
+        return node
+
+    def parse_term(self) -> Any:
+        node = self.parse_unary()
+        while self.peek() in (("op", "*"), ("op", "/")):
+            op = self.next()[1]
+            node = ("arith", op, node, self.parse_unary())
+        return node
+
+    def parse_unary(self) -> Any:
+        if self.accept("op", "-"):
+            return ("arith", "-", ("lit", 0), self.parse_unary())
+        return self.parse_primary()
+
+    def parse_primary(self) -> Any:
+        k, v = self.next()
+        if k in ("num", "str"):
+            return ("lit", v)
+        if k == "param":
+            return ("param", v)
+        if k == "kw" and v == "NULL":
+            return ("lit", None)
+        if k == "kw" and v in ("TRUE", "FALSE"):
+            return ("lit", v == "TRUE")
+        if k == "op" and v == "(":
+            node = self.parse_expr()
+            self.expect("op", ")")
+            return node
+        if k == "ident":
+            upper = v.upper()
+            if self.peek() == ("op", "(") and (upper in AGGREGATES or upper in SCALAR_FUNCS):
+                self.next()
+                if upper in AGGREGATES:
+                    if upper == "COUNT" and self.accept("op", "*"):
+                        arg = None
+                    else:
+                        arg = self.parse_expr()
+                    self.expect("op", ")")
+                    return ("agg", upper, arg)
+                args = [self.parse_expr()]
+                while self.accept("op", ","):
+                    args.append(self.parse_expr())
+                self.expect("op", ")")
+                return ("func", upper, args)
+            if self.accept("op", "."):
+                return ("col", v, self.expect("ident"))
+            return ("col", None, v)
+        raise SQLError(f"unexpected {v if v is not None else k!r}")
+
+
+def parse_sql(sql: str) -> Dict[str, Any]:
+    return _Parser(tokenize(sql)).parse_select()
+
+
+# ---------- expression compiler (AST -> closures over (row, params)) ----------
+def _like_regex(pattern: str, case_insensitive: bool) -> "re.Pattern":
+    out = []
+    for ch in pattern:
+        if ch == "%":
+            out.append(".*")
+        elif ch == "_":
+            out.append(".")
+        else:
+            out.append(re.escape(ch))
+    return re.compile("^" + "".join(out) + "$", re.DOTALL | (re.IGNORECASE if case_insensitive else 0))
+
+
+_CMP = {
+    "=": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+}
+
+
+def _param(params: Any, key: Any) -> Any:
+    try:
+        return params[key]
+    except (KeyError, IndexError, TypeError):
+        raise SQLError(f"missing value for parameter {key if isinstance(key, str) else '?' + str(key + 1)}")
+
+
+def compile_expr(node: Any, resolve: Callable[[Any], str]) -> Callable[[Dict[str, Any], Any], Any]:
+    # resolve maps a ("col", ...) or ("agg", ...) node to the row key holding it
+    kind = node[0]
+    if kind == "lit":
+        value = node[1]
+        return lambda row, params: value
+    if kind == "param":
+        key = node[1]
+        return lambda row, params: _param(params, key)
+    if kind in ("col", "agg"):
+        name = resolve(node)
+        return lambda row, params: row[name]
+    if kind == "and":
+        parts = [compile_expr(t, resolve) for t in node[1]]
+        return lambda row, params: all(p(row, params) for p in parts)
+    if kind == "or":
+        parts = [compile_expr(t, resolve) for t in node[1]]
+        return lambda row, params: any(p(row, params) for p in parts)
+    if kind == "not":
+        inner = compile_expr(node[1], resolve)
+        return lambda row, params: not inner(row, params)
+    if kind == "cmp":
+        fn = _CMP[node[1]]
+        left = compile_expr(node[2], resolve)
+        right = compile_expr(node[3], resolve)
+
+        def cmp(row, params):
+            a = left(row, params)
+            b = right(row, params)
+            if a is None or b is None:
+                return False
+            try:
+                return fn(a, b)
+            except TypeError:
+                return False
+        return cmp
+    if kind == "isnull":
+        inner = compile_expr(node[1], resolve)
+        negate = node[2]
+        return lambda row, params: (inner(row, params) is None) != negate
+    if kind == "in":
+        inner = compile_expr(node[1], resolve)
+        values = [compile_expr(v, resolve) for v in node[2]]
+        negate = node[3]
+
+        def in_list(row, params):
+            v = inner(row, params)
+            if v is None:
+                return False
+            return (v in {f(row, params) for f in values}) != negate
+        return in_list
+    if kind == "like":
+        inner = compile_expr(node[1], resolve)
+        pattern = compile_expr(node[2], resolve)
+        negate, ci = node[3], node[4]
+        cache: Dict[Any, Any] = {}
+
+        def like(row, params):
+            v = inner(row, params)
+            p = pattern(row, params)
+            if v is None or p is None:
+                return False
+            rx = cache.get(p)
+            if rx is None:
+                rx = cache[p] = _like_regex(str(p), ci)
+            return (rx.match(str(v)) is not None) != negate
+        return like
+    if kind == "arith":
+        op = node[1]
+        left = compile_expr(node[2], resolve)
+        right = compile_expr(node[3], resolve)
+
+        def arith(row, params):
+            a = left(row, params)
+            b = right(row, params)
+            if a is None or b is None:
+                return None
+            if op == "+":
+                return a + b
+            if op == "-":
+                return a - b
+            if op == "*":
+                return a * b
+            return a / b if b != 0 else None
+        return arith
+    if kind == "func":
+        args = [compile_expr(a, resolve) for a in node[2]]
+        name = node[1]
+        if name == "COALESCE":
+            def coalesce(row, params):
+                for a in args:
+                    v = a(row, params)
+                    if v is not None:
+                        return v
+                return None
+            return coalesce
+        if len(args) != 1:
+            raise SQLError(f"{name} takes one argument")
+        arg = args[0]
+        method = str.lower if name == "LOWER" else str.upper
+        return lambda row, params: None if (v := arg(row, params)) is None else method(str(v))
+    if kind == "star":
+        raise SQLError("* is only allowed as a select item")
+    raise SQLError(f"unsupported expression {kind}")
+
+
+def _walk(node: Any) -> Iterator[Any]:
+    if not isinstance(node, tuple):
+        return
+    yield node
+    for child in node[1:]:
+        if isinstance(child, tuple):
+            yield from _walk(child)
+        elif isinstance(child, list):
+            for c in child:
+                yield from _walk(c)
+
+
+def _has_agg(node: Any) -> bool:
+    return any(n[0] == "agg" for n in _walk(node))
+
+
+def _expr_name(node: Any) -> str:
+    kind = node[0]
+    if kind == "col":
+        return node[2]
+    if kind == "agg":
+        inner = "*" if node[2] is None else _expr_name(node[2])
+        return f"{node[1].lower()}({inner})"
+    if kind == "func":
+        return f"{node[1].lower()}({', '.join(_expr_name(a) for a in node[2])})"
+    if kind == "lit":
+        return repr(node[1])
+    return kind
+
+
+def _conjuncts(node: Any) -> List[Any]:
+    if node is None:
+        return []
+    if node[0] == "and":
+        out: List[Any] = []
+        for t in node[1]:
+            out.extend(_conjuncts(t))
+        return out
+    return [node]
+
+
+# ---------- tables & plans ----------
+class _Table:
+    def __init__(self, name: str, path: str, schema: Optional[Dict[str, Any]], chunk_size: int):
+        self.name = name
+        self.path = path
+        self.schema = schema
+        self.chunk_size = chunk_size
+        self.columns = list(MyCSVParser(path, schema=schema).headers())
+        self._frame: Optional[MyDataFrame] = None
+        self._frame_mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def parser(self, lazy: bool = False) -> MyCSVParser:
+        return MyCSVParser(self.path, chunk_size=self.chunk_size, schema=self.schema, lazy=lazy)
+
+    def frame(self) -> MyDataFrame:
+        # in-memory copy for the build side of joins, reloaded when the file changes
+        mtime = os.path.getmtime(self.path)
+        with self._lock:
+            if self._frame is None or self._frame_mtime != mtime:
+                self._frame = MyDataFrame.from_rows(self.parser().iter_rows())
+                self._frame_mtime = mtime
+            return self._frame
+
+
+class PreparedQuery:
+    def __init__(self, engine: "SQLEngine", sql: str, ast: Dict[str, Any]):
+        self.engine = engine
+        self.sql = sql
+        self.ast = ast
+        self._plan()
+
+    # ---- planning ----
+    def _plan(self) -> None:
+        ast = self.ast
+        eng = self.engine
+        from_name, from_alias = ast["from"]
+        self.table = eng._table(from_name)
+        left_cols = self.table.columns
+        aliases = {from_alias: ("left", self.table)}
+        # output name of every qualified/unqualified column, per side
+        self.join = None
+        right_map: Dict[str, str] = {}
+        if ast["join"] is not None:
+            j = ast["join"]
+            r_name, r_alias = j["table"]
+            r_table = eng._table(r_name)
+            if r_alias in aliases:
+                raise SQLError(f"duplicate table alias {r_alias}")
+            aliases[r_alias] = ("right", r_table)
+            on_l, on_r = j["on"]
+            if on_l[1] == r_alias or (on_l[1] is None and on_l[2] not in left_cols):
+                on_l, on_r = on_r, on_l
+            l_key, r_key = on_l[2], on_r[2]
+            if l_key not in left_cols:
+                raise SQLError(f"unknown column {l_key} in {from_name}")
+            if r_key not in r_table.columns:
+                raise SQLError(f"unknown column {r_key} in {r_name}")
+            suffix = f"_{r_alias}"
+            for c in r_table.columns:
+                if c == r_key:
+                    right_map[c] = l_key
+                else:
+                    right_map[c] = c if c not in left_cols else c + suffix
+            self.join = {"table": r_table, "how": j["how"], "l_key": l_key, "r_key": r_key, "suffix": suffix}
+        self.source_columns = list(left_cols) + [
+            v for k, v in right_map.items() if self.join is not None and k != self.join["r_key"]
+        ]
+
+        def resolve_source(node: Any) -> str:
+            if node[0] == "agg":
+                raise SQLError("aggregates are not allowed here")
+            qual, name = node[1], node[2]
+            if qual is not None:
+                if qual not in aliases:
+                    raise SQLError(f"unknown table alias {qual}")
+                side, table = aliases[qual]
+                if name not in table.columns:
+                    raise SQLError(f"unknown column {qual}.{name}")
+                return name if side == "left" else right_map[name]
+            if name in left_cols:
+                return name
+            if name in right_map:
+                return right_map[name]
+            raise SQLError(f"unknown column {name}")
+
+        self.resolve_source = resolve_source
+
+        # WHERE: push one `col = const/param` conjunct into the scan as a key
+        # filter (single-table queries only; joins already use the key filter)
+        self.pushdown: Optional[Tuple[str, Any]] = None
+        residual = []
+        for c in _conjuncts(ast["where"]):
+            if _has_agg(c):
+                raise SQLError("aggregates are not allowed in WHERE")
+            if (
+                self.pushdown is None
+                and self.join is None
+                and c[0] == "cmp"
+                and c[1] == "="
+            ):
+                col, val = c[2], c[3]
+                if col[0] != "col":
+                    col, val = val, col
+                if col[0] == "col" and val[0] in ("lit", "param") and val != ("lit", None):
+                    self.pushdown = (resolve_source(col), compile_expr(val, resolve_source))
+                    continue
+            residual.append(c)
+        self.where = compile_expr(("and", residual), resolve_source) if residual else None
+
+        # SELECT list
+        items: List[Tuple[Any, str]] = []
+        for expr, alias in ast["items"]:
+            if expr[0] == "star":
+                items.extend((("col", None, c), c) for c in self.source_columns)
+            else:
+                items.append((expr, alias or _expr_name(expr)))
+        self.aggregate = bool(ast["group_by"]) or any(_has_agg(e) for e, _ in items) or (
+            ast["having"] is not None
+        )
+        self.output_names = [name for _, name in items]
+        if len(set(self.output_names)) != len(self.output_names):
+            raise SQLError("duplicate output column names; use AS to rename")
+        by_alias = {name: expr for expr, name in items}
+
+        if self.aggregate:
+            self.group_keys = [resolve_source(g) if g[0] == "col" else None for g in ast["group_by"]]
+            if any(k is None for k in self.group_keys):
+                raise SQLError("GROUP BY supports column references only")
+            self.key_names = [f"__k{i}" for i in range(len(self.group_keys))]
+            self.aggs: List[Tuple[str, Optional[Callable]]] = []
+            agg_slots: Dict[Any, str] = {}
+
+            def register_aggs(node: Any) -> None:
+                for n in _walk(node):
+                    if n[0] == "agg" and n not in agg_slots:
+                        if n[2] is not None and _has_agg(n[2]):
+                            raise SQLError("nested aggregates are not supported")
+                        agg_slots[n] = f"__a{len(agg_slots)}"
+                        arg = compile_expr(n[2], resolve_source) if n[2] is not None else None
+                        self.aggs.append((n[1], arg))
+
+            for expr, _ in items:
+                register_aggs(expr)
+            if ast["having"] is not None:
+                register_aggs(ast["having"])
+
+            key_slot = dict(zip(self.group_keys, self.key_names))
+
+            def resolve_grouped(node: Any) -> str:
+                if node[0] == "agg":
+                    return agg_slots[node]
+                src = resolve_source(node)
+                if src not in key_slot:
+                    raise SQLError(f"column {src} must appear in GROUP BY or an aggregate")
+                return key_slot[src]
+
+            self.select_exprs = [compile_expr(e, resolve_grouped) for e, _ in items]
+            self.having = compile_expr(ast["having"], resolve_grouped) if ast["having"] is not None else None
+            agg_fn = {"COUNT": "count_col", "SUM": "sum_exact", "AVG": "avg", "MIN": "min", "MAX": "max"}
+            self.agg_spec = {}
+            for i, (fn, arg) in enumerate(self.aggs):
+                self.agg_spec[f"__a{i}"] = "count" if (fn == "COUNT" and arg is None) else agg_fn[fn]
+        else:
+            self.select_exprs = [compile_expr(e, resolve_source) for e, _ in items]
+            self.having = None
+
+        # ORDER BY resolves against output names (aliases), positions, or
+        # expressions that appear verbatim in the select list
+        self.order_by: List[Tuple[str, str]] = []
+        for expr, direction in ast["order_by"]:
+            name = None
+            if expr[0] == "lit" and isinstance(expr[1], int):
+                if not 1 <= expr[1] <= len(self.output_names):
+                    raise SQLError(f"ORDER BY position {expr[1]} is out of range")
+                name = self.output_names[expr[1] - 1]
+            elif expr[0] == "col" and expr[1] is None and expr[2] in by_alias:
+                name = expr[2]
+            else:
+                for e, n in items:
+                    if e == expr:
+                        name = n
+                        break
+            if name is None:
+                raise SQLError(f"ORDER BY {_expr_name(expr)} must refer to a selected column")
+            self.order_by.append((name, direction))
+
+        self.limit = compile_expr(ast["limit"], resolve_source) if ast["limit"] is not None else None
+        self.offset = compile_expr(ast["offset"], resolve_source) if ast["offset"] is not None else None
+
+    def explain(self) -> str:
+        lines = []
+        scan = f"Scan {self.table.name} (streaming, lazy rows"
+        if self.pushdown is not None:
+            scan += f", key filter on {self.pushdown[0]}"
+        lines.append(scan + ")")
+        if self.join is not None:
+            j = self.join
+            lines.append(f"HashJoin {j['how']} {j['table'].name} on {j['l_key']} = {j['r_key']}")
+        if self.where is not None:
+            lines.append("Filter")
+        if self.aggregate:
+            lines.append(f"HashAggregate keys={self.group_keys} aggs={[a for a, _ in self.aggs]}")
+            if self.having is not None:
+                lines.append("Having")
+        lines.append(f"Project {self.output_names}")
+        if self.ast["distinct"]:
+            lines.append("Distinct")
+        if self.order_by:
+            lines.append(f"Sort {self.order_by}")
+        if self.limit is not None or self.offset is not None:
+            lines.append("Limit")
+        return "\n".join(lines)
+
+    # ---- execution ----
+    def _source_rows(self, params: Any) -> Iterator[Dict[str, Any]]:
+        if self.join is not None:
+            j = self.join
+            small = j["table"].frame()
+            if j["r_key"] != j["l_key"]:
+                cols = {(j["l_key"] if c == j["r_key"] else c): small.get_col(c) for c in small.columns()}
+                small = MyDataFrame(cols)
+            return iter_join_streaming_small_big(
+                self.table.parser(),
+                small,
+                on_key=j["l_key"],
+                how=j["how"],
+                suffixes=("", j["suffix"]),
+            )
+        key_filter = None
+        if self.pushdown is not None:
+            col, value_fn = self.pushdown
+            value = value_fn({}, params)
+            # NULL = anything is false, so a parameter bound to None matches nothing
+            key_filter = (col, lambda v: v is not None and v == value)
+        chunks = self.table.parser(lazy=True).iter_chunks(key_filter=key_filter)
+        return (row for chunk in chunks for row in chunk)
+
+    def _bound(self, fn: Optional[Callable], params: Any) -> Optional[int]:
+        if fn is None:
+            return None
+        v = fn({}, params)
+        if not isinstance(v, int) or v < 0:
+            raise SQLError("LIMIT/OFFSET must be non-negative integers")
+        return v
+
+    @instrumented("sql.execute")
+    def execute(self, params: Any = None) -> MyDataFrame:
+        params = params if params is not None else {}
+        rows = self._source_rows(params)
+        where = self.where
+        if where is not None:
+            rows = (r for r in rows if where(r, params))
+        limit = self._bound(self.limit, params)
+        offset = self._bound(self.offset, params) or 0
+
+        names = self.output_names
+        exprs = self.select_exprs
+        if self.aggregate:
+            key_names = self.key_names
+            agg = HashAggregator(key_names, self.agg_spec)
+            group_keys = self.group_keys
+            arg_fns = [arg for _, arg in self.aggs]
+            for r in rows:
+                agg.add(
+                    tuple(r[k] for k in group_keys),
+                    [a(r, params) if a is not None else None for a in arg_fns],
+                )
+            if not group_keys and not agg.state:
+                # aggregates over no rows: one row, COUNT = 0 and the rest NULL
+                groups = [{
+                    slot: (0 if fn.startswith("count") else None)
+                    for slot, fn in self.agg_spec.items()
+                }]
+            else:
+                grouped = agg.to_df()
+                agg_out = grouped.columns()[len(key_names):]
+                slot_names = {out: f"__a{i}" for i, out in enumerate(agg_out)}
+                groups = (
+                    {slot_names.get(k, k): v for k, v in g.items()} for g in grouped.iter_rows()
+                )
+            having = self.having
+            out_rows = []
+            for g in groups:
+                if having is not None and not having(g, params):
+                    continue
+                out_rows.append({n: f(g, params) for n, f in zip(names, exprs)})
+        else:
+            # no sort/distinct: stop scanning once offset + limit rows exist
+            stop = None
+            if limit is not None and not self.order_by and not self.ast["distinct"]:
+                stop = offset + limit
+            out_rows = []
+            for r in rows:
+                out_rows.append({n: f(r, params) for n, f in zip(names, exprs)})
+                if stop is not None and len(out_rows) >= stop:
+                    break
+
+        if self.ast["distinct"]:
+            seen = set()
+            unique = []
+            for r in out_rows:
+                key = tuple(r.values())
+                if key not in seen:
+                    seen.add(key)
+                    unique.append(r)
+            out_rows = unique
+
+        df = MyDataFrame.from_rows(out_rows) if out_rows else MyDataFrame({n: [] for n in names})
+        if self.order_by:
+            df = df.order_by(self.order_by)
+        if offset:
+            df = df.offset(offset)
+        if limit is not None:
+            df = df.limit(limit)
+        return df
+
+
+class SQLEngine:
+    def __init__(self, plan_cache_size: int = 256):
+        self._tables: Dict[str, _Table] = {}
+        self._plans: "OrderedDict[str, PreparedQuery]" = OrderedDict()
+        self._plan_cache_size = plan_cache_size
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def register_csv(
+        self,
+        name: str,
+        path: str,
+        schema: Optional[Dict[str, Any]] = None,
+        chunk_size: int = 50_000,
+    ) -> None:
+        with self._lock:
+            self._tables[name] = _Table(name, path, schema, chunk_size)
+            self._plans.clear()  # plans captured the previous table definitions
+
+    def tables(self) -> List[str]:
+        return list(self._tables)
+
+    def _table(self, name: str) -> _Table:
+        table = self._tables.get(name)
+        if table is None:
+            raise SQLError(f"unknown table {name}")
+        return table
+
+    def prepare(self, sql: str) -> PreparedQuery:
+        key = normalize_sql(sql)
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                self.cache_hits += 1
+                return plan
+            self.cache_misses += 1
+        plan = PreparedQuery(self, key, parse_sql(sql))
+        with self._lock:
+            self._plans[key] = plan
+            while len(self._plans) > self._plan_cache_size:
+                self._plans.popitem(last=False)
+        return plan
+
+    def execute(self, sql: str, params: Any = None) -> MyDataFrame:
+        # params: a sequence for ? placeholders or a mapping for :name ones
+        return self.prepare(sql).execute(params)
+
+    def cache_info(self) -> Dict[str, int]:
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "size": len(self._plans),
+            "max_size": self._plan_cache_size,
+        }
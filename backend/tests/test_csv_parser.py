@@ -0,0 +1,59 @@
+# Type inference picks a column's type from its first non-null value in file
+# order. Lazy rows, key filters and column batches must give exactly the values
+# of an eager parse, whichever fields and rows are read first.
+import pytest
+
+from my_sql_engine import MyCSVParser
+
+MIXED = """\
+id,a,b,c
+1,x,5,NA
+2,y,5.5,
+3,x,7,1.5
+4,y,NA,2
+"""
+
+
+@pytest.fixture
+def mixed_csv(tmp_path):
+    path = tmp_path / "mixed.csv"
+    path.write_text(MIXED)
+    return str(path)
+
+
+def _eager(path):
+    return [dict(r) for r in MyCSVParser(path).iter_rows()]
+
+
+def test_eager_inference(mixed_csv):
+    # b is an int column from "5" on, so 5.5 is not valid; c is a float column
+    # from "1.5" on, and the float parser rejects plain integers like "2"
+    assert [(r["b"], r["c"]) for r in _eager(mixed_csv)] == [(5, None), (None, None), (7, 1.5), (None, None)]
+
+
+@pytest.mark.parametrize("order", [["id", "a", "b", "c"], ["c", "b", "a", "id"]])
+def test_lazy_rows_match_eager(mixed_csv, order):
+    expected = _eager(mixed_csv)
+    # read the rows back to front and the fields in the given order
+    rows = list(MyCSVParser(mixed_csv, lazy=True).iter_rows())
+    actual = [{k: r[k] for k in order} for r in reversed(rows)][::-1]
+    assert actual == expected
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_key_filter_matches_eager(mixed_csv, lazy):
+    expected = [r for r in _eager(mixed_csv) if r["a"] == "y"]
+    parser = MyCSVParser(mixed_csv, chunk_size=2, lazy=lazy)
+    chunks = parser.iter_chunks(key_filter=("a", lambda v: v == "y"))
+    assert [{k: r[k] for k in ("b", "c", "id", "a")} for chunk in chunks for r in chunk] == expected
+    batches = MyCSVParser(mixed_csv, chunk_size=2).iter_batches(key_filter=("a", lambda v: v == "y"))
+    assert [dict(r) for b in batches for r in b.iter_rows()] == expected
+
+
+def test_custom_null_values(tmp_path):
+    path = tmp_path / "nulls.csv"
+    path.write_text("a,b,c\n -999 ,x,nA\n3,MISSING,y\n")
+    rows = list(MyCSVParser(str(path), null_values={"-999", "missing"}).iter_rows())
+    assert rows == [{"a": None, "b": "x", "c": "nA"}, {"a": 3, "b": None, "c": "y"}]
+    rows = list(MyCSVParser(str(path), schema={"a": int, "b": str}, null_values={"-999", "missing"}).iter_rows())
+    assert rows == [{"a": None, "b": "x", "c": "nA"}, {"a": 3, "b": None, "c": "y"}]
@@ -0,0 +1,61 @@
+# Inner small/big joins push the small side's keys into the big scan as a key
+# filter (a set, or a Bloom filter from bloom_min_keys keys on). Pruning must
+# not change the result: it has to equal the unfiltered left join with the
+# unmatched rows dropped, with every column typed as in a full scan.
+import random
+
+import pytest
+
+from my_sql_engine import (
+    MyCSVParser,
+    MyDataFrame,
+    build_key_filter,
+    iter_join_streaming_small_big,
+)
+
+ROWS = 20_000
+
+
+@pytest.fixture(scope="module")
+def big_csv(tmp_path_factory):
+    rnd = random.Random(3)
+    path = tmp_path_factory.mktemp("join") / "big.csv"
+    with open(path, "w") as f:
+        # m is inferred from its first value (an int), so the float rows read
+        # as NULL whether or not they survive the key filter
+        f.write("k,v,m\n")
+        for i in range(ROWS):
+            k = rnd.choice([str(rnd.randrange(5000)), "NA"])
+            m = str(rnd.randrange(100)) if i % 3 else f"{rnd.random():.3f}"
+            f.write(f"{k},{rnd.random()},{m if i else '7'}\n")
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def small_df():
+    rnd = random.Random(4)
+    keys = rnd.sample(range(4000, 8000), 600) + [4500, 4500]
+    return MyDataFrame({"k": keys, "label": [f"L{k % 17}" for k in keys]})
+
+
+def test_build_key_filter_has_no_false_negatives():
+    keys = list(range(0, 30_000, 3))
+    for bloom_min_keys in (10**9, 1):
+        test = build_key_filter(keys, bloom_min_keys=bloom_min_keys)
+        assert all(test(k) for k in keys)
+
+
+@pytest.mark.parametrize("bloom_min_keys", [10**9, 1])
+def test_pruned_join_matches_unpruned(big_csv, small_df, bloom_min_keys):
+    keys = set(small_df.get_col("k"))
+    unpruned = [
+        r for r in iter_join_streaming_small_big(MyCSVParser(big_csv, chunk_size=3000), small_df, "k", how="left")
+        if r["k"] in keys
+    ]
+    stats = {}
+    pruned = list(iter_join_streaming_small_big(
+        MyCSVParser(big_csv, chunk_size=3000), small_df, "k", stats=stats, bloom_min_keys=bloom_min_keys
+    ))
+    assert unpruned and pruned == unpruned
+    assert stats["rows_pruned"] > 0
+    assert stats["rows_scanned"] == ROWS
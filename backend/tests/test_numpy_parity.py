@@ -0,0 +1,142 @@
+# The NumPy backend must give exactly the results of the pure-Python paths:
+# same rows, same order, and bit-identical floats (compared through repr).
+import random
+
+import pytest
+
+np_backend = pytest.importorskip("numpy_backend")
+
+import my_sql_engine
+from my_sql_engine import MyDataFrame
+
+N = 3 * np_backend.MIN_ROWS
+
+
+def _maybe_null(rnd, value, p=0.1):
+    return None if rnd.random() < p else value
+
+
+def _left_frame(seed=0):
+    rnd = random.Random(seed)
+    return MyDataFrame({
+        "id": list(range(N)),
+        "k": [rnd.randrange(200) for _ in range(N)],
+        "i": [_maybe_null(rnd, rnd.randrange(-50, 50)) for _ in range(N)],
+        "f": [_maybe_null(rnd, rnd.uniform(-1e3, 1e3)) for _ in range(N)],
+        "s": [_maybe_null(rnd, rnd.choice("abcdefg")) for _ in range(N)],
+        "name": [rnd.choice(["ann", "bo", "cy", "di"]) + str(rnd.randrange(30)) for _ in range(N)],
+        "jk": [_maybe_null(rnd, rnd.randrange(300)) for _ in range(N)],
+    })
+
+
+def _right_frame(seed=1):
+    # duplicate keys, keys missing on the left and NULL keys
+    rnd = random.Random(seed)
+    n = N // 2
+    return MyDataFrame({
+        "jk": [_maybe_null(rnd, rnd.randrange(100, 400)) for _ in range(n)],
+        "r": [rnd.uniform(0, 1) for _ in range(n)],
+        "s": [rnd.choice("xyz") for _ in range(n)],
+    })
+
+
+def _dump(df):
+    return repr([df.columns()] + [list(r.values()) for r in df.iter_rows()])
+
+
+@pytest.fixture
+def vector_calls(monkeypatch):
+    # counts the vectorized attempts that produced a result, so each test can
+    # check the NumPy path really ran
+    calls = {}
+
+    def spy(owner, name):
+        orig = getattr(owner, name)
+
+        def wrapper(*args, **kwargs):
+            out = orig(*args, **kwargs)
+            if out is not None:
+                calls[name] = calls.get(name, 0) + 1
+            return out
+
+        monkeypatch.setattr(owner, name, wrapper)
+
+    spy(MyDataFrame, "_vector_filter")
+    spy(MyDataFrame, "_vector_group_by")
+    spy(MyDataFrame, "_vector_join")
+    spy(np_backend, "sort_rows")
+    return calls
+
+
+def _both(monkeypatch, fn):
+    monkeypatch.setattr(my_sql_engine, "VECTORIZE", False)
+    expected = _dump(fn())
+    monkeypatch.setattr(my_sql_engine, "VECTORIZE", True)
+    return expected, _dump(fn())
+
+
+@pytest.mark.parametrize(
+    "cond",
+    [
+        [("i", ">=", 0)],
+        [("i", "==", 3), ("s", "!=", "b")],
+        [("f", "<", 12.5)],
+        [("s", "in", ["a", "c", None])],
+        [("name", ">", "bo"), ("k", "<=", 100)],
+    ],
+)
+def test_filter_parity(monkeypatch, vector_calls, cond):
+    df = _left_frame()
+    expected, actual = _both(monkeypatch, lambda: df.filter(cond))
+    assert actual == expected
+    assert vector_calls.get("_vector_filter")
+
+
+@pytest.mark.parametrize(
+    "keys, spec",
+    [
+        (["k"], {"i": "sum", "f": "avg"}),
+        (["s"], {"i": "min", "f": "max", "name": "count_col"}),
+        (["s", "k"], {"f": "sum", "i": "avg", "id": "count"}),
+        (["name"], {"f": "min", "i": "max", "s": "count_col"}),
+    ],
+)
+def test_group_by_parity(monkeypatch, vector_calls, keys, spec):
+    df = _left_frame()
+    expected, actual = _both(monkeypatch, lambda: df.group_by(keys, spec))
+    assert actual == expected
+    assert vector_calls.get("_vector_group_by")
+
+
+@pytest.mark.parametrize(
+    "order",
+    [
+        [("k", "asc")],
+        [("name", "desc"), ("id", "asc")],
+        [("k", "desc"), ("name", "asc")],
+    ],
+)
+def test_order_by_parity(monkeypatch, vector_calls, order):
+    df = _left_frame()
+    expected, actual = _both(monkeypatch, lambda: df.order_by(order))
+    assert actual == expected
+    assert vector_calls.get("sort_rows")
+
+
+@pytest.mark.parametrize("how", ["inner", "left", "right"])
+def test_join_parity(monkeypatch, vector_calls, how):
+    left, right = _left_frame(), _right_frame()
+    expected, actual = _both(monkeypatch, lambda: left.join(right, "jk", how=how))
+    assert actual == expected
+    assert vector_calls.get("_vector_join")
+
+
+def test_view_parity(monkeypatch, vector_calls):
+    # operators over a filtered view (a row selection, not a fresh frame)
+    def run():
+        view = _left_frame().filter([("k", "<", 150)]).order_by([("name", "desc"), ("id", "asc")])
+        return view.group_by(["name"], {"f": "sum", "i": "avg"})
+
+    expected, actual = _both(monkeypatch, run)
+    assert actual == expected
+    assert vector_calls.get("_vector_group_by") and vector_calls.get("sort_rows")
@@ -0,0 +1,108 @@
+# Aggregation and distinct under a memory budget must match the in-memory
+# results exactly (rows, first-seen order, float sums) and leave no spill
+# files behind, including when the query is cancelled mid-scan.
+import os
+import random
+
+import pytest
+
+from my_sql_engine import (
+    HashAggregator,
+    MyCSVParser,
+    MyDataFrame,
+    group_by_streaming,
+    iter_distinct_streaming,
+)
+from query_context import QueryCancelled, query_scope
+
+ROWS = 40_000
+BUDGET = 50_000
+SPEC = {"v": "sum", "f": "avg", "w": "min", "x": "max", "s": "count_col", "y": "sum_exact"}
+
+
+@pytest.fixture(scope="module")
+def events_csv(tmp_path_factory):
+    rnd = random.Random(7)
+    path = tmp_path_factory.mktemp("data") / "rows.csv"
+    with open(path, "w") as f:
+        f.write("k,g,v,f,w,x,s,y\n")
+        for i in range(ROWS):
+            s = rnd.choice(["a", "b", "NA"])
+            y = rnd.choice([str(rnd.randrange(100)), "NA"])
+            f.write(
+                f"{rnd.randrange(20_000)},{rnd.choice('pqr')},{rnd.uniform(-5, 5)},{rnd.random()},"
+                f"{rnd.randrange(1000)},{rnd.randrange(1000)},{s},{y}\n"
+            )
+    return str(path)
+
+
+@pytest.fixture
+def spill_dir(tmp_path):
+    d = tmp_path / "spill"
+    d.mkdir()
+    return str(d)
+
+
+def _dump(df):
+    return repr([df.columns()] + [list(r.values()) for r in df.iter_rows()])
+
+
+def test_hash_aggregator_spill_matches_memory(events_csv, spill_dir):
+    df = MyDataFrame.from_rows(MyCSVParser(events_csv).iter_rows())
+    keys = ["k", "g"]
+    cols = [df.get_col(c) for c in keys], [df.get_col(c) for c in SPEC]
+
+    memory = HashAggregator(keys, SPEC)
+    memory.add_columns(*cols)
+    spilled = HashAggregator(keys, SPEC, memory_budget=BUDGET, spill_dir=spill_dir)
+    spilled.add_columns(*cols)
+
+    assert _dump(spilled.to_df()) == _dump(memory.to_df())
+    assert spilled.stats["spilled_rows"] > 0
+    assert os.listdir(spill_dir) == []
+
+
+def test_group_by_streaming_spill_matches_memory(events_csv, spill_dir):
+    expected = group_by_streaming(MyCSVParser(events_csv, chunk_size=5000), ["k"], SPEC)
+    actual = group_by_streaming(
+        MyCSVParser(events_csv, chunk_size=5000), ["k"], SPEC, memory_budget=BUDGET, spill_dir=spill_dir
+    )
+    assert _dump(actual) == _dump(expected)
+    assert os.listdir(spill_dir) == []
+
+
+def test_frame_group_by_and_distinct_spill(events_csv, spill_dir):
+    df = MyDataFrame.from_rows(MyCSVParser(events_csv).iter_rows())
+    assert _dump(df.group_by(["k"], SPEC, memory_budget=BUDGET, spill_dir=spill_dir)) == _dump(
+        df.group_by(["k"], SPEC)
+    )
+    assert _dump(df.distinct(["k"], memory_budget=BUDGET // 10, spill_dir=spill_dir)) == _dump(df.distinct(["k"]))
+    assert os.listdir(spill_dir) == []
+
+
+def test_cancelled_scan_removes_spill_files(events_csv, spill_dir):
+    parser = MyCSVParser(events_csv, chunk_size=2000)
+    batches = parser.iter_batches
+
+    with query_scope() as ctx:
+        def cancel_midway(**kwargs):
+            for n, batch in enumerate(batches(**kwargs)):
+                if n == 10:
+                    ctx.cancel()
+                yield batch
+
+        parser.iter_batches = cancel_midway
+        with pytest.raises(QueryCancelled):
+            group_by_streaming(parser, ["k"], SPEC, memory_budget=BUDGET, spill_dir=spill_dir)
+    assert os.listdir(spill_dir) == []
+
+
+def test_abandoned_distinct_stream_removes_spill_files(events_csv, spill_dir):
+    rows = iter_distinct_streaming(
+        MyCSVParser(events_csv, chunk_size=2000), ["k"], memory_budget=BUDGET // 10, spill_dir=spill_dir
+    )
+    for _ in zip(range(15_000), rows):
+        pass
+    assert os.listdir(spill_dir) != []
+    rows.close()
+    assert os.listdir(spill_dir) == []
@@ -0,0 +1,182 @@
+# SQL front end: parsing, planning and execution checked against results
+# worked out by hand for a small table, including SQL NULL semantics.
+import pytest
+
+from sql_frontend import SQLEngine, SQLError, normalize_sql, parse_sql
+
+ATHLETES = """\
+id,name,noc,year,medal,score,weight
+1,Ann Lee,USA,2000,Gold,9.5,60
+2,Bo Chan,CHN,2000,NA,7.25,NA
+3,Cy Diaz,USA,2004,Silver,8.0,75
+4,Di Eze,NGR,2004,NA,NA,NA
+5,Ed Fox,USA,2008,Gold,9.75,80
+6,Flo Gu,CHN,2008,Bronze,8.5,NA
+7,Gil Ho,GBR,2008,NA,NA,NA
+"""
+
+COUNTRIES = """\
+noc,country
+USA,United States
+CHN,China
+GBR,Great Britain
+"""
+
+
+@pytest.fixture
+def sql(tmp_path):
+    (tmp_path / "athletes.csv").write_text(ATHLETES)
+    (tmp_path / "countries.csv").write_text(COUNTRIES)
+    engine = SQLEngine()
+    engine.register_csv("athletes", str(tmp_path / "athletes.csv"))
+    engine.register_csv("countries", str(tmp_path / "countries.csv"))
+    return engine
+
+
+def rows(df):
+    return [tuple(r.values()) for r in df.iter_rows()]
+
+
+def test_where_order_limit(sql):
+    df = sql.execute(
+        "SELECT name, year FROM athletes WHERE noc = 'USA' AND medal IS NOT NULL "
+        "ORDER BY year DESC LIMIT 2 OFFSET 1"
+    )
+    assert df.columns() == ["name", "year"]
+    assert rows(df) == [("Cy Diaz", 2004), ("Ann Lee", 2000)]
+
+
+def test_parameters(sql):
+    q = "SELECT id FROM athletes WHERE year BETWEEN ? AND ? AND name LIKE ? ORDER BY id"
+    assert rows(sql.execute(q, [2004, 2008, "%E%"])) == [(4,), (5,)]
+    named = "SELECT id FROM athletes WHERE noc IN (:a, :b) AND NOT medal IS NULL ORDER BY id"
+    assert rows(sql.execute(named, {"a": "CHN", "b": "GBR"})) == [(6,)]
+
+
+def test_null_comparisons_are_false(sql):
+    assert rows(sql.execute("SELECT id FROM athletes WHERE score > 0 ORDER BY id")) == [
+        (1,), (2,), (3,), (5,), (6,)
+    ]
+    assert rows(sql.execute("SELECT id FROM athletes WHERE score <= 0 OR score = NULL")) == []
+    assert rows(sql.execute("SELECT id FROM athletes WHERE score IS NULL ORDER BY id")) == [(4,), (7,)]
+
+
+def test_group_by_aggregates(sql):
+    df = sql.execute(
+        "SELECT noc, COUNT(*) AS n, COUNT(medal) AS medals, SUM(weight) AS w, "
+        "AVG(score) AS avg_score, MIN(year) AS first, MAX(year) AS last "
+        "FROM athletes GROUP BY noc ORDER BY noc"
+    )
+    assert rows(df) == [
+        ("CHN", 2, 1, None, (7.25 + 8.5) / 2, 2000, 2008),
+        ("GBR", 1, 0, None, None, 2008, 2008),
+        ("NGR", 1, 0, None, None, 2004, 2004),
+        ("USA", 3, 3, 215, (9.5 + 8.0 + 9.75) / 3, 2000, 2008),
+    ]
+
+
+def test_sum_keeps_ints_and_floats(sql):
+    (w, s), = rows(sql.execute("SELECT SUM(weight) AS w, SUM(score) AS s FROM athletes"))
+    assert w == 215 and isinstance(w, int)
+    assert s == 9.5 + 7.25 + 8.0 + 9.75 + 8.5 and isinstance(s, float)
+
+
+def test_aggregates_over_no_rows(sql):
+    df = sql.execute("SELECT COUNT(*) AS n, COUNT(score) AS c, SUM(score) AS s, MAX(year) AS m FROM athletes WHERE year > 3000")
+    assert rows(df) == [(0, 0, None, None)]
+
+
+def test_having(sql):
+    df = sql.execute(
+        "SELECT noc, COUNT(*) AS n FROM athletes GROUP BY noc HAVING COUNT(*) > 1 ORDER BY n DESC, noc"
+    )
+    assert rows(df) == [("USA", 3), ("CHN", 2)]
+
+
+def test_joins(sql):
+    inner = sql.execute(
+        "SELECT a.name, c.country FROM athletes a JOIN countries c ON a.noc = c.noc "
+        "WHERE a.year = 2008 ORDER BY a.name"
+    )
+    assert rows(inner) == [("Ed Fox", "United States"), ("Flo Gu", "China"), ("Gil Ho", "Great Britain")]
+    left = sql.execute(
+        "SELECT a.id, c.country FROM athletes a LEFT JOIN countries c ON a.noc = c.noc WHERE a.year = 2004 ORDER BY a.id"
+    )
+    assert rows(left) == [(3, "United States"), (4, None)]
+
+
+def test_distinct_and_functions(sql):
+    df = sql.execute("SELECT DISTINCT LOWER(noc) AS n FROM athletes ORDER BY 1")
+    assert rows(df) == [("chn",), ("gbr",), ("ngr",), ("usa",)]
+    df = sql.execute("SELECT id, COALESCE(medal, 'none') AS m, score * 2 AS s2 FROM athletes WHERE id <= 2 ORDER BY id")
+    assert rows(df) == [(1, "Gold", 19.0), (2, "none", 14.5)]
+
+
+def test_plan_cache_normalizes_text(sql):
+    sql.execute("SELECT id FROM athletes WHERE id = ?", [1])
+    sql.execute("select  id from athletes   where id = ?", [2])
+    assert sql.cache_info()["hits"] == 1
+    assert normalize_sql("SELECT  a FROM t") == normalize_sql("select a from t")
+
+
+def test_parse_tree():
+    q = parse_sql("SELECT noc, SUM(weight) AS w FROM athletes GROUP BY noc ORDER BY w DESC LIMIT 3")
+    assert q["from"][0] == "athletes"
+    assert q["group_by"] == [("col", None, "noc")]
+    assert q["order_by"] == [(("col", None, "w"), "desc")]
+    assert q["limit"] == ("lit", 3)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "SELECT FROM athletes",
+        "SELECT id FROM athletes WHERE",
+        "SELECT id FROM athletes LIMIT 1 garbage",
+        "SELECT name, COUNT(*) FROM athletes GROUP BY noc",
+        "SELECT SUM(COUNT(id)) FROM athletes",
+        "SELECT id FROM nowhere",
+        "SELECT id FROM athletes ORDER BY 5",
+    ],
+)
+def test_errors(sql, query):
+    with pytest.raises(SQLError):
+        sql.execute(query)
+
+
+MIXED = """\
+id,a,b
+1,x,5
+2,y,5.5
+3,x,7
+4,y,NA
+"""
+
+
+@pytest.fixture
+def mixed(tmp_path):
+    # no schema: b is inferred as int from its first value, so 5.5 reads as NULL
+    (tmp_path / "t.csv").write_text(MIXED)
+    engine = SQLEngine()
+    engine.register_csv("t", str(tmp_path / "t.csv"))
+    return engine
+
+
+def test_inferred_types_do_not_depend_on_the_query(mixed):
+    assert rows(mixed.execute("SELECT id, b FROM t ORDER BY id")) == [(1, 5), (2, None), (3, 7), (4, None)]
+    assert rows(mixed.execute("SELECT id, b FROM t WHERE id > 1 AND b > 5")) == [(3, 7)]
+    assert rows(mixed.execute("SELECT id, b FROM t WHERE b > 5 AND id > 1")) == [(3, 7)]
+    assert rows(mixed.execute("SELECT id, b FROM t WHERE a = 'y'")) == [(2, None), (4, None)]
+
+
+def test_null_parameter_matches_nothing(mixed):
+    assert rows(mixed.execute("SELECT id FROM t WHERE b = ?", [None])) == []
+    assert rows(mixed.execute("SELECT id FROM t WHERE b = NULL")) == []
+    assert rows(mixed.execute("SELECT id FROM t WHERE b = ?", [7])) == [(3,)]
+
+
+def test_order_by_nullable_column(sql, mixed):
+    assert rows(mixed.execute("SELECT id, b FROM t ORDER BY b")) == [(1, 5), (3, 7), (2, None), (4, None)]
+    assert rows(mixed.execute("SELECT id, b FROM t ORDER BY b DESC, id DESC")) == [(4, None), (2, None), (3, 7), (1, 5)]
+    df = sql.execute("SELECT id, score FROM athletes ORDER BY score DESC LIMIT 3")
+    assert rows(df) == [(4, None), (7, None), (5, 9.75)]
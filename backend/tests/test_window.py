@@ -0,0 +1,39 @@
+# Window functions and sorts over NULL keys: NULL sorts after every value, so
+# NULL partitions and order keys come last ascending and first descending.
+from my_sql_engine import MyDataFrame
+
+
+def _frame():
+    return MyDataFrame({
+        "p": ["a", None, "a", "b", None, "a"],
+        "y": [2, 1, None, 3, None, 1],
+        "v": [1, 2, 3, 4, 5, 6],
+    })
+
+
+def _rows(df, cols):
+    return [tuple(r[c] for c in cols) for r in df.iter_rows()]
+
+
+def test_window_null_partition_and_order_keys():
+    out = _frame().window("p", [("y", "asc")], {"rn": ("row_number",), "rs": ("running_sum", "v")})
+    assert _rows(out, ["p", "y", "rn", "rs"]) == [
+        ("a", 1, 1, 6), ("a", 2, 2, 7), ("a", None, 3, 10),
+        ("b", 3, 1, 4),
+        (None, 1, 1, 2), (None, None, 2, 7),
+    ]
+
+
+def test_window_descending_puts_nulls_first():
+    out = _frame().window("p", [("y", "desc")], {"rk": ("rank",), "prev": ("lag", "v")})
+    assert _rows(out, ["p", "y", "rk", "prev"]) == [
+        ("a", None, 1, None), ("a", 2, 2, 3), ("a", 1, 3, 1),
+        ("b", 3, 1, None),
+        (None, None, 1, None), (None, 1, 2, 5),
+    ]
+
+
+def test_order_by_with_nulls():
+    df = _frame()
+    assert _rows(df.order_by([("y", "asc"), ("v", "desc")]), ["v"]) == [(6,), (2,), (1,), (4,), (5,), (3,)]
+    assert _rows(df.order_by([("p", "desc"), ("y", "asc")]), ["v"]) == [(2,), (5,), (4,), (6,), (1,), (3,)]